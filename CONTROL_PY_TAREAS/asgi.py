@@ -13,4 +13,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CONTROL_PY_TAREAS.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Importar después de inicializar Django (usa los modelos)
+from proyectos.sse import RUTA as RUTA_SSE, NotificacionesSSE  # noqa: E402
+
+notificaciones_sse = NotificacionesSSE()
+
+
+async def application(scope, receive, send):
+    # El stream SSE no pasa por Django: una conexión abierta no ocupa un hilo
+    if scope['type'] == 'http' and scope['path'] == RUTA_SSE:
+        return await notificaciones_sse(scope, receive, send)
+    return await django_application(scope, receive, send)
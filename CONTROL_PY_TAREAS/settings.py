@@ -56,11 +56,14 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'api.middleware.GZipAPIMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'proyectos.middleware.AdmisionMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'proyectos.middleware.RegistroEnLoteMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -76,6 +79,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                # Contador y últimas notificaciones no leídas de la barra de navegación
+                'proyectos.context_processors.notificaciones',
             ],
         },
     },
@@ -103,6 +108,28 @@ else:
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Las instantáneas del panel se invalidan por versión; con varios procesos la
+# caché debe ser compartida (Redis). Sin REDIS_URL se usa la caché en memoria,
+# propia de cada proceso: las versiones, las plazas y los presupuestos del
+# control de admisión no se comparten entre procesos (check --deploy lo avisa).
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -161,10 +188,16 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'cuentas.User'
 
+# El usuario de la sesión y el del token JWT se leen de la caché (ver cuentas/autenticacion.py)
+AUTHENTICATION_BACKENDS = ['cuentas.backends.ModelBackendEnCache']
+
+# Sesiones en la caché con copia en la BD: leer la sesión no consulta la BD
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 # Django REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.autenticacion.JWTEnCache',
         'rest_framework.authentication.SessionAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
@@ -175,6 +208,10 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
@@ -190,6 +227,24 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
 }
 
+# Listados de la API sin serializers por fila (ver api/listado.py); False usa
+# siempre los serializers de DRF
+API_LISTADO_RAPIDO = os.environ.get('API_LISTADO_RAPIDO', 'True') == 'True'
+
+# Control de admisión por nivel de coste (ver proyectos/admision.py). Los límites
+# solo son comunes a todos los procesos con REDIS_URL: con la caché en memoria
+# cada proceso admite 'concurrencia' peticiones y lleva su propio presupuesto.
+# Una petición en 'cola' ocupa su hilo del servidor mientras espera, hasta
+# 'espera' segundos: sin cola, quien no encuentra plaza recibe 429 en el acto.
+ADMISION_NIVELES = {
+    'ligero': {'coste': 1},
+    'medio': {'coste': 5},
+    # Informes PDF/Excel y exportaciones: 2 a la vez
+    'pesado': {'coste': 30, 'concurrencia': 2, 'duracion_maxima': 300},
+}
+# Fichas de cada usuario y fichas que recupera por segundo
+ADMISION_PRESUPUESTO = {'capacidad': 200, 'recarga': 5}
+
 # Spectacular Settings (API Documentation)
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Control de Proyectos y Tareas API',
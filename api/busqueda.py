@@ -0,0 +1,83 @@
+"""
+?search= de la API con el índice de texto completo (proyectos.busqueda).
+
+BusquedaFilter ocupa el lugar de SearchFilter: en los modelos indexados
+devuelve los resultados más relevantes anotados con 'rango', y en el resto
+busca como SearchFilter. OrdenBusquedaFilter, en lugar de OrderingFilter,
+ordena por ese rango si no se pide otro orden con ?ordering=; la paginación
+por cursor toma el orden de él, así que las páginas siguen la relevancia.
+ResaltadoMixin añade a cada fila de la página 'resaltado', con los campos
+indexados y las coincidencias entre <mark>, y a la respuesta 'busqueda' con los
+topes de la búsqueda y si dejaron fuera coincidencias (también en la cabecera
+X-Busqueda-Truncada, que lleva además la exportación).
+"""
+from django.db import router
+from rest_framework import filters
+
+from proyectos import busqueda
+from proyectos.busqueda import clasificar, indexado, por_rango, resaltar
+
+
+CABECERA_TRUNCADA = 'X-Busqueda-Truncada'
+
+
+def busqueda_truncada(request):
+    """Si la búsqueda de la petición dejó fuera coincidencias; None si no se buscó en el índice"""
+    resultados = getattr(request, '_busqueda', None)
+    if not resultados:
+        return None
+    return any(clasificacion.truncada for clasificacion in resultados.values())
+
+
+def topes():
+    return {'limite': busqueda.LIMITE, 'candidatos': busqueda.CANDIDATOS}
+
+
+class BusquedaFilter(filters.SearchFilter):
+    search_description = (
+        'Texto a buscar. Devuelve como mucho los %(limite)s resultados más relevantes entre las '
+        '%(candidatos)s coincidencias más recientes; si hay más, la respuesta lo indica en '
+        "'busqueda.truncada' y en la cabecera X-Busqueda-Truncada."
+    ) % topes()
+
+    def filter_queryset(self, request, queryset, view):
+        if not indexado(queryset.model):
+            return super().filter_queryset(request, queryset, view)
+        texto = request.query_params.get(self.search_param, '')
+        if not texto.strip():
+            return queryset
+        # El ETag y el listado filtran el mismo queryset: se busca una vez por petición
+        if not hasattr(request, '_busqueda'):
+            request._busqueda = {}
+        resultados = request._busqueda
+        if (queryset.model, texto) not in resultados:
+            resultados[queryset.model, texto] = clasificar(queryset, texto)
+        return por_rango(queryset, resultados[queryset.model, texto].pks)
+
+
+class OrdenBusquedaFilter(filters.OrderingFilter):
+
+    def get_ordering(self, request, queryset, view):
+        if 'rango' in queryset.query.annotations and not request.query_params.get(self.ordering_param):
+            return ('rango',)
+        return super().get_ordering(request, queryset, view)
+
+
+class ResaltadoMixin:
+    """Mixin para viewsets con BusquedaFilter: fragmentos resaltados de la página"""
+
+    def get_paginated_response(self, data):
+        texto = self.request.query_params.get(BusquedaFilter.search_param, '')
+        modelo = self.get_queryset().model
+        if texto.strip() and indexado(modelo):
+            pks = [fila['id'] for fila in data if 'id' in fila]
+            resaltados = resaltar(modelo, pks, texto, router.db_for_read(modelo))
+            for fila in data:
+                if 'id' in fila:
+                    fila['resaltado'] = resaltados.get(fila['id'], {})
+        respuesta = super().get_paginated_response(data)
+        truncada = busqueda_truncada(self.request)
+        if truncada is not None:
+            respuesta.data['busqueda'] = {**topes(), 'truncada': truncada}
+            respuesta[CABECERA_TRUNCADA] = 'true' if truncada else 'false'
+        return respuesta
@@ -0,0 +1,65 @@
+"""
+Exportación completa de un listado en NDJSON, en streaming.
+
+Las filas se leen con iterator(chunk_size=...) (un cursor del lado del
+servidor en PostgreSQL) y se codifican con el Codificador del listado rápido
+(si está activado, ver listado.py), así que en memoria solo hay un bloque de filas cada vez y el primer bloque se
+envía en cuanto llega de la base de datos. GZipAPIMiddleware lo comprime sobre
+la marcha si el cliente envía Accept-Encoding: gzip.
+"""
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import action
+
+from proyectos.admision import nivel_coste
+
+from .busqueda import CABECERA_TRUNCADA, busqueda_truncada
+from .listado import Codificador, NoCompilable, usa_listado_rapido
+from .renderers import NDJSONRenderer
+
+
+class ExportacionMixin:
+    """
+    Mixin para viewsets: GET .../export.ndjson devuelve todas las filas del
+    listado, con los mismos filtros, búsqueda y orden, sin paginar
+    """
+    filas_por_consulta = 2000
+    filas_por_bloque = 500
+    nombre_exportacion = None
+
+    @action(detail=False, methods=['get'], url_path='export', renderer_classes=[NDJSONRenderer])
+    @nivel_coste('pesado')
+    def exportar(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        codificador = None
+        if usa_listado_rapido(self):
+            try:
+                codificador = Codificador(serializer, queryset.model)
+            except NoCompilable:
+                pass
+
+        if codificador is None:
+            filas = map(serializer.to_representation, queryset.iterator(chunk_size=self.filas_por_consulta))
+        else:
+            filas = map(codificador, queryset.defer(None).values(*codificador.columnas).iterator(
+                chunk_size=self.filas_por_consulta
+            ))
+
+        respuesta = StreamingHttpResponse(self._bloques(filas), content_type=NDJSONRenderer.media_type)
+        nombre = self.nombre_exportacion or queryset.model._meta.model_name
+        respuesta['Content-Disposition'] = f'attachment; filename="{nombre}.ndjson"'
+        truncada = busqueda_truncada(request)
+        if truncada is not None:
+            respuesta[CABECERA_TRUNCADA] = 'true' if truncada else 'false'
+        return respuesta
+
+    def _bloques(self, filas):
+        """Líneas NDJSON agrupadas en bloques de filas_por_bloque filas"""
+        bloque = []
+        for linea in NDJSONRenderer().lineas(filas):
+            bloque.append(linea)
+            if len(bloque) == self.filas_por_bloque:
+                yield b''.join(bloque)
+                bloque = []
+        if bloque:
+            yield b''.join(bloque)
@@ -0,0 +1,180 @@
+"""
+Listados sin instancias de modelo ni serializers por fila.
+
+El serializer de la vista se compila una vez por petición en un Codificador:
+una lista de funciones, una por campo, que leen las columnas de una fila de
+values() y devuelven lo mismo que to_representation(). Los campos calculados
+del modelo se evalúan sobre las columnas declaradas en Meta.columnas_calculadas.
+Si el serializer tiene algo que no se puede compilar (relaciones a muchos,
+campos sin columna conocida), la vista usa el listado normal.
+
+Es opcional: API_LISTADO_RAPIDO = False en settings lo desactiva en todas las
+vistas (listados y exportaciones), y `listado_rapido` en cada vista manda
+sobre el ajuste.
+"""
+from operator import itemgetter
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+# Campos cuyo to_representation() devuelve el valor de la columna sin cambios
+SIN_CONVERSION = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ChoiceField,
+    serializers.ReadOnlyField,
+)
+
+
+class NoCompilable(Exception):
+    pass
+
+
+def _campo_modelo(modelo, nombre):
+    try:
+        return modelo._meta.get_field(nombre)
+    except FieldDoesNotExist:
+        return None
+
+
+def _leer(clave, conversor):
+    if conversor is None:
+        return itemgetter(clave)
+
+    def leer(fila):
+        valor = fila[clave]
+        return None if valor is None else conversor(valor)
+    return leer
+
+
+def _anidar(clave, campos):
+    def anidar(fila):
+        if fila[clave] is None:
+            return None
+        return {nombre: codificar(fila) for nombre, codificar in campos}
+    return anidar
+
+
+def _calcular(funcion, claves, conversor):
+    def calcular(fila):
+        valor = funcion(SimpleNamespace(**{atributo: fila[clave] for atributo, clave in claves}))
+        if valor is None or conversor is None:
+            return valor
+        return conversor(valor)
+    return calcular
+
+
+class Codificador:
+    """Convierte una fila de values() en el dict que produciría el serializer"""
+
+    def __init__(self, serializer, modelo):
+        self.columnas = set()
+        self.campos = self._compilar(serializer, modelo, '')
+
+    def __call__(self, fila):
+        return {nombre: codificar(fila) for nombre, codificar in self.campos}
+
+    def _ruta(self, modelo, atributos, prefijo):
+        """Sigue las relaciones a un solo objeto de `atributos`; devuelve (ruta, modelo)"""
+        ruta = prefijo
+        for atributo in atributos:
+            relacion = _campo_modelo(modelo, atributo)
+            if relacion is None or not (relacion.many_to_one or relacion.one_to_one):
+                raise NoCompilable(atributo)
+            ruta = f'{ruta}__{atributo}' if ruta else atributo
+            modelo = relacion.related_model
+        return ruta, modelo
+
+    def _columna(self, ruta, atributo):
+        clave = f'{ruta}__{atributo}' if ruta else atributo
+        self.columnas.add(clave)
+        return clave
+
+    def _compilar(self, serializer, modelo, prefijo):
+        if type(serializer).to_representation is not serializers.ModelSerializer.to_representation:
+            raise NoCompilable(type(serializer).__name__)
+        calculadas = getattr(serializer.Meta, 'columnas_calculadas', {})
+
+        campos = []
+        for nombre, campo in serializer.fields.items():
+            if campo.write_only:
+                continue
+            if campo.source == '*' or isinstance(campo, (serializers.ListSerializer, serializers.ManyRelatedField)):
+                raise NoCompilable(nombre)
+
+            if isinstance(campo, serializers.BaseSerializer):
+                ruta, relacionado = self._ruta(modelo, campo.source_attrs, prefijo)
+                # La clave foránea dice si el objeto anidado es None
+                self.columnas.add(ruta)
+                campos.append((nombre, _anidar(ruta, self._compilar(campo, relacionado, ruta))))
+                continue
+
+            *relaciones, atributo = campo.source_attrs
+            ruta, modelo_campo = self._ruta(modelo, relaciones, prefijo)
+            columna = _campo_modelo(modelo_campo, atributo)
+            if isinstance(campo, serializers.PrimaryKeyRelatedField):
+                # La columna de la clave foránea ya es la pk que se devuelve
+                campos.append((nombre, _leer(self._columna(ruta, atributo), None)))
+            elif columna is not None and columna.concrete and not columna.many_to_many and (
+                not columna.is_relation or atributo == columna.attname
+            ):
+                conversor = None if isinstance(campo, SIN_CONVERSION) else campo.to_representation
+                campos.append((nombre, _leer(self._columna(ruta, columna.attname), conversor)))
+            elif not relaciones and atributo in calculadas:
+                funcion = getattr(modelo, atributo)
+                if isinstance(funcion, property):
+                    funcion = funcion.fget
+                claves = [(columna, self._columna(ruta, columna)) for columna in calculadas[atributo]]
+                conversor = None if isinstance(campo, SIN_CONVERSION) else campo.to_representation
+                campos.append((nombre, _calcular(funcion, claves, conversor)))
+            else:
+                raise NoCompilable(nombre)
+        return campos
+
+
+def usa_listado_rapido(vista):
+    """`listado_rapido` de la vista o, si es None o no existe, el ajuste API_LISTADO_RAPIDO"""
+    propio = getattr(vista, 'listado_rapido', None)
+    if propio is not None:
+        return propio
+    return getattr(settings, 'API_LISTADO_RAPIDO', True)
+
+
+class ListadoRapidoMixin:
+    """
+    Mixin para viewsets: list() lee las filas con values() en una consulta y
+    las codifica con el serializer compilado, sin instancias por fila
+    """
+    # None: según el ajuste API_LISTADO_RAPIDO (activado si no existe)
+    listado_rapido = None
+
+    def usa_listado_rapido(self):
+        return usa_listado_rapido(self)
+
+    def list(self, request, *args, **kwargs):
+        if not self.usa_listado_rapido():
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        try:
+            codificador = Codificador(self.get_serializer(), queryset.model)
+        except NoCompilable:
+            return super().list(request, *args, **kwargs)
+
+        columnas = set(codificador.columnas)
+        if isinstance(self.paginator, CursorPagination):
+            # El cursor se calcula con las columnas de la ordenación
+            ordering = self.paginator.get_ordering(request, queryset, self)
+            columnas.update(campo.lstrip('-') for campo in ordering)
+        # values() elige sus columnas: se descarta el only() de get_queryset()
+        filas = queryset.defer(None).values(*columnas)
+
+        pagina = self.paginate_queryset(filas)
+        if pagina is not None:
+            return self.get_paginated_response([codificador(fila) for fila in pagina])
+        return Response([codificador(fila) for fila in filas])
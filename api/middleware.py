@@ -0,0 +1,18 @@
+from django.middleware.gzip import GZipMiddleware
+
+
+class GZipAPIMiddleware(GZipMiddleware):
+    """
+    Comprime con gzip las respuestas grandes de la API. Las pequeñas (tokens,
+    detalles, errores) se envían sin comprimir: ahorrarían poco y mezclar
+    secretos con datos del cliente en un cuerpo comprimido no es buena idea.
+    """
+    ruta = '/api/'
+    tamano_minimo = 4096
+
+    def process_response(self, request, response):
+        if not request.path.startswith(self.ruta):
+            return response
+        if not response.streaming and len(response.content) < self.tamano_minimo:
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,160 @@
+"""
+select_related / prefetch_related a partir de los campos de un serializer.
+
+Se recorren los campos declarados (incluidos los serializers anidados y los
+`source` con puntos) sobre los metadatos del modelo: las relaciones a un solo
+objeto se traen con select_related y, desde la primera relación a muchos,
+con prefetch_related. Así una página del listado cuesta el mismo número de
+consultas sea cual sea su tamaño. Las columnas leídas sirven además para
+only(); los campos calculados declaran las suyas en Meta.columnas_calculadas.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _relacion(modelo, nombre):
+    """El campo de relación `nombre` de `modelo`, o None si no es una relación"""
+    try:
+        campo = modelo._meta.get_field(nombre)
+    except FieldDoesNotExist:
+        return None
+    # get_field() también resuelve 'tarea_id', que no necesita la relación
+    if not campo.is_relation or campo.name != nombre:
+        return None
+    return campo
+
+
+def _columna(modelo, nombre):
+    """Nombre para only() de la columna `nombre` de `modelo`, o None si no es una columna"""
+    try:
+        campo = modelo._meta.get_field(nombre)
+    except FieldDoesNotExist:
+        return None
+    if not campo.concrete or campo.many_to_many:
+        return None
+    return campo.name
+
+
+def _unir(ruta, atributo):
+    return f'{ruta}__{atributo}' if ruta else atributo
+
+
+class Plan:
+    """Joins, prefetches y columnas que lee un serializer"""
+
+    def __init__(self):
+        self.seleccionar = set()
+        self.precargar = set()
+        self.columnas = set()
+        # Rutas cuyos modelos se cargan completos: campos calculados sin columnas conocidas
+        self.completos = set()
+
+    def select_related(self):
+        # Las rutas intermedias ya van incluidas en la más larga
+        return sorted(
+            ruta for ruta in self.seleccionar
+            if not any(otra.startswith(f'{ruta}__') for otra in self.seleccionar)
+        )
+
+    def prefetch_related(self):
+        return sorted(self.precargar)
+
+    def only(self):
+        """Columnas para only(), o None si el modelo principal se carga completo"""
+        if '' in self.completos:
+            return None
+        return sorted(
+            columna for columna in self.columnas
+            if not any(columna.startswith(f'{ruta}__') for ruta in self.completos)
+        )
+
+
+def _recorrer(serializer, modelo, prefijo, a_muchos, plan):
+    calculadas = getattr(getattr(serializer, 'Meta', None), 'columnas_calculadas', {})
+    for campo in serializer.fields.values():
+        if campo.write_only or campo.source == '*':
+            continue
+
+        anidado = campo.child if isinstance(campo, serializers.ListSerializer) else campo
+        atributos = list(campo.source_attrs)
+        # La pk de una relación a un solo objeto ya está en la fila ('proyecto_id')
+        solo_pk = atributos.pop() if isinstance(campo, serializers.PrimaryKeyRelatedField) else None
+        ruta, modelo_actual, en_muchos = prefijo, modelo, a_muchos
+        while atributos:
+            relacion = _relacion(modelo_actual, atributos[0])
+            if relacion is None:
+                break
+            atributo = atributos.pop(0)
+            if not en_muchos and relacion.concrete and not relacion.many_to_many:
+                plan.columnas.add(_unir(ruta, atributo))
+            ruta = _unir(ruta, atributo)
+            en_muchos = en_muchos or relacion.many_to_many or relacion.one_to_many
+            (plan.precargar if en_muchos else plan.seleccionar).add(ruta)
+            modelo_actual = relacion.related_model
+
+        # Los prefetches cargan las filas completas; solo se eligen columnas fuera de ellos
+        if not en_muchos and solo_pk:
+            plan.columnas.add(_unir(ruta, solo_pk))
+        elif not en_muchos and atributos:
+            columna = _columna(modelo_actual, atributos[0])
+            if columna:
+                plan.columnas.add(_unir(ruta, columna))
+            elif ruta == prefijo and atributos[0] in calculadas:
+                plan.columnas.update(_unir(ruta, columna) for columna in calculadas[atributos[0]])
+            else:
+                plan.completos.add(ruta)
+
+        if not atributos and not solo_pk and isinstance(anidado, serializers.BaseSerializer):
+            _recorrer(anidado, modelo_actual, ruta, en_muchos, plan)
+
+
+def planificar(serializer, modelo=None):
+    """Lo que necesita leer el serializer para no hacer consultas por fila"""
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    plan = Plan()
+    _recorrer(serializer, modelo or serializer.Meta.model, '', False, plan)
+    return plan
+
+
+def optimizar(queryset, serializer, solo_columnas=False):
+    """
+    Añade al queryset los select_related y prefetch_related del serializer y,
+    con solo_columnas, limita la SELECT a las columnas que este lee
+    """
+    plan = planificar(serializer, queryset.model)
+    if plan.select_related():
+        queryset = queryset.select_related(*plan.select_related())
+    if plan.prefetch_related():
+        queryset = queryset.prefetch_related(*plan.prefetch_related())
+    if solo_columnas and plan.only():
+        queryset = queryset.only(*plan.only())
+    return queryset
+
+
+def con_columnas(queryset, *nombres):
+    """Añade `nombres` a las columnas de un queryset limitado con only()"""
+    cargadas, diferidas = queryset.query.deferred_loading
+    if diferidas or not cargadas:
+        return queryset
+    # Las anotaciones (como el rango de una búsqueda) ya van en la consulta
+    nombres = [nombre for nombre in nombres if nombre not in queryset.query.annotations]
+    return queryset.only(*cargadas, *nombres)
+
+
+class ConsultaOptimizadaMixin:
+    """
+    Mixin para viewsets: get_queryset() trae de una vez las relaciones que
+    lee el serializer de la vista. En las lecturas carga además solo las
+    columnas de los campos pedidos (?fields=, ?expand=); las escrituras cargan
+    la fila completa para que save() y las señales la vean entera.
+    """
+
+    def get_queryset(self):
+        return self.optimizar(super().get_queryset())
+
+    def optimizar(self, queryset, serializer_class=None):
+        serializer_class = serializer_class or self.get_serializer_class()
+        serializer = serializer_class(context=self.get_serializer_context())
+        return optimizar(queryset, serializer, solo_columnas=self.request.method in SAFE_METHODS)
@@ -0,0 +1,173 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.response import Response
+
+from .optimizacion import con_columnas
+
+
+def conteo_estimado(queryset, limite=10000):
+    """
+    Total aproximado de filas del queryset sin recorrer toda la tabla: en
+    PostgreSQL es la estimación del planificador; en otras bases de datos se
+    cuenta hasta `limite` filas.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows'])
+    return queryset.order_by()[:limite].count()
+
+
+class PaginacionPorClave(CursorPagination):
+    """
+    Paginación por cursor sobre todas las columnas de la ordenación, con el id
+    como desempate: cada página es un rango del índice, WHERE (fecha, id) < (...)
+    LIMIT n, sin OFFSET ni COUNT(*), y no se desplaza al llegar filas nuevas.
+    Con ?conteo=estimado la respuesta incluye un total aproximado.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    conteo_query_param = 'conteo'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not {'id', 'pk'} & {campo.lstrip('-') for campo in ordering}:
+            ordering += ('-id' if ordering[0].startswith('-') else 'id',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        self.conteo = None
+        if request.query_params.get(self.conteo_query_param) == 'estimado':
+            self.conteo = conteo_estimado(queryset)
+
+        reverse = self.cursor.reverse if self.cursor else False
+        posicion = self._valores(self.cursor.position) if self.cursor and self.cursor.position else None
+        ordering = tuple(_invertir(campo) for campo in self.ordering) if reverse else self.ordering
+        # La posición del cursor se lee de las columnas de la ordenación
+        queryset = con_columnas(queryset.order_by(*ordering), *(campo.lstrip('-') for campo in ordering))
+        if posicion is not None:
+            try:
+                queryset = queryset.filter(self._despues_de(ordering, posicion))
+            except (ValidationError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        resultados = list(queryset[:self.page_size + 1])
+        self.page = resultados[:self.page_size]
+        hay_mas = len(resultados) > len(self.page)
+        if reverse:
+            self.page.reverse()
+
+        primera = self._get_position_from_instance(self.page[0], self.ordering) if self.page else None
+        ultima = self._get_position_from_instance(self.page[-1], self.ordering) if self.page else None
+        origen = self.cursor.position if self.cursor else None
+        # Hacia atrás, las filas que quedan por recorrer están delante de la página
+        self.has_next = hay_mas if not reverse else origen is not None
+        self.has_previous = origen is not None if not reverse else hay_mas
+        self.next_position = ultima or origen
+        self.previous_position = primera or origen
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _despues_de(self, ordering, valores):
+        """Filas estrictamente posteriores a `valores` en el orden dado"""
+        siguientes = Q()
+        iguales = {}
+        for campo, valor in zip(ordering, valores):
+            nombre = campo.lstrip('-')
+            operador = 'lt' if campo.startswith('-') else 'gt'
+            siguientes |= Q(**iguales, **{f'{nombre}__{operador}': valor})
+            iguales[nombre] = valor
+        # La cota sobre la primera columna permite recorrer el índice como un rango
+        primera = ordering[0]
+        cota = {f"{primera.lstrip('-')}__{'lte' if primera.startswith('-') else 'gte'}": valores[0]}
+        return Q(**cota) & siguientes
+
+    def _valores(self, posicion):
+        try:
+            valores = json.loads(posicion)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(valores, list) or len(valores) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return valores
+
+    def _get_position_from_instance(self, instance, ordering):
+        valores = []
+        for campo in ordering:
+            nombre = campo.lstrip('-')
+            valor = instance[nombre] if isinstance(instance, dict) else getattr(instance, nombre)
+            valores.append(str(valor))
+        return json.dumps(valores)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.previous_position))
+
+    def get_paginated_response(self, data):
+        respuesta = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        }
+        if self.conteo is not None:
+            respuesta['conteo_estimado'] = self.conteo
+        respuesta['results'] = data
+        return Response(respuesta)
+
+    def get_paginated_response_schema(self, schema):
+        esquema = super().get_paginated_response_schema(schema)
+        esquema['properties']['conteo_estimado'] = {'type': 'integer', 'example': 1200}
+        return esquema
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [{
+            'name': self.conteo_query_param,
+            'required': False,
+            'in': 'query',
+            'description': "'estimado' para incluir un total aproximado",
+            'schema': {'type': 'string', 'enum': ['estimado']},
+        }]
+
+
+def _invertir(campo):
+    return campo[1:] if campo.startswith('-') else f'-{campo}'
+
+
+class ActividadPagination(PaginacionPorClave):
+    """Feed de actividad: rangos sobre el índice (usuario, fecha, id)"""
+    ordering = ('-fecha', '-id')
+
+
+class HistorialPagination(PaginacionPorClave):
+    """Historial completo: rangos sobre el índice (fecha, id)"""
+    ordering = ('-fecha', '-id')
+
+
+class NotificacionPagination(PaginacionPorClave):
+    """Notificaciones del usuario: rangos sobre el índice (usuario, fecha_creacion, id)"""
+    ordering = ('-fecha_creacion', '-id')
+
+
+class TareaPagination(PaginacionPorClave):
+    """Tareas: rangos sobre el índice (fecha_creacion, id)"""
+    ordering = ('-fecha_creacion', '-id')
@@ -0,0 +1,40 @@
+import orjson
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer con orjson. Los tipos que orjson no conoce (fechas con hora,
+    cadenas perezosas, Decimal...) pasan por el codificador de DRF, así que
+    la salida es la misma que con el renderer estándar.
+    """
+    opciones = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        opciones = self.opciones
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            opciones |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=JSONEncoder().default, option=opciones)
+
+
+class NDJSONRenderer(ORJSONRenderer):
+    """
+    Un objeto JSON por línea (application/x-ndjson). lineas() codifica las filas
+    de una en una para las respuestas en streaming; render() se usa para las
+    respuestas normales (errores, por ejemplo), que son una sola línea.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return b''.join(self.lineas(data if isinstance(data, list) else [data]))
+
+    def lineas(self, filas):
+        codificar = JSONEncoder().default
+        for fila in filas:
+            yield orjson.dumps(fila, default=codificar, option=self.opciones) + b'\n'
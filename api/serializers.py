@@ -1,9 +1,68 @@
 from rest_framework import serializers
-from proyectos.models import Proyecto, Tarea, Comentario, Historial, Notificacion
+from rest_framework.permissions import SAFE_METHODS
+from proyectos.models import Proyecto, Tarea, Comentario, Historial, Notificacion, Actividad
 from cuentas.models import User
 
 
-class UserSerializer(serializers.ModelSerializer):
+def _lista_parametro(request, nombre):
+    valor = request.query_params.get(nombre)
+    return {parte.strip() for parte in valor.split(',') if parte.strip()} if valor else set()
+
+
+class CamposDinamicosMixin:
+    """
+    Campos a la carta en las respuestas: ?fields=id,titulo deja solo esos
+    campos y ?expand=asignado_a pide completos los objetos anidados. Si se
+    usa cualquiera de los dos, los anidados que no están en expand se
+    devuelven como su pk. Solo se aplica al serializer raíz de la respuesta.
+
+    Solo cambian la salida: las escrituras validan y guardan con todos los
+    campos, y la respuesta se poda después con un serializer de solo lectura.
+    """
+
+    def get_fields(self):
+        campos = super().get_fields()
+        request = self.context.get('request')
+        if request is None or not self._es_raiz() or self._es_escritura(request):
+            return campos
+
+        pedidos = _lista_parametro(request, 'fields')
+        expandir = _lista_parametro(request, 'expand')
+        if pedidos:
+            campos = {nombre: campo for nombre, campo in campos.items() if nombre in pedidos}
+        if pedidos or expandir:
+            for nombre, campo in campos.items():
+                if nombre not in expandir and isinstance(campo, serializers.BaseSerializer):
+                    campos[nombre] = self._como_pk(nombre, campo)
+        return campos
+
+    def to_representation(self, instance):
+        request = self.context.get('request')
+        if (
+            request is not None and self._es_raiz() and self._es_escritura(request)
+            and (_lista_parametro(request, 'fields') or _lista_parametro(request, 'expand'))
+        ):
+            salida = type(self)(context={**self.context, 'solo_salida': True})
+            return salida.to_representation(instance)
+        return super().to_representation(instance)
+
+    def _es_escritura(self, request):
+        return request.method not in SAFE_METHODS and not self.context.get('solo_salida')
+
+    def _es_raiz(self):
+        padre = self.parent
+        return padre is None or isinstance(padre, serializers.ListSerializer) and padre.parent is None
+
+    def _como_pk(self, nombre, campo):
+        opciones = {'read_only': True}
+        if isinstance(campo, serializers.ListSerializer):
+            opciones['many'] = True
+        if campo.source and campo.source != nombre:
+            opciones['source'] = campo.source
+        return serializers.PrimaryKeyRelatedField(**opciones)
+
+
+class UserSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer para el modelo User"""
     class Meta:
         model = User
@@ -11,23 +70,23 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class ProyectoSerializer(serializers.ModelSerializer):
+class ProyectoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer para el modelo Proyecto"""
     creado_por = UserSerializer(read_only=True)
     miembros = UserSerializer(many=True, read_only=True)
     progreso = serializers.ReadOnlyField()
-    total_tareas = serializers.SerializerMethodField()
     
     class Meta:
         model = Proyecto
         fields = '__all__'
-        read_only_fields = ['fecha_creacion', 'fecha_actualizacion']
-    
-    def get_total_tareas(self, obj):
-        return obj.tareas.count()
+        read_only_fields = [
+            'fecha_creacion', 'fecha_actualizacion', 'total_tareas',
+            'tareas_pendientes', 'tareas_en_progreso', 'tareas_completadas',
+        ]
+        columnas_calculadas = {'progreso': ['total_tareas', 'tareas_completadas']}
 
 
-class TareaSerializer(serializers.ModelSerializer):
+class TareaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer para el modelo Tarea"""
     asignado_a = UserSerializer(read_only=True)
     creado_por = UserSerializer(read_only=True)
@@ -39,9 +98,65 @@ class TareaSerializer(serializers.ModelSerializer):
         model = Tarea
         fields = '__all__'
         read_only_fields = ['fecha_creacion', 'fecha_actualizacion']
+        columnas_calculadas = {
+            'esta_vencida': ['fecha_limite', 'estado'],
+            'dias_restantes': ['fecha_limite'],
+        }
+
 
+class TareaLoteSerializer(serializers.Serializer):
+    """Una operación del endpoint de tareas en lote (crear, actualizar o eliminar)"""
+    CAMPOS_TAREA = ['proyecto', 'asignado_a', 'titulo', 'descripcion', 'fecha_limite', 'estado', 'prioridad']
+    CAMPOS_REQUERIDOS = ['proyecto', 'titulo', 'descripcion', 'fecha_limite']
 
-class ComentarioSerializer(serializers.ModelSerializer):
+    accion = serializers.ChoiceField(choices=['crear', 'actualizar', 'eliminar'])
+    id = serializers.IntegerField(required=False)
+    proyecto = serializers.IntegerField(required=False)
+    asignado_a = serializers.IntegerField(required=False, allow_null=True)
+    titulo = serializers.CharField(max_length=200, required=False)
+    descripcion = serializers.CharField(required=False)
+    fecha_limite = serializers.DateField(required=False)
+    estado = serializers.ChoiceField(choices=Tarea.ESTADOS, required=False)
+    prioridad = serializers.ChoiceField(choices=Tarea.PRIORIDADES, required=False)
+
+    def validate(self, attrs):
+        if attrs['accion'] == 'crear':
+            faltantes = {
+                campo: ['Este campo es requerido para crear una tarea.']
+                for campo in self.CAMPOS_REQUERIDOS if campo not in attrs
+            }
+            if faltantes:
+                raise serializers.ValidationError(faltantes)
+        elif 'id' not in attrs:
+            raise serializers.ValidationError({'id': ['Este campo es requerido.']})
+        return attrs
+
+
+class SubPeticionSerializer(serializers.Serializer):
+    """Una subpetición del endpoint /api/batch/"""
+    CABECERAS = ['If-Match', 'If-None-Match', 'If-Modified-Since', 'If-Unmodified-Since']
+
+    metodo = serializers.ChoiceField(choices=['GET', 'POST'])
+    url = serializers.CharField()
+    cuerpo = serializers.JSONField(required=False)
+    cabeceras = serializers.DictField(child=serializers.CharField(), required=False)
+
+    def validate_url(self, valor):
+        if not valor.startswith('/api/'):
+            raise serializers.ValidationError('Debe ser una ruta de la API que empiece por /api/.')
+        return valor
+
+    def validate_cabeceras(self, valor):
+        permitidas = {nombre.lower() for nombre in self.CABECERAS}
+        no_permitidas = sorted(nombre for nombre in valor if nombre.lower() not in permitidas)
+        if no_permitidas:
+            raise serializers.ValidationError(
+                f"Cabeceras no permitidas: {', '.join(no_permitidas)}. Solo {', '.join(self.CABECERAS)}."
+            )
+        return valor
+
+
+class ComentarioSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer para el modelo Comentario"""
     usuario = UserSerializer(read_only=True)
     tarea_titulo = serializers.CharField(source='tarea.titulo', read_only=True)
@@ -49,10 +164,10 @@ class ComentarioSerializer(serializers.ModelSerializer):
     class Meta:
         model = Comentario
         fields = '__all__'
-        read_only_fields = ['fecha']
+        read_only_fields = ['fecha', 'fecha_actualizacion']
 
 
-class HistorialSerializer(serializers.ModelSerializer):
+class HistorialSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer para el modelo Historial"""
     usuario = UserSerializer(read_only=True)
     tarea_titulo = serializers.CharField(source='tarea.titulo', read_only=True)
@@ -63,7 +178,20 @@ class HistorialSerializer(serializers.ModelSerializer):
         read_only_fields = ['fecha']
 
 
-class NotificacionSerializer(serializers.ModelSerializer):
+class ActividadSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    """Serializer para las entradas del feed de actividad"""
+    accion = serializers.CharField(source='historial.accion', read_only=True)
+    usuario = UserSerializer(source='historial.usuario', read_only=True)
+    tarea = serializers.IntegerField(source='historial.tarea_id', read_only=True)
+    tarea_titulo = serializers.CharField(source='historial.tarea.titulo', read_only=True)
+
+    class Meta:
+        model = Actividad
+        fields = ['id', 'fecha', 'accion', 'usuario', 'tarea', 'tarea_titulo', 'proyecto']
+        read_only_fields = fields
+
+
+class NotificacionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     """Serializer para el modelo Notificacion"""
     usuario = UserSerializer(read_only=True)
     tarea_titulo = serializers.CharField(source='tarea.titulo', read_only=True)
@@ -0,0 +1,96 @@
+"""
+Subpeticiones de /api/batch/.
+
+Cada operación del lote se convierte en una petición interna que se resuelve
+con las URLs del proyecto y se pasa directamente a la vista de DRF, sin
+middleware y sin volver a autenticar: todas usan el usuario y el token de la
+petición del lote. El control de admisión se aplica a cada una según su nivel
+de coste, como en AdmisionMiddleware. La respuesta no se renderiza; sus datos
+van tal cual en la respuesta del lote, que se renderiza una sola vez. Una
+excepción en una subpetición se registra y se devuelve como su error 500, sin
+interrumpir el resto del lote.
+"""
+import io
+import json
+import logging
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.urls import Resolver404, resolve
+from rest_framework.views import APIView
+
+from proyectos.admision import Rechazada, admitir, nivel_de_vista
+
+
+logger = logging.getLogger(__name__)
+
+# Cabeceras de la petición del lote que no se heredan: las de contenido y las condicionales
+CABECERAS_PROPIAS = {
+    'CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_ACCEPT', 'HTTP_ACCEPT_ENCODING',
+    'HTTP_IF_MATCH', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE', 'HTTP_IF_UNMODIFIED_SINCE',
+}
+
+# Cabeceras de las respuestas que se devuelven con cada resultado
+CABECERAS_RESPUESTA = ('ETag', 'Last-Modified', 'Location', 'Retry-After')
+
+
+def construir(request, metodo, url, cuerpo=None, cabeceras=None):
+    """Petición interna de `request` (la del lote) con su usuario y su token"""
+    ruta, _, consulta = url.partition('?')
+    datos = b'' if cuerpo is None else json.dumps(cuerpo).encode()
+    entorno = {
+        clave: valor for clave, valor in request.META.items()
+        if clave not in CABECERAS_PROPIAS and not clave.startswith('wsgi.')
+    }
+    entorno.update({
+        'REQUEST_METHOD': metodo,
+        'PATH_INFO': ruta,
+        'QUERY_STRING': consulta,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(datos)),
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': io.BytesIO(datos),
+        'wsgi.url_scheme': request.scheme,
+    })
+    for nombre, valor in (cabeceras or {}).items():
+        entorno['HTTP_' + nombre.upper().replace('-', '_')] = valor
+
+    peticion = WSGIRequest(entorno)
+    peticion.user = request.user
+    # DRF usa estos atributos en lugar de sus clases de autenticación
+    peticion._force_auth_user = request.user
+    peticion._force_auth_token = request.auth
+    return peticion
+
+
+def ejecutar(peticion, excluidas=()):
+    """
+    (estado, cabeceras, datos) de la respuesta a `peticion`. Solo se ejecutan
+    vistas de DRF, y ninguna de las clases `excluidas`.
+    """
+    try:
+        coincidencia = resolve(peticion.path_info)
+    except Resolver404:
+        coincidencia = None
+    vista = getattr(coincidencia, 'func', None)
+    clase = getattr(vista, 'cls', None)
+    if clase is None or not issubclass(clase, APIView) or issubclass(clase, excluidas):
+        return 404, {}, {'detail': 'No encontrado.'}
+
+    try:
+        plaza = admitir(nivel_de_vista(vista, peticion.method), f'usuario:{peticion.user.pk}')
+    except Rechazada as rechazo:
+        return 429, {'Retry-After': str(rechazo.reintentar)}, {'detail': str(rechazo)}
+
+    peticion.resolver_match = coincidencia
+    try:
+        respuesta = vista(peticion, *coincidencia.args, **coincidencia.kwargs)
+    except Exception:
+        # Como el manejador de Django: se registra y la subpetición responde 500
+        logger.exception('Error en la subpetición %s %s', peticion.method, peticion.get_full_path())
+        return 500, {}, {'detail': 'Error interno del servidor.'}
+    finally:
+        # El cuerpo de una respuesta en streaming no se envía: no hay nada más que esperar
+        if plaza is not None:
+            plaza.liberar()
+    cabeceras = {nombre: respuesta[nombre] for nombre in CABECERAS_RESPUESTA if respuesta.has_header(nombre)}
+    return respuesta.status_code, cabeceras, getattr(respuesta, 'data', None)
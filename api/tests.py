@@ -1,3 +1,513 @@
-from django.test import TestCase
+import gzip
+import json
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.utils import timezone
+from django.test import override_settings
+from rest_framework.test import APITestCase, APITransactionTestCase
+
+from api import exportacion, listado
+from api.views import PeticionesLoteViewSet, ProyectoViewSet
+from proyectos.models import Actividad, Comentario, Historial, Notificacion, Proyecto, Tarea
+from proyectos.pruebas import crear_proyecto, crear_tarea, crear_usuario
+from proyectos.visibilidad import proyectos_visibles
+
+
+class BusquedaAPITests(APITestCase):
+
+    def setUp(self):
+        self.admin = crear_usuario('admin', role='admin')
+        proyecto = crear_proyecto(self.admin)
+        for numero in range(5):
+            crear_tarea(proyecto, titulo=f'Informe {numero}')
+        self.client.force_authenticate(self.admin)
+
+    def test_respuesta_con_topes(self):
+        respuesta = self.client.get('/api/tareas/?search=informe')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.data['results']), 5)
+        self.assertEqual(respuesta.data['busqueda'], {'limite': 500, 'candidatos': 5000, 'truncada': False})
+        self.assertEqual(respuesta['X-Busqueda-Truncada'], 'false')
+        self.assertIn('<mark>Informe</mark>', respuesta.data['results'][0]['resaltado']['titulo'])
+
+    def test_candidatos_truncados(self):
+        with mock.patch('proyectos.busqueda.CANDIDATOS', 3):
+            respuesta = self.client.get('/api/tareas/?search=informe')
+            exportacion = self.client.get('/api/tareas/export.ndjson?search=informe')
+        self.assertEqual(len(respuesta.data['results']), 3)
+        self.assertTrue(respuesta.data['busqueda']['truncada'])
+        self.assertEqual(respuesta['X-Busqueda-Truncada'], 'true')
+        self.assertEqual(exportacion['X-Busqueda-Truncada'], 'true')
+        self.assertEqual(len(b''.join(exportacion.streaming_content).splitlines()), 3)
+
+    def test_sin_busqueda_no_hay_topes(self):
+        respuesta = self.client.get('/api/tareas/')
+        self.assertNotIn('busqueda', respuesta.data)
+        self.assertFalse(respuesta.has_header('X-Busqueda-Truncada'))
+
+
+class ComentarioAPITests(APITestCase):
+
+    def setUp(self):
+        self.admin = crear_usuario('admin', role='admin')
+        self.otro = crear_usuario('otro', role='admin')
+        self.tarea = crear_tarea(crear_proyecto(self.admin))
+        self.client.force_authenticate(self.admin)
+
+    def test_crear_asigna_el_usuario(self):
+        respuesta = self.client.post('/api/comentarios/', {'tarea': self.tarea.pk, 'contenido': 'Revisado'})
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(self.tarea.comentarios.get().usuario, self.admin)
+
+    def test_filtros_orden_y_busqueda(self):
+        self.tarea.comentarios.create(usuario=self.admin, contenido='Primer borrador')
+        self.tarea.comentarios.create(usuario=self.otro, contenido='Segundo borrador')
+        respuesta = self.client.get(f'/api/comentarios/?usuario={self.otro.pk}')
+        self.assertEqual([fila['contenido'] for fila in respuesta.data['results']], ['Segundo borrador'])
+        respuesta = self.client.get('/api/comentarios/?ordering=fecha')
+        self.assertEqual([fila['contenido'] for fila in respuesta.data['results']], ['Primer borrador', 'Segundo borrador'])
+        respuesta = self.client.get('/api/comentarios/?search=borrador')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(len(respuesta.data['results']), 2)
+        self.assertIn('<mark>borrador</mark>', respuesta.data['results'][0]['resaltado']['contenido'])
+
+
+def fallar(self, request, *args, **kwargs):
+    raise RuntimeError('fallo')
+
+
+class LoteTests(APITransactionTestCase):
+    """POST /api/batch/: una subpetición que falla no interrumpe las demás"""
+
+    def setUp(self):
+        self.admin = crear_usuario('admin', role='admin')
+        self.proyecto = crear_proyecto(self.admin)
+        self.client.force_authenticate(self.admin)
+
+    def lote(self, *operaciones):
+        respuesta = self.client.post('/api/batch/', list(operaciones), format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        return [resultado['estado'] for resultado in respuesta.data], respuesta.data
+
+    def test_resultados_en_orden(self):
+        estados, datos = self.lote(
+            {'metodo': 'GET', 'url': f'/api/proyectos/{self.proyecto.pk}/'},
+            {'metodo': 'POST', 'url': '/api/comentarios/', 'cuerpo': {'tarea': crear_tarea(self.proyecto).pk, 'contenido': 'Hecho'}},
+            {'metodo': 'GET', 'url': '/api/no-existe/'},
+        )
+        self.assertEqual(estados, [200, 201, 404])
+        self.assertEqual(datos[0]['cuerpo']['nombre'], 'Proyecto')
+
+    def test_errores_mezclados(self):
+        tarea = crear_tarea(self.proyecto)
+        operaciones = [
+            {'metodo': 'GET', 'url': f'/api/proyectos/{self.proyecto.pk}/'},
+            {'metodo': 'GET', 'url': f'/api/tareas/{tarea.pk}/'},
+            {'metodo': 'POST', 'url': '/api/comentarios/', 'cuerpo': {'tarea': tarea.pk, 'contenido': 'Hecho'}},
+            {'metodo': 'GET', 'url': f'/api/proyectos/{self.proyecto.pk}/'},
+        ]
+        for concurrente in (True, False):
+            with self.subTest(concurrente=concurrente), \
+                    mock.patch.object(PeticionesLoteViewSet, 'concurrente', concurrente), \
+                    mock.patch.object(ProyectoViewSet, 'retrieve', fallar), \
+                    self.assertLogs('api.subpeticiones', 'ERROR'):
+                estados, datos = self.lote(*operaciones)
+            self.assertEqual(estados, [500, 200, 201, 500])
+            self.assertEqual(datos[0]['cuerpo'], {'detail': 'Error interno del servidor.'})
+            self.assertEqual(datos[1]['cuerpo']['id'], tarea.pk)
+
+    def test_el_error_libera_la_plaza(self):
+        """La plaza de admisión se devuelve aunque la vista falle"""
+        with mock.patch('api.subpeticiones.admitir') as admitir, \
+                mock.patch.object(ProyectoViewSet, 'retrieve', fallar), \
+                self.assertLogs('api.subpeticiones', 'ERROR'):
+            estados, _ = self.lote({'metodo': 'GET', 'url': f'/api/proyectos/{self.proyecto.pk}/'})
+        self.assertEqual(estados, [500])
+        admitir.return_value.liberar.assert_called_once_with()
+
+
+class ValidacionCondicionalTests(APITestCase):
+
+    def setUp(self):
+        self.admin = crear_usuario('admin', role='admin')
+        self.proyecto = crear_proyecto(self.admin)
+        self.tarea = crear_tarea(self.proyecto)
+        self.client.force_authenticate(self.admin)
+
+    def etag(self, url='/api/tareas/'):
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta['ETag']
+
+    def test_listado_sin_consultas(self):
+        etag = self.etag()
+        with self.assertNumQueries(0):
+            respuesta = self.client.get('/api/tareas/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+
+    def test_parametros_normalizados(self):
+        self.assertEqual(self.etag('/api/tareas/?estado=pendiente&prioridad=alta'),
+                         self.etag('/api/tareas/?prioridad=alta&estado=pendiente'))
+        self.assertEqual(self.etag('/api/tareas/?search='), self.etag())
+        self.assertNotEqual(self.etag('/api/tareas/?estado=pendiente'), self.etag())
+
+    def test_cambia_con_altas_cambios_y_borrados(self):
+        etags = [self.etag()]
+        for cambio in (
+            lambda: crear_tarea(self.proyecto, titulo='Otra'),
+            lambda: Tarea.objects.filter(pk=self.tarea.pk).update(estado='completada'),
+            lambda: self.tarea.delete(),
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                cambio()
+            etags.append(self.etag())
+        self.assertEqual(len(set(etags)), len(etags))
+
+    def test_otro_usuario_otro_etag(self):
+        etag = self.etag('/api/proyectos/')
+        self.client.force_authenticate(crear_usuario('miembro'))
+        respuesta = self.client.get('/api/proyectos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_detalle(self):
+        url = f'/api/tareas/{self.tarea.pk}/'
+        respuesta = self.client.get(url)
+        self.assertIn('Last-Modified', respuesta)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 304)
+        self.tarea.titulo = 'Cambiada'
+        self.tarea.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 200)
+
+    def test_cambia_con_el_dia(self):
+        """dias_restantes y esta_vencida dependen de la fecha de hoy"""
+        url = f'/api/tareas/{self.tarea.pk}/'
+        respuesta = self.client.get(url)
+        etag_listado = self.etag()
+        pasado_manana = timezone.now() + timedelta(days=2)
+        with mock.patch('django.utils.timezone.now', return_value=pasado_manana):
+            nueva = self.client.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag'])
+            self.assertEqual(nueva.status_code, 200)
+            self.assertEqual(nueva.data['dias_restantes'], respuesta.data['dias_restantes'] - 2)
+            condicional = self.client.get(url, HTTP_IF_MODIFIED_SINCE=respuesta['Last-Modified'])
+            self.assertEqual(condicional.status_code, 200)
+            self.assertEqual(self.client.get('/api/tareas/', HTTP_IF_NONE_MATCH=etag_listado).status_code, 200)
+
+    def test_cambia_al_renombrar_un_usuario(self):
+        """Los usuarios anidados (asignado_a, creado_por) forman parte de la respuesta"""
+        self.tarea.asignado_a = crear_usuario('asignado')
+        self.tarea.save()
+        url = f'/api/tareas/{self.tarea.pk}/'
+        etag_detalle, etag_listado = self.etag(url), self.etag()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tarea.asignado_a.username = 'renombrado'
+            self.tarea.asignado_a.save()
+        detalle = self.client.get(url, HTTP_IF_NONE_MATCH=etag_detalle)
+        self.assertEqual(detalle.status_code, 200)
+        self.assertEqual(detalle.data['asignado_a']['username'], 'renombrado')
+        self.assertEqual(self.client.get('/api/tareas/', HTTP_IF_NONE_MATCH=etag_listado).status_code, 200)
+
+    def test_iniciar_sesion_no_cambia_el_etag(self):
+        etag = self.etag()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.last_login = timezone.now()
+            self.admin.save(update_fields=['last_login'])
+        self.assertEqual(self.client.get('/api/tareas/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_cambia_al_borrar_un_usuario(self):
+        asignado = crear_usuario('asignado')
+        self.tarea.asignado_a = asignado
+        self.tarea.save()
+        url = f'/api/tareas/{self.tarea.pk}/'
+        etag = self.etag(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            asignado.delete()
+        detalle = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(detalle.status_code, 200)
+        self.assertIsNone(detalle.data['asignado_a'])
+
+
+class ConsultasListadoTests(APITestCase):
+    """Cada listado cuesta las mismas consultas sea cual sea el tamaño de la página"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = crear_usuario('admin', role='admin')
+        cls.miembro = crear_usuario('miembro')
+        for numero in range(11):
+            crear_usuario(f'usuario{numero}')
+        for numero in range(3):
+            proyecto = crear_proyecto(cls.admin, nombre=f'Proyecto {numero}', fecha_inicio=date(2026, 1, numero + 1))
+            proyecto.miembros.add(cls.miembro)
+            for indice in range(4):
+                tarea = crear_tarea(proyecto, asignado_a=cls.miembro, titulo=f'Tarea {indice}')
+                Comentario.objects.create(tarea=tarea, usuario=cls.admin, contenido='Revisado')
+                historial = Historial.objects.create(tarea=tarea, usuario=cls.admin, accion='Creada')
+                Actividad.objects.create(usuario=cls.miembro, historial=historial, proyecto=proyecto, fecha=historial.fecha)
+                Notificacion.objects.create(usuario=cls.miembro, tarea=tarea, mensaje='Asignada', tipo='asignacion')
+
+    def setUp(self):
+        cache.clear()
+
+    def comprobar(self, usuario, url, consultas, variantes):
+        """`variantes`: parámetros que devuelven páginas de distinto tamaño"""
+        self.client.force_authenticate(usuario)
+        tamanos = set()
+        for parametros in variantes:
+            with self.subTest(url=url, parametros=parametros), self.assertNumQueries(consultas):
+                respuesta = self.client.get(url, parametros)
+            self.assertEqual(respuesta.status_code, 200)
+            tamanos.add(len(respuesta.data['results']))
+        self.assertEqual(len(tamanos), len(variantes))
+
+    def test_paginacion_por_cursor(self):
+        for usuario, url in (
+            (self.admin, '/api/tareas/'),
+            (self.admin, '/api/historial/'),
+            (self.miembro, '/api/notificaciones/'),
+            (self.miembro, '/api/actividad/'),
+        ):
+            self.comprobar(usuario, url, 1, [{'page_size': 1}, {'page_size': 5}, {'page_size': 20}])
+
+    def test_paginacion_por_numero(self):
+        # Página completa (10 filas) y última página
+        self.comprobar(self.admin, '/api/comentarios/', 2, [{}, {'page': 2}])
+        self.comprobar(self.admin, '/api/usuarios/', 2, [{}, {'page': 2}])
+
+    def test_proyectos(self):
+        # COUNT, la página y los miembros de sus proyectos
+        self.comprobar(self.admin, '/api/proyectos/', 3, [{}, {'fecha_inicio': '2026-01-01'}])
+        # Con los proyectos visibles del member en la caché
+        proyectos_visibles(self.miembro)
+        self.comprobar(self.miembro, '/api/proyectos/', 3, [{}, {'fecha_inicio': '2026-01-01'}])
+
+
+class PaginacionCursorTests(APITestCase):
+
+    def setUp(self):
+        self.admin = crear_usuario('admin', role='admin')
+        proyecto = crear_proyecto(self.admin)
+        # Misma fecha de creación en varias filas: el id desempata
+        self.tareas = [crear_tarea(proyecto, titulo=f'Tarea {numero}') for numero in range(7)]
+        Tarea.objects.filter(pk__in=[tarea.pk for tarea in self.tareas[2:5]]).update(
+            fecha_creacion=self.tareas[2].fecha_creacion
+        )
+        self.orden = list(Tarea.objects.order_by('-fecha_creacion', '-id').values_list('pk', flat=True))
+        self.client.force_authenticate(self.admin)
+
+    def paginas(self, url):
+        paginas = []
+        while url:
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            paginas.append(respuesta.data)
+            url = respuesta.data['next']
+        return paginas
+
+    def test_recorrer_todas_las_paginas(self):
+        paginas = self.paginas('/api/tareas/?page_size=3')
+        self.assertEqual([len(pagina['results']) for pagina in paginas], [3, 3, 1])
+        self.assertEqual([tarea['id'] for pagina in paginas for tarea in pagina['results']], self.orden)
+        self.assertIsNone(paginas[0]['previous'])
+
+    def test_volver_atras(self):
+        primera, segunda, _ = self.paginas('/api/tareas/?page_size=3')
+        anterior = self.client.get(segunda['previous']).data
+        self.assertEqual(anterior['results'], primera['results'])
+        self.assertIsNotNone(anterior['next'])
+
+    def test_filas_nuevas_no_desplazan_las_paginas(self):
+        primera = self.client.get('/api/tareas/?page_size=3').data
+        crear_tarea(self.tareas[0].proyecto, titulo='Nueva')
+        segunda = self.client.get(primera['next']).data
+        self.assertEqual([tarea['id'] for tarea in segunda['results']], self.orden[3:6])
+
+    def test_cursor_no_valido(self):
+        self.assertEqual(self.client.get('/api/tareas/?cursor=no-valido').status_code, 404)
+
+    def test_conteo_estimado(self):
+        respuesta = self.client.get('/api/tareas/?page_size=3&conteo=estimado')
+        self.assertEqual(respuesta.data['conteo_estimado'], 7)
+        self.assertNotIn('conteo_estimado', self.client.get('/api/tareas/').data)
+
+
+class CamposDinamicosEscrituraTests(APITransactionTestCase):
+    """?fields= y ?expand= solo podan la respuesta: las escrituras usan todos los campos"""
+
+    def setUp(self):
+        self.admin = crear_usuario('admin', role='admin')
+        self.proyecto = crear_proyecto(self.admin)
+        self.tarea = crear_tarea(self.proyecto, asignado_a=self.admin)
+        self.client.force_authenticate(self.admin)
+
+    def test_patch(self):
+        respuesta = self.client.patch(
+            f'/api/tareas/{self.tarea.pk}/?fields=id,titulo',
+            {'estado': 'completada', 'titulo': 'Cambiada'}, format='json',
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data, {'id': self.tarea.pk, 'titulo': 'Cambiada'})
+        self.tarea.refresh_from_db()
+        self.assertEqual((self.tarea.titulo, self.tarea.estado), ('Cambiada', 'completada'))
+        self.assertTrue(Historial.objects.filter(tarea=self.tarea, accion__contains="a 'completada'").exists())
+
+    def test_post_valida_todos_los_campos(self):
+        respuesta = self.client.post(
+            '/api/tareas/?fields=id', {'proyecto': self.proyecto.pk, 'titulo': 'Nueva'}, format='json'
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('fecha_limite', respuesta.data)
+        self.assertIn('descripcion', respuesta.data)
+
+    def test_post(self):
+        respuesta = self.client.post('/api/tareas/?fields=id,creado_por&expand=creado_por', {
+            'proyecto': self.proyecto.pk, 'titulo': 'Nueva', 'descripcion': 'Descripción',
+            'fecha_limite': '2026-02-01', 'estado': 'en_progreso',
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(set(respuesta.data), {'id', 'creado_por'})
+        self.assertEqual(respuesta.data['creado_por']['username'], 'admin')
+        self.assertEqual(Tarea.objects.get(pk=respuesta.data['id']).estado, 'en_progreso')
+
+    def test_anidados_como_pk(self):
+        respuesta = self.client.patch(
+            f'/api/tareas/{self.tarea.pk}/?fields=id,asignado_a', {'prioridad': 'alta'}, format='json'
+        )
+        self.assertEqual(respuesta.data, {'id': self.tarea.pk, 'asignado_a': self.admin.pk})
+
+
+class ListadoRapidoTests(APITestCase):
+    """El listado rápido devuelve lo mismo que los serializers"""
+
+    URLS = (
+        '/api/tareas/',
+        '/api/tareas/?fields=id,titulo,asignado_a',
+        '/api/tareas/?expand=asignado_a&ordering=fecha_limite',
+        '/api/comentarios/',
+        '/api/comentarios/?fields=id,usuario,tarea_titulo',
+        '/api/historial/',
+        '/api/actividad/',
+        '/api/notificaciones/',
+    )
+
+    def setUp(self):
+        self.admin = crear_usuario('admin', role='admin')
+        proyecto = crear_proyecto(self.admin)
+        for numero in range(3):
+            tarea = crear_tarea(proyecto, asignado_a=self.admin if numero else None, titulo=f'Tarea {numero}')
+            Comentario.objects.create(tarea=tarea, usuario=self.admin, contenido='Revisado')
+            historial = Historial.objects.create(tarea=tarea, usuario=self.admin, accion='Creada')
+            Actividad.objects.create(usuario=self.admin, historial=historial, proyecto=proyecto, fecha=historial.fecha)
+            Notificacion.objects.create(usuario=self.admin, tarea=tarea, mensaje='Asignada', tipo='asignacion')
+        self.client.force_authenticate(self.admin)
+
+    def test_misma_salida_que_el_serializer(self):
+        for url in self.URLS:
+            with self.subTest(url=url):
+                with mock.patch.object(listado, 'Codificador', wraps=listado.Codificador) as codificador:
+                    rapido = self.client.get(url)
+                self.assertTrue(codificador.called)
+                with override_settings(API_LISTADO_RAPIDO=False):
+                    normal = self.client.get(url)
+                self.assertEqual(rapido.status_code, 200)
+                self.assertEqual(rapido.json(), normal.json())
+
+    @override_settings(API_LISTADO_RAPIDO=False)
+    def test_desactivado(self):
+        with mock.patch.object(listado, 'Codificador') as codificador:
+            self.assertEqual(self.client.get('/api/tareas/').status_code, 200)
+        codificador.assert_not_called()
+
+
+class ExportacionTests(APITestCase):
+    """GET /api/tareas/export.ndjson: mismas filas que el listado, una por línea y en bloques"""
+
+    URL = '/api/tareas/export.ndjson'
+
+    def setUp(self):
+        # Cada exportación gasta el coste del nivel 'pesado' del presupuesto de admisión
+        cache.clear()
+        self.admin = crear_usuario('admin', role='admin')
+        miembro = crear_usuario('miembro')
+        self.proyecto = crear_proyecto(self.admin)
+        for numero in range(5):
+            crear_tarea(
+                self.proyecto, asignado_a=miembro if numero % 2 else None, titulo=f'Tarea {numero}',
+                estado='completada' if numero == 4 else 'pendiente',
+            )
+        self.client.force_authenticate(self.admin)
+
+    def exportar(self, consulta='', **kwargs):
+        respuesta = self.client.get(self.URL + consulta, **kwargs)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(respuesta.streaming)
+        return respuesta, b''.join(respuesta.streaming_content)
+
+    def lineas(self, cuerpo):
+        self.assertTrue(cuerpo.endswith(b'\n'))
+        return [json.loads(linea) for linea in cuerpo.splitlines()]
+
+    def test_mismas_filas_que_el_listado(self):
+        for consulta in ('', '?estado=pendiente&ordering=titulo', '?fields=id,titulo,asignado_a&search=Tarea'):
+            with self.subTest(consulta=consulta):
+                respuesta, cuerpo = self.exportar(consulta)
+                self.assertEqual(respuesta['Content-Type'], 'application/x-ndjson')
+                self.assertEqual(respuesta['Content-Disposition'], 'attachment; filename="tareas.ndjson"')
+                listado = self.client.get('/api/tareas/' + consulta).json()['results']
+                # El resaltado de la búsqueda es solo para mostrar el listado
+                for fila in listado:
+                    fila.pop('resaltado', None)
+                self.assertEqual(self.lineas(cuerpo), listado)
+
+    def test_requiere_autenticacion(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.URL).status_code, 401)
+
+    def test_en_bloques(self):
+        with mock.patch.object(exportacion.ExportacionMixin, 'filas_por_bloque', 2):
+            respuesta = self.client.get(self.URL)
+            bloques = list(respuesta.streaming_content)
+        self.assertEqual([bloque.count(b'\n') for bloque in bloques], [2, 2, 1])
+
+    def test_sin_listado_rapido(self):
+        _, rapido = self.exportar()
+        with override_settings(API_LISTADO_RAPIDO=False), \
+                mock.patch.object(exportacion, 'Codificador', wraps=listado.Codificador) as codificador:
+            _, normal = self.exportar()
+        codificador.assert_not_called()
+        self.assertEqual(self.lineas(normal), self.lineas(rapido))
+
+    def test_gzip(self):
+        respuesta, cuerpo = self.exportar(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        self.assertEqual(len(self.lineas(gzip.decompress(cuerpo))), 5)
+
+
+class GZipAPITests(APITestCase):
+    """Solo se comprimen las respuestas de la API de más de 4 KB"""
+
+    def setUp(self):
+        self.admin = crear_usuario('admin', role='admin')
+        self.proyecto = crear_proyecto(self.admin)
+        self.tarea = crear_tarea(self.proyecto)
+        self.client.force_authenticate(self.admin)
+
+    def test_pequena_sin_comprimir(self):
+        respuesta = self.client.get(f'/api/tareas/{self.tarea.pk}/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(respuesta.has_header('Content-Encoding'))
+        self.assertEqual(respuesta.json()['id'], self.tarea.pk)
+
+    def test_grande_comprimida(self):
+        for numero in range(9):
+            crear_tarea(self.proyecto, titulo=f'Tarea {numero}', descripcion='Descripción larga. ' * 40)
+        sin_gzip = self.client.get('/api/tareas/')
+        self.assertGreater(len(sin_gzip.content), 4096)
+        self.assertFalse(sin_gzip.has_header('Content-Encoding'))
+
+        respuesta = self.client.get('/api/tareas/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', respuesta['Vary'])
+        self.assertLess(len(respuesta.content), len(sin_gzip.content))
+        self.assertEqual(json.loads(gzip.decompress(respuesta.content)), sin_gzip.json())
@@ -1,12 +1,18 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+
+from proyectos.admision import nivel_coste
 from .views import (
     UserViewSet,
     ProyectoViewSet, 
     TareaViewSet, 
     ComentarioViewSet, 
     HistorialViewSet,
-    NotificacionViewSet
+    ActividadViewSet,
+    NotificacionViewSet,
+    SincronizacionViewSet,
+    PeticionesLoteViewSet
 )
 
 router = DefaultRouter()
@@ -15,11 +21,17 @@ router.register(r'proyectos', ProyectoViewSet, basename='proyecto')
 router.register(r'tareas', TareaViewSet, basename='tarea')
 router.register(r'comentarios', ComentarioViewSet, basename='comentario')
 router.register(r'historial', HistorialViewSet, basename='historial')
+router.register(r'actividad', ActividadViewSet, basename='actividad')
 router.register(r'notificaciones', NotificacionViewSet, basename='notificacion')
+router.register(r'sincronizacion', SincronizacionViewSet, basename='sincronizacion')
+router.register(r'batch', PeticionesLoteViewSet, basename='batch')
 
 app_name = 'api'
 
 urlpatterns = [
     path('', include(router.urls)),
+    # Comprobar la contraseña es caro: cuenta como una petición de nivel medio
+    path('token/', nivel_coste('medio')(TokenObtainPairView.as_view()), name='token_obtain_pair'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('auth/', include('rest_framework.urls')),  # Login/logout para API browsable
 ]
@@ -0,0 +1,94 @@
+"""
+ETag y Last-Modified para los GET de la API.
+
+El detalle se valida con las fechas de actualización de la fila (una consulta
+de values_list, sin cargar ni serializar el objeto). El listado no consulta la
+BD: su ETag sale de la versión 'global' de proyectos.versiones, que cambia con
+cualquier alta, cambio o borrado de proyectos y tareas (también en bloque),
+del usuario y su rol, que deciden el alcance, y de los parámetros de la
+petición. Si el cliente ya tiene esa versión (If-None-Match, o
+If-Modified-Since en el detalle) se responde 304 sin serializar.
+
+Los cambios de los usuarios anidados (creado_por, asignado_a, miembros) cambian
+la fecha de actualización de sus proyectos y tareas (ver proyectos/signals.py).
+Las vistas con campos que dependen del día (depende_del_dia) añaden la fecha de
+hoy a los validadores: al cambiar el día cambian ETag y Last-Modified.
+"""
+import hashlib
+from datetime import datetime, time
+
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from proyectos.versiones import versiones
+
+
+def _etag(*partes):
+    return '"%s"' % hashlib.sha1(repr(partes).encode()).hexdigest()
+
+
+class ValidacionCondicionalMixin:
+    """
+    Mixin para viewsets con fecha_actualizacion. `campos_validacion` son las
+    fechas de las que depende la representación (por ejemplo la del proyecto
+    para el nombre del proyecto de una tarea).
+    """
+    campos_validacion = ('fecha_actualizacion',)
+    # Campos calculados con la fecha de hoy (días restantes, vencida...)
+    depende_del_dia = False
+
+    def retrieve(self, request, *args, **kwargs):
+        clave = self.lookup_url_kwarg or self.lookup_field
+        fechas = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[clave]}
+        ).values_list(*self.campos_validacion).first()
+        if fechas is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag, modificado = self._validadores(request, fechas)
+        respuesta = self._condicional(request, etag, modificado)
+        if respuesta is None:
+            respuesta = self._validada(super().retrieve(request, *args, **kwargs), etag, modificado)
+        return respuesta
+
+    def list(self, request, *args, **kwargs):
+        # El usuario y su rol distinguen listados con distinto alcance
+        usuario = request.user
+        etag, _ = self._validadores(request, (), usuario.pk, getattr(usuario, 'role', None), versiones('global'))
+        # Sin Last-Modified: la versión no dice cuándo cambiaron los datos
+        modificado = None
+        respuesta = self._condicional(request, etag, modificado)
+        if respuesta is None:
+            respuesta = self._validada(super().list(request, *args, **kwargs), etag, modificado)
+        return respuesta
+
+    def _validadores(self, request, fechas, *partes):
+        """(ETag, última modificación) de la respuesta a `request`"""
+        if self.depende_del_dia:
+            # La representación cambia también a medianoche
+            hoy = timezone.localdate()
+            partes += (hoy,)
+            fechas = (*fechas, timezone.make_aware(datetime.combine(hoy, time.min)))
+        # Los parámetros se ordenan: ?a=1&b=2 y ?b=2&a=1 son el mismo listado
+        parametros = sorted((clave, valores) for clave, valores in request.query_params.lists() if any(valores))
+        etag = _etag(
+            type(self).__name__, self.action, tuple(fechas), partes,
+            parametros, request.accepted_renderer.format,
+        )
+        fechas = [fecha for fecha in fechas if fecha is not None]
+        return etag, int(max(fechas).timestamp()) if fechas else None
+
+    def _condicional(self, request, etag, modificado):
+        """304 (o 412) si el cliente ya tiene esta versión; None si hay que responder"""
+        respuesta = get_conditional_response(request, etag=etag, last_modified=modificado)
+        if respuesta is not None:
+            self._validada(respuesta, etag, modificado)
+        return respuesta
+
+    def _validada(self, respuesta, etag, modificado):
+        if respuesta.status_code in (200, 304):
+            respuesta['ETag'] = etag
+            if modificado is not None:
+                respuesta['Last-Modified'] = http_date(modificado)
+        return respuesta
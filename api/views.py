@@ -1,23 +1,50 @@
+import asyncio
+
+from asgiref.sync import async_to_sync
 from django.shortcuts import render
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.core import signing
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import timedelta
 from django_filters.rest_framework import DjangoFilterBackend
 
-from proyectos.models import Proyecto, Tarea, Comentario, Historial, Notificacion
+from proyectos.models import Proyecto, Tarea, Comentario, Historial, Notificacion, Actividad
+from proyectos.admision import nivel_coste
+from proyectos.asincrono import en_hilo_compartido
+from proyectos.lotes import crear_tareas, actualizar_tareas, eliminar_tareas
+from proyectos.notificaciones import bandeja
+from proyectos.resumenes import serie
+from proyectos.sincronizacion import MARGEN, RETENCION, eliminaciones, visibles
+from proyectos.versiones import versiones_de_peticion
+from proyectos.visibilidad import filtrar_visibles
 from cuentas.models import User
+from .busqueda import BusquedaFilter, OrdenBusquedaFilter, ResaltadoMixin
+from .exportacion import ExportacionMixin
+from .listado import ListadoRapidoMixin
+from .optimizacion import ConsultaOptimizadaMixin, con_columnas, optimizar
+from .validacion import ValidacionCondicionalMixin
+from .subpeticiones import construir, ejecutar
+from .pagination import ActividadPagination, HistorialPagination, NotificacionPagination, TareaPagination
 from .serializers import (
     ProyectoSerializer, 
     TareaSerializer, 
+    TareaLoteSerializer, 
     ComentarioSerializer, 
     HistorialSerializer,
+    ActividadSerializer,
     NotificacionSerializer,
+    SubPeticionSerializer,
     UserSerializer
 )
 
 
-class UserViewSet(viewsets.ReadOnlyModelViewSet):
+class UserViewSet(ConsultaOptimizadaMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para usuarios (solo lectura)
     """
@@ -29,19 +56,24 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['username', 'date_joined']
 
 
-class ProyectoViewSet(viewsets.ModelViewSet):
+class ProyectoViewSet(ResaltadoMixin, ValidacionCondicionalMixin, ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     """
     ViewSet para proyectos con filtros, búsqueda y ordenamiento
     """
     queryset = Proyecto.objects.all()
     serializer_class = ProyectoSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, BusquedaFilter, OrdenBusquedaFilter]
     filterset_fields = ['creado_por', 'fecha_inicio', 'fecha_fin']
-    search_fields = ['nombre', 'descripcion']
     ordering_fields = ['fecha_inicio', 'fecha_fin', 'nombre']
     ordering = ['-fecha_inicio']
     
+    def get_queryset(self):
+        """
+        Members: solo los proyectos que ven (ver proyectos/visibilidad.py)
+        """
+        return filtrar_visibles(super().get_queryset(), self.request.user)
+    
     def perform_create(self, serializer):
         """Asignar automáticamente el usuario actual como creador"""
         serializer.save(creado_por=self.request.user)
@@ -52,8 +84,8 @@ class ProyectoViewSet(viewsets.ModelViewSet):
         Endpoint personalizado para obtener todas las tareas de un proyecto
         """
         proyecto = self.get_object()
-        tareas = proyecto.tareas.all()
-        serializer = TareaSerializer(tareas, many=True)
+        tareas = self.optimizar(Tarea.objects.filter(proyecto=proyecto), TareaSerializer)
+        serializer = TareaSerializer(tareas, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
@@ -65,32 +97,83 @@ class ProyectoViewSet(viewsets.ModelViewSet):
         return Response({
             'progreso': proyecto.calcular_progreso(),
             'esta_atrasado': proyecto.esta_atrasado(),
-            'total_tareas': proyecto.tareas.count(),
-            'tareas_completadas': proyecto.tareas.filter(estado='completada').count(),
-            'tareas_pendientes': proyecto.tareas.filter(estado='pendiente').count(),
-            'tareas_en_progreso': proyecto.tareas.filter(estado='en_progreso').count(),
+            'total_tareas': proyecto.total_tareas,
+            'tareas_completadas': proyecto.tareas_completadas,
+            'tareas_pendientes': proyecto.tareas_pendientes,
+            'tareas_en_progreso': proyecto.tareas_en_progreso,
         })
 
+    @action(detail=True, methods=['get'])
+    @nivel_coste('medio')
+    def serie(self, request, pk=None):
+        """
+        Evolución diaria del proyecto (?desde=AAAA-MM-DD&hasta=AAAA-MM-DD)
+        """
+        return self._respuesta_serie(request, self.get_object().pk)
+
+    @action(detail=False, methods=['get'], url_path='serie')
+    @nivel_coste('medio')
+    def serie_global(self, request):
+        """
+        Evolución diaria de todos los proyectos (?desde=AAAA-MM-DD&hasta=AAAA-MM-DD)
+        """
+        return self._respuesta_serie(request, None)
+
+    dias_serie_maximo = 366
+
+    def _respuesta_serie(self, request, proyecto_id):
+        fechas = {}
+        for parametro in ('desde', 'hasta'):
+            valor = request.query_params.get(parametro)
+            try:
+                fechas[parametro] = parse_date(valor) if valor else None
+            except ValueError:
+                fechas[parametro] = None
+            if valor and fechas[parametro] is None:
+                return Response({'error': f"Fecha no válida en '{parametro}'"}, status=status.HTTP_400_BAD_REQUEST)
+
+        hasta = fechas['hasta'] or timezone.localdate()
+        desde = fechas['desde'] or hasta - timedelta(days=29)
+        if desde > hasta or (hasta - desde).days >= self.dias_serie_maximo:
+            return Response(
+                {'error': f'El rango debe ser de 1 a {self.dias_serie_maximo} días'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response(serie(desde, hasta, proyecto_id))
+
 
-class TareaViewSet(viewsets.ModelViewSet):
+class TareaViewSet(
+    ResaltadoMixin, ValidacionCondicionalMixin, ExportacionMixin, ListadoRapidoMixin, ConsultaOptimizadaMixin,
+    viewsets.ModelViewSet,
+):
     """
     ViewSet para tareas con filtros avanzados
     """
     queryset = Tarea.objects.all()
     serializer_class = TareaSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = TareaPagination
+    filter_backends = [DjangoFilterBackend, BusquedaFilter, OrdenBusquedaFilter]
     filterset_fields = ['proyecto', 'asignado_a', 'estado', 'prioridad', 'fecha_limite']
-    search_fields = ['titulo', 'descripcion']
     ordering_fields = ['fecha_limite', 'prioridad', 'fecha_creacion']
     ordering = ['-fecha_creacion']
+    nombre_exportacion = 'tareas'
+    # proyecto_nombre depende también del proyecto
+    campos_validacion = ('fecha_actualizacion', 'proyecto__fecha_actualizacion')
+    # esta_vencida y dias_restantes
+    depende_del_dia = True
+    # Número máximo de operaciones aceptadas por el endpoint en lote
+    lote_maximo = 1000
     
     def perform_create(self, serializer):
         """Asignar automáticamente el usuario actual como creador"""
-        tarea = serializer.save(creado_por=self.request.user)
-        # Pasar el usuario actual para el historial
-        tarea._current_user = self.request.user
-        tarea.save()
+        # El creador es también el usuario del historial de creación
+        serializer.save(creado_por=self.request.user)
+    
+    def perform_update(self, serializer):
+        """Pasar el usuario actual para el historial"""
+        serializer.instance._current_user = self.request.user
+        serializer.save()
     
     def get_queryset(self):
         """
@@ -107,7 +190,7 @@ class TareaViewSet(viewsets.ModelViewSet):
         """
         Endpoint para obtener tareas del usuario autenticado
         """
-        tareas = Tarea.objects.filter(asignado_a=request.user)
+        tareas = self.optimizar(Tarea.objects.filter(asignado_a=request.user))
         serializer = self.get_serializer(tareas, many=True)
         return Response(serializer.data)
     
@@ -120,54 +203,174 @@ class TareaViewSet(viewsets.ModelViewSet):
         from datetime import timedelta
         
         fecha_limite = timezone.now().date() + timedelta(days=7)
-        tareas = Tarea.objects.filter(
+        tareas = self.optimizar(Tarea.objects.filter(
             fecha_limite__lte=fecha_limite,
             estado__in=['pendiente', 'en_progreso']
-        )
+        ))
         serializer = self.get_serializer(tareas, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['post'])
+    def lote(self, request):
+        """
+        Crea, actualiza o elimina varias tareas en una sola petición.
+        Recibe una lista de operaciones {"accion": "crear" | "actualizar" | "eliminar", ...}.
+        Se validan todas juntas y se aplican en una única transacción, o ninguna.
+        """
+        serializer = TareaLoteSerializer(
+            data=request.data, many=True, allow_empty=False, max_length=self.lote_maximo
+        )
+        if not serializer.is_valid():
+            if not isinstance(serializer.errors, list):
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            return self._respuesta_lote(request.data, serializer.errors)
+        
+        operaciones = serializer.validated_data
+        errores, proyectos, usuarios, tareas = self._resolver_lote(operaciones)
+        if any(errores):
+            return self._respuesta_lote(operaciones, errores)
+        
+        nuevas, modificadas, eliminadas = [], [], []
+        campos = set()
+        resultados = []
+        for operacion in operaciones:
+            datos = {
+                campo: operacion[campo]
+                for campo in TareaLoteSerializer.CAMPOS_TAREA if campo in operacion
+            }
+            if 'proyecto' in datos:
+                datos['proyecto'] = proyectos[datos['proyecto']]
+            if 'asignado_a' in datos:
+                datos['asignado_a'] = usuarios.get(datos['asignado_a'])
+            
+            if operacion['accion'] == 'crear':
+                tarea = Tarea(creado_por=request.user, **datos)
+                nuevas.append(tarea)
+            elif operacion['accion'] == 'actualizar':
+                tarea = tareas[operacion['id']]
+                for campo, valor in datos.items():
+                    setattr(tarea, campo, valor)
+                campos.update(datos)
+                modificadas.append(tarea)
+            else:
+                tarea = tareas[operacion['id']]
+                eliminadas.append(tarea.pk)
+            resultados.append((operacion['accion'], tarea))
+        
+        with transaction.atomic():
+            if nuevas:
+                crear_tareas(nuevas, request.user)
+            if modificadas:
+                actualizar_tareas(modificadas, campos, request.user)
+            if eliminadas:
+                eliminar_tareas(eliminadas)
+        
+        return Response({
+            'aplicado': True,
+            'resultados': [
+                {'indice': indice, 'accion': accion, 'id': tarea.pk, 'estado': 'ok'}
+                for indice, (accion, tarea) in enumerate(resultados)
+            ],
+        })
+    
+    def _resolver_lote(self, operaciones):
+        """
+        Busca los proyectos, usuarios y tareas referenciados por el lote con una
+        consulta por modelo y devuelve los errores de cada operación
+        """
+        proyectos = Proyecto.objects.in_bulk({op['proyecto'] for op in operaciones if 'proyecto' in op})
+        usuarios = User.objects.in_bulk({op['asignado_a'] for op in operaciones if op.get('asignado_a')})
+        tareas = Tarea.objects.in_bulk({op['id'] for op in operaciones if op['accion'] != 'crear'})
+        
+        errores = []
+        vistas = set()
+        for operacion in operaciones:
+            error = {}
+            if 'proyecto' in operacion and operacion['proyecto'] not in proyectos:
+                error['proyecto'] = ['El proyecto no existe.']
+            if operacion.get('asignado_a') and operacion['asignado_a'] not in usuarios:
+                error['asignado_a'] = ['El usuario no existe.']
+            if operacion['accion'] != 'crear':
+                if operacion['id'] not in tareas:
+                    error['id'] = ['La tarea no existe.']
+                elif operacion['id'] in vistas:
+                    error['id'] = ['La tarea aparece en más de una operación del lote.']
+                vistas.add(operacion['id'])
+            errores.append(error)
+        
+        return errores, proyectos, usuarios, tareas
+    
+    def _respuesta_lote(self, operaciones, errores):
+        """Respuesta 400 con el resultado de validación de cada operación"""
+        resultados = []
+        for indice, (operacion, error) in enumerate(zip(operaciones, errores)):
+            resultado = {
+                'indice': indice,
+                'accion': operacion.get('accion') if isinstance(operacion, dict) else None,
+                'estado': 'error' if error else 'valida',
+            }
+            if error:
+                resultado['errores'] = error
+            resultados.append(resultado)
+        return Response(
+            {'aplicado': False, 'resultados': resultados},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
 
-class ComentarioViewSet(viewsets.ModelViewSet):
+class ComentarioViewSet(ResaltadoMixin, ListadoRapidoMixin, ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     """
     ViewSet para comentarios
     """
     queryset = Comentario.objects.all()
     serializer_class = ComentarioSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['tarea', 'autor']
-    search_fields = ['contenido']
-    ordering_fields = ['fecha_creacion']
-    ordering = ['-fecha_creacion']
+    filter_backends = [DjangoFilterBackend, BusquedaFilter, OrdenBusquedaFilter]
+    filterset_fields = ['tarea', 'usuario']
+    ordering_fields = ['fecha']
+    ordering = ['-fecha']
     
     def perform_create(self, serializer):
         """Asignar automáticamente el usuario actual como autor"""
-        serializer.save(autor=self.request.user)
+        serializer.save(usuario=self.request.user)
 
 
-class HistorialViewSet(viewsets.ReadOnlyModelViewSet):
+class HistorialViewSet(ListadoRapidoMixin, ConsultaOptimizadaMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para historial (solo lectura)
     """
     queryset = Historial.objects.all()
     serializer_class = HistorialSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = HistorialPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['tarea', 'usuario', 'accion']
     ordering_fields = ['fecha']
     ordering = ['-fecha']
 
 
-class NotificacionViewSet(viewsets.ModelViewSet):
+class ActividadViewSet(ListadoRapidoMixin, ConsultaOptimizadaMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Feed de actividad del usuario autenticado (solo lectura, paginado por cursor)
+    """
+    serializer_class = ActividadSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = ActividadPagination
+
+    def get_queryset(self):
+        return self.optimizar(Actividad.objects.filter(usuario=self.request.user))
+
+
+class NotificacionViewSet(ListadoRapidoMixin, ConsultaOptimizadaMixin, viewsets.ModelViewSet):
     """
     ViewSet para notificaciones
     """
     queryset = Notificacion.objects.all()
     serializer_class = NotificacionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = NotificacionPagination
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ['usuario', 'leido']
+    filterset_fields = ['usuario', 'leida']
     ordering_fields = ['fecha_creacion']
     ordering = ['-fecha_creacion']
     
@@ -175,15 +378,34 @@ class NotificacionViewSet(viewsets.ModelViewSet):
         """
         Filtrar solo notificaciones del usuario autenticado
         """
-        return Notificacion.objects.filter(usuario=self.request.user)
+        return self.optimizar(Notificacion.objects.filter(usuario=self.request.user))
+    
+    @action(detail=False, methods=['get'])
+    def no_leidas(self, request):
+        """
+        Número de notificaciones no leídas y las últimas (sin consultas con la caché caliente)
+        """
+        return Response(bandeja(request.user.pk))
     
     @action(detail=False, methods=['post'])
     def marcar_todas_leidas(self, request):
         """
         Marcar todas las notificaciones como leídas
         """
-        count = Notificacion.objects.filter(usuario=request.user, leido=False).update(leido=True)
-        return Response({'mensaje': f'{count} notificaciones marcadas como leídas'})
+        # Un solo UPDATE, que también descuenta las marcadas del contador de no leídas
+        count = Notificacion.objects.filter(usuario=request.user, leida=False).update(leida=True)
+        return Response({'mensaje': f'{count} notificaciones marcadas como leídas', 'total': count})
+    
+    @action(detail=False, methods=['post'])
+    def marcar_leidas(self, request):
+        """
+        Marcar como leídas las notificaciones indicadas: {"ids": [1, 2, ...]}
+        """
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+            return Response({'ids': ['Debe ser una lista de ids.']}, status=status.HTTP_400_BAD_REQUEST)
+        count = Notificacion.objects.filter(usuario=request.user, pk__in=ids, leida=False).update(leida=True)
+        return Response({'mensaje': f'{count} notificaciones marcadas como leídas', 'total': count})
     
     @action(detail=True, methods=['post'])
     def marcar_leida(self, request, pk=None):
@@ -191,6 +413,183 @@ class NotificacionViewSet(viewsets.ModelViewSet):
         Marcar una notificación como leída
         """
         notificacion = self.get_object()
-        notificacion.leido = True
-        notificacion.save()
+        Notificacion.objects.filter(pk=notificacion.pk, leida=False).update(leida=True)
         return Response({'mensaje': 'Notificación marcada como leída'})
+
+
+class SincronizacionViewSet(viewsets.ViewSet):
+    """
+    Cambios de proyectos, tareas y comentarios desde la última sincronización
+    (ver proyectos/sincronizacion.py). Sin ?token= devuelve todo lo que ve el
+    usuario. Mientras queden filas del intervalo la respuesta trae `siguiente`,
+    que se pide igual que un token; la última trae el `token` para la próxima vez.
+    """
+    permission_classes = [IsAuthenticated]
+    nivel_coste = 'medio'
+    limite = 500
+    limite_maximo = 1000
+    colecciones = (
+        ('proyectos', ProyectoSerializer),
+        ('tareas', TareaSerializer),
+        ('comentarios', ComentarioSerializer),
+    )
+    # Plural de Eliminacion.modelo en la respuesta
+    eliminados = {'proyecto': 'proyectos', 'tarea': 'tareas', 'comentario': 'comentarios'}
+
+    def list(self, request):
+        try:
+            token = self._leer_token(request)
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            return Response({'error': 'Token de sincronización no válido'}, status=status.HTTP_400_BAD_REQUEST)
+        desde = token['desde']
+        if desde is not None and desde < timezone.now() - RETENCION:
+            return Response(
+                {'error': 'El token de sincronización ha caducado: hay que volver a sincronizar sin token'},
+                status=status.HTTP_410_GONE,
+            )
+        hasta = token['hasta'] or timezone.now()
+
+        fuentes = self._fuentes(request, desde)
+        respuesta = {nombre: [] for nombre, _ in self.colecciones}
+        respuesta['eliminados'] = {nombre: [] for nombre in self.eliminados.values()}
+        restantes = self._limite(request)
+        siguiente = None
+        for indice in range(token['coleccion'], len(fuentes)):
+            if not restantes:
+                siguiente = (indice, None, None)
+                break
+            nombre, queryset, campo, serializer_class = fuentes[indice]
+            queryset = queryset.filter(**{f'{campo}__lte': hasta})
+            if desde is not None:
+                queryset = queryset.filter(**{f'{campo}__gt': desde - MARGEN})
+            if indice == token['coleccion'] and token['fecha'] is not None:
+                queryset = queryset.filter(
+                    Q(**{f'{campo}__gt': token['fecha']}) | Q(**{campo: token['fecha'], 'id__gt': token['id']})
+                )
+
+            filas = list(queryset.order_by(campo, 'id')[:restantes + 1])
+            if len(filas) > restantes:
+                filas = filas[:restantes]
+                siguiente = (indice, getattr(filas[-1], campo), filas[-1].pk)
+            restantes -= len(filas)
+            if serializer_class is None:
+                for eliminacion in filas:
+                    respuesta['eliminados'][self.eliminados[eliminacion.modelo]].append(eliminacion.objeto_id)
+            else:
+                respuesta[nombre] = serializer_class(filas, many=True, context=self._contexto(request)).data
+            if siguiente:
+                break
+
+        if siguiente:
+            indice, fecha, pk = siguiente
+            respuesta['siguiente'] = self._token(request, desde, hasta, indice, fecha, pk)
+            respuesta['token'] = None
+        else:
+            respuesta['siguiente'] = None
+            respuesta['token'] = self._token(request, hasta)
+        return Response(respuesta)
+
+    def _fuentes(self, request, desde):
+        """(nombre, queryset, campo de fecha, serializer) de cada colección, en el orden de recorrido"""
+        alcance = visibles(request.user)
+        fuentes = []
+        for nombre, serializer_class in self.colecciones:
+            queryset = optimizar(alcance[nombre], serializer_class(context=self._contexto(request)), solo_columnas=True)
+            fuentes.append((nombre, con_columnas(queryset, 'fecha_actualizacion'), 'fecha_actualizacion', serializer_class))
+        # En la primera sincronización el cliente no tiene nada que borrar
+        if desde is not None:
+            lapidas = eliminaciones(request.user).only('modelo', 'objeto_id', 'fecha')
+            fuentes.append(('eliminados', lapidas, 'fecha', None))
+        return fuentes
+
+    def _contexto(self, request):
+        return {'request': request, 'view': self, 'format': self.format_kwarg}
+
+    def _limite(self, request):
+        try:
+            limite = int(request.query_params.get('limite', self.limite))
+        except ValueError:
+            limite = self.limite
+        return max(1, min(limite, self.limite_maximo))
+
+    def _token(self, request, desde, hasta=None, coleccion=0, fecha=None, pk=None):
+        """Token opaco y firmado: de sincronización (solo desde) o de continuación"""
+        return signing.dumps({
+            'u': request.user.pk,
+            'd': desde.isoformat() if desde else None,
+            'h': hasta.isoformat() if hasta else None,
+            'c': coleccion,
+            'f': fecha.isoformat() if fecha else None,
+            'i': pk,
+        }, salt='api.sincronizacion', compress=True)
+
+    def _leer_token(self, request):
+        valor = request.query_params.get('token')
+        if not valor:
+            return {'desde': None, 'hasta': None, 'coleccion': 0, 'fecha': None, 'id': None}
+        datos = signing.loads(valor, salt='api.sincronizacion')
+        # El alcance depende del usuario: un token no vale para otro
+        if datos['u'] != request.user.pk:
+            raise signing.BadSignature('Token de otro usuario')
+        fechas = {clave: parse_datetime(datos[clave]) if datos[clave] else None for clave in ('d', 'h', 'f')}
+        return {
+            'desde': fechas['d'],
+            'hasta': fechas['h'],
+            'coleccion': int(datos['c']),
+            'fecha': fechas['f'],
+            'id': datos['i'],
+        }
+
+
+class PeticionesLoteViewSet(viewsets.ViewSet):
+    """
+    Varias peticiones GET y POST a la API en una sola llamada (POST /api/batch/).
+    Recibe una lista de {"metodo", "url", "cuerpo", "cabeceras"} y devuelve, en
+    el mismo orden, {"estado", "cabeceras", "cuerpo"} de cada una. Los POST se
+    ejecutan en orden y cada uno por separado (uno que falla no deshace los
+    demás); los GET seguidos se ejecutan a la vez, cada uno con su conexión a la BD.
+    """
+    permission_classes = [IsAuthenticated]
+    peticiones_maximas = 20
+    concurrente = True
+
+    def create(self, request):
+        serializer = SubPeticionSerializer(
+            data=request.data, many=True, allow_empty=False, max_length=self.peticiones_maximas
+        )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        peticiones = [construir(request, **operacion) for operacion in serializer.validated_data]
+        resultados = [None] * len(peticiones)
+        # Las subpeticiones comparten las lecturas de versiones de la caché
+        with versiones_de_peticion():
+            lecturas = []
+            for indice, peticion in enumerate(peticiones):
+                if peticion.method == 'GET':
+                    lecturas.append(indice)
+                    continue
+                self._leer(peticiones, lecturas, resultados)
+                lecturas = []
+                resultados[indice] = ejecutar(peticion, excluidas=(PeticionesLoteViewSet,))
+            self._leer(peticiones, lecturas, resultados)
+
+        return Response([
+            {'estado': estado, 'cabeceras': cabeceras, 'cuerpo': cuerpo}
+            for estado, cabeceras, cuerpo in resultados
+        ])
+
+    def _leer(self, peticiones, indices, resultados):
+        """Ejecuta los GET de `indices`, a la vez si hay más de uno"""
+        if self.concurrente and len(indices) > 1:
+            respuestas = async_to_sync(self._a_la_vez)([peticiones[indice] for indice in indices])
+        else:
+            respuestas = [ejecutar(peticiones[indice], excluidas=(PeticionesLoteViewSet,)) for indice in indices]
+        for indice, respuesta in zip(indices, respuestas):
+            resultados[indice] = respuesta
+
+    async def _a_la_vez(self, peticiones):
+        ejecutar_en_hilo = en_hilo_compartido(ejecutar)
+        return await asyncio.gather(*(
+            ejecutar_en_hilo(peticion, excluidas=(PeticionesLoteViewSet,)) for peticion in peticiones
+        ))
@@ -0,0 +1,72 @@
+"""
+Usuarios autenticados servidos desde la caché.
+
+Cada petición autenticada (con token JWT o con sesión) necesita la fila de su
+usuario. En lugar de leerla de la BD en cada petición se guarda en la caché
+bajo 'usuario:fila:<id>' y se borra al guardar o borrar el usuario (User.save()
+y User.delete(), lo que incluye los cambios de rol y de contraseña, que pasan
+por save()). El borrado se repite al confirmar la transacción, para que nadie
+deje en caché la fila anterior al cambio mientras la transacción sigue abierta.
+
+En la caché no se guarda la contraseña: solo los demás campos de la fila y el
+hash de sesión ya calculado (el que compara django.contrib.auth en cada petición
+con sesión). El usuario reconstruido tiene la contraseña diferida, así que quien
+la necesite (check_password(), la comprobación CHECK_REVOKE_TOKEN de simplejwt,
+las SECRET_KEY_FALLBACKS) la lee de la BD con una consulta.
+
+Los update() en bloque sobre usuarios y los cambios de grupos o permisos no
+invalidan: la fila caduca sola tras DURACION.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+
+DURACION = 300
+
+
+def _clave(pk):
+    return f'usuario:fila:{pk}'
+
+
+def _guardar(clave, usuario):
+    campos = {
+        campo.attname: getattr(usuario, campo.attname)
+        for campo in usuario._meta.concrete_fields
+        if campo.attname != 'password'
+    }
+    cache.set(clave, {
+        'db': usuario._state.db,
+        'campos': campos,
+        'sesion': usuario.get_session_auth_hash(),
+    }, timeout=DURACION)
+
+
+def _reconstruir(modelo, guardado):
+    campos = guardado['campos']
+    usuario = modelo.from_db(guardado['db'], list(campos), list(campos.values()))
+    usuario._hash_sesion = guardado['sesion']
+    return usuario
+
+
+def usuario_en_cache(pk):
+    """Usuario con clave primaria `pk`, de la caché o de la BD; None si no existe"""
+    clave = _clave(pk)
+    modelo = get_user_model()
+    guardado = cache.get(clave)
+    if guardado is not None:
+        return _reconstruir(modelo, guardado)
+    try:
+        usuario = modelo._default_manager.get(pk=pk)
+    except (modelo.DoesNotExist, ValueError, TypeError):
+        return None
+    _guardar(clave, usuario)
+    return usuario
+
+
+def invalidar_usuario(pk, using=DEFAULT_DB_ALIAS):
+    """Borra de la caché la fila del usuario, ahora y al confirmar la transacción"""
+    clave = _clave(pk)
+    cache.delete(clave)
+    transaction.on_commit(lambda: cache.delete(clave), using=using)
+
@@ -0,0 +1,13 @@
+from django.contrib.auth.backends import ModelBackend
+
+from .autenticacion import usuario_en_cache
+
+
+class ModelBackendEnCache(ModelBackend):
+    """ModelBackend que lee de la caché el usuario de la sesión"""
+
+    def get_user(self, user_id):
+        usuario = usuario_en_cache(user_id)
+        if usuario is None or not self.user_can_authenticate(usuario):
+            return None
+        return usuario
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
+from .autenticacion import invalidar_usuario
+
 class User(AbstractUser):
     ROLE_CHOICES = (
         ('admin', 'Administrador'),
@@ -18,6 +20,20 @@ class User(AbstractUser):
             self.is_staff = False
             self.is_superuser = False
         super().save(*args, **kwargs)
+        # La fila cacheada de la autenticación (cuentas.autenticacion) queda vieja
+        invalidar_usuario(self.pk, using=self._state.db)
+
+    def delete(self, *args, **kwargs):
+        pk, using = self.pk, self._state.db
+        resultado = super().delete(*args, **kwargs)
+        invalidar_usuario(pk, using=using)
+        return resultado
+
+    def get_session_auth_hash(self):
+        # El usuario servido desde la caché llega sin contraseña y con el hash ya calculado
+        if 'password' not in self.__dict__ and '_hash_sesion' in self.__dict__:
+            return self._hash_sesion
+        return super().get_session_auth_hash()
 
     def __str__(self):
         return self.username
@@ -1,3 +1,100 @@
+from unittest import mock
+
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from cuentas.autenticacion import usuario_en_cache
+from proyectos.pruebas import crear_usuario
+
+
+class UsuarioEnCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = crear_usuario('usuario')
+
+    def test_segunda_lectura_sin_consultas(self):
+        self.assertEqual(usuario_en_cache(self.usuario.pk), self.usuario)
+        with self.assertNumQueries(0):
+            self.assertEqual(usuario_en_cache(self.usuario.pk).username, 'usuario')
+
+    def test_guardar_invalida(self):
+        usuario_en_cache(self.usuario.pk)
+        self.usuario.role = 'admin'
+        self.usuario.save()
+        self.assertTrue(usuario_en_cache(self.usuario.pk).is_staff)
+
+    def test_borrar_invalida(self):
+        pk = self.usuario.pk
+        usuario_en_cache(pk)
+        self.usuario.delete()
+        self.assertIsNone(usuario_en_cache(pk))
+
+    def test_sin_contrasena_en_cache(self):
+        usuario_en_cache(self.usuario.pk)
+        guardado = cache.get(f'usuario:fila:{self.usuario.pk}')
+        self.assertNotIn('password', guardado['campos'])
+        self.assertNotIn(self.usuario.password, repr(guardado))
+        usuario = usuario_en_cache(self.usuario.pk)
+        self.assertIn('password', usuario.get_deferred_fields())
+        with self.assertNumQueries(0):
+            self.assertEqual(usuario.get_session_auth_hash(), self.usuario.get_session_auth_hash())
+        # Quien necesite la contraseña la lee de la BD
+        with self.assertNumQueries(1):
+            self.assertTrue(usuario.check_password('clave-segura-1'))
+
+    def test_clave_no_valida(self):
+        self.assertIsNone(usuario_en_cache('no-es-un-id'))
+
+
+class AutenticacionEnCacheTests(TestCase):
+    """Con la caché caliente, autenticar no consulta la BD"""
+
+    # Bandeja de notificaciones: también sale de la caché
+    URL = '/api/notificaciones/no_leidas/'
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = crear_usuario('usuario')
+
+    def test_jwt(self):
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.usuario).access_token}')
+        self.assertEqual(cliente.get(self.URL).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(cliente.get(self.URL).status_code, 200)
+
+    def test_jwt_usuario_inactivo(self):
+        cliente = APIClient()
+        cliente.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.usuario).access_token}')
+        cliente.get(self.URL)
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertEqual(cliente.get(self.URL).status_code, 401)
+
+    def test_sesion(self):
+        self.client.force_login(self.usuario)
+        self.assertEqual(self.client.get(self.URL).status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.URL).status_code, 200)
+
+    def test_cambio_de_contrasena_cierra_la_sesion(self):
+        self.client.force_login(self.usuario)
+        self.assertEqual(self.client.get(self.URL).status_code, 200)
+        self.usuario.set_password('otra-clave-2')
+        self.usuario.save()
+        self.assertEqual(self.client.get(self.URL).status_code, 401)
 
-# Create your tests here.
+    def test_jwt_revocado_al_cambiar_contrasena(self):
+        # simplejwt no relee sus ajustes con override_settings en los módulos que ya los importaron
+        with mock.patch.object(api_settings, 'CHECK_REVOKE_TOKEN', True):
+            cliente = APIClient()
+            cliente.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.usuario).access_token}')
+            self.assertEqual(cliente.get(self.URL).status_code, 200)
+            self.assertEqual(cliente.get(self.URL).status_code, 200)
+            self.usuario.set_password('otra-clave-2')
+            self.usuario.save()
+            self.assertEqual(cliente.get(self.URL).status_code, 401)
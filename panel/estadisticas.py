@@ -0,0 +1,218 @@
+"""
+Instantáneas cacheadas de las cifras del panel.
+
+Las cifras se calculan con agregación condicional (una consulta por tabla) y
+se guardan en caché bajo una clave versionada (ver proyectos.versiones): la
+instantánea global depende de la versión 'global' y la de cada usuario además
+de la suya propia. Con la caché caliente, el panel no consulta la BD.
+
+Cada instantánea se compone de piezas independientes. Las vistas síncronas las
+calculan una detrás de otra; las async (acalcular_*) las lanzan a la vez en
+hilos distintos, así que el tiempo en frío es el de la pieza más lenta.
+"""
+import asyncio
+from collections import Counter
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from proyectos.actividad import feed
+from proyectos.asincrono import en_hilo_compartido
+from proyectos.models import Notificacion, Proyecto, ResumenDiario, Tarea
+from proyectos.notificaciones import no_leidas
+from proyectos.resumenes import serie
+from proyectos.versiones import versiones
+from proyectos.visibilidad import proyectos_visibles
+
+
+# Las versiones ya invalidan los cambios; la caducidad solo limita lo que depende de la fecha
+TIEMPO_CACHE = 60 * 15
+
+ESTADOS_ABIERTOS = ['pendiente', 'en_progreso']
+
+# Días de la gráfica de evolución de tareas
+DIAS_EVOLUCION = 30
+
+
+def _conteos(campo, valores, **filtro):
+    """Un Count condicional por valor, para usar en un solo aggregate()"""
+    return {
+        valor: Count('pk', filter=Q(**{campo: valor}, **filtro))
+        for valor in valores
+    }
+
+
+def _mis_proyectos(user):
+    # Creados, de los que es miembro o con tareas asignadas (ver proyectos/visibilidad.py)
+    return Proyecto.objects.filter(pk__in=proyectos_visibles(user))
+
+
+# Piezas de la instantánea global
+
+def _proyectos_activos(hoy):
+    return Proyecto.objects.aggregate(total_proyectos=Count('pk', filter=Q(activo=True)))
+
+
+def _tareas_globales(hoy):
+    tareas = Tarea.objects.aggregate(
+        total_tareas=Count('pk'),
+        **{f'estado_{estado}': conteo for estado, conteo in _conteos('estado', dict(Tarea.ESTADOS)).items()},
+        **{f'prioridad_{prioridad}': conteo for prioridad, conteo in _conteos('prioridad', dict(Tarea.PRIORIDADES)).items()},
+    )
+    return {
+        'total_tareas': tareas['total_tareas'],
+        'tareas_por_estado': {estado: tareas[f'estado_{estado}'] for estado, _ in Tarea.ESTADOS},
+        'tareas_por_prioridad': {prioridad: tareas[f'prioridad_{prioridad}'] for prioridad, _ in Tarea.PRIORIDADES},
+    }
+
+
+def _proyectos_por_mes(hoy):
+    # Proyectos por mes (últimos 6 meses) para gráfica, desde los resúmenes diarios
+    proyectos_por_mes = Counter()
+    for fecha, total in ResumenDiario.objects.filter(
+        proyecto__isnull=True,
+        fecha__gte=hoy - timedelta(days=180),
+        proyectos_creados__gt=0,
+    ).values_list('fecha', 'proyectos_creados'):
+        proyectos_por_mes[fecha.replace(day=1)] += total
+    return {'proyectos_por_mes': sorted(proyectos_por_mes.items())}
+
+
+def _evolucion_tareas(hoy):
+    return {'evolucion_tareas': serie(hoy - timedelta(days=DIAS_EVOLUCION - 1), hoy)}
+
+
+PIEZAS_GLOBALES = (_proyectos_activos, _tareas_globales, _proyectos_por_mes, _evolucion_tareas)
+
+
+# Piezas de la instantánea de cada usuario
+
+def _mis_tareas(user, hoy):
+    tareas = Tarea.objects.filter(asignado_a=user).aggregate(
+        mis_tareas=Count('pk'),
+        **{f'tareas_{estado}': conteo for estado, conteo in _conteos('estado', dict(Tarea.ESTADOS)).items()},
+        tareas_vencidas=Count('pk', filter=Q(fecha_limite__lt=hoy, estado__in=ESTADOS_ABIERTOS)),
+    )
+    return {
+        'mis_tareas': tareas['mis_tareas'],
+        'tareas_pendientes': tareas['tareas_pendiente'],
+        'tareas_en_progreso': tareas['tareas_en_progreso'],
+        'tareas_completadas': tareas['tareas_completada'],
+        'tareas_vencidas': tareas['tareas_vencidas'],
+    }
+
+
+def _tareas_proximas(user, hoy):
+    return {'tareas_proximas': list(Tarea.objects.filter(
+        asignado_a=user,
+        fecha_limite__lte=hoy + timedelta(days=7),
+        fecha_limite__gte=hoy,
+        estado__in=ESTADOS_ABIERTOS,
+    ).select_related('proyecto').order_by('fecha_limite')[:5])}
+
+
+def _notificaciones(user, hoy):
+    return {
+        'notificaciones_count': no_leidas(user.pk),
+        'notificaciones_recientes': list(
+            Notificacion.objects.filter(usuario=user, leida=False)
+            .select_related('tarea').order_by('-fecha_creacion')[:5]
+        ),
+    }
+
+
+def _proyectos_usuario(user, hoy):
+    mis_proyectos = _mis_proyectos(user)
+    return {
+        'mis_proyectos': mis_proyectos.count(),
+        'proyectos_recientes': list(mis_proyectos.order_by('-fecha_creacion')[:5]),
+    }
+
+
+def _actividad_reciente(user, hoy):
+    return {'actividad_reciente': [actividad.historial for actividad in feed(user, limite=10)]}
+
+
+PIEZAS_USUARIO = (_mis_tareas, _tareas_proximas, _notificaciones, _proyectos_usuario, _actividad_reciente)
+
+
+def _unir(partes):
+    datos = {}
+    for parte in partes:
+        datos.update(parte)
+    return datos
+
+
+def calcular_globales():
+    hoy = timezone.localdate()
+    return _unir(pieza(hoy) for pieza in PIEZAS_GLOBALES)
+
+
+def calcular_usuario(user, hoy):
+    return _unir(pieza(user, hoy) for pieza in PIEZAS_USUARIO)
+
+
+async def acalcular_globales():
+    hoy = timezone.localdate()
+    return _unir(await asyncio.gather(*(en_hilo_compartido(pieza)(hoy) for pieza in PIEZAS_GLOBALES)))
+
+
+async def acalcular_usuario(user, hoy):
+    return _unir(await asyncio.gather(*(en_hilo_compartido(pieza)(user, hoy) for pieza in PIEZAS_USUARIO)))
+
+
+def _clave_global():
+    version_global, = versiones('global')
+    return f'panel:global:{version_global}'
+
+
+def _clave_usuario(user, hoy):
+    version_global, version_usuario = versiones('global', f'usuario:{user.pk}')
+    return f'panel:usuario:{user.pk}:{hoy.isoformat()}:{version_global}:{version_usuario}'
+
+
+def estadisticas_globales():
+    clave = _clave_global()
+    datos = cache.get(clave)
+    if datos is None:
+        datos = calcular_globales()
+        cache.set(clave, datos, TIEMPO_CACHE)
+    return datos
+
+
+def estadisticas_usuario(user):
+    """Instantánea del usuario; se invalida con cualquier cambio global o de sus notificaciones"""
+    hoy = timezone.localdate()
+    clave = _clave_usuario(user, hoy)
+    datos = cache.get(clave)
+    if datos is None:
+        datos = calcular_usuario(user, hoy)
+        cache.set(clave, datos, TIEMPO_CACHE)
+    return datos
+
+
+async def aestadisticas_globales():
+    clave = await sync_to_async(_clave_global)()
+    datos = await cache.aget(clave)
+    if datos is None:
+        datos = await acalcular_globales()
+        await cache.aset(clave, datos, TIEMPO_CACHE)
+    return datos
+
+
+async def aestadisticas_usuario(user):
+    hoy = timezone.localdate()
+    clave = await sync_to_async(_clave_usuario)(user, hoy)
+    datos = await cache.aget(clave)
+    if datos is None:
+        datos = await acalcular_usuario(user, hoy)
+        await cache.aset(clave, datos, TIEMPO_CACHE)
+    return datos
+
+
+async def aestadisticas(user):
+    """Instantáneas global y del usuario, calculadas a la vez si no están en caché"""
+    return await asyncio.gather(aestadisticas_globales(), aestadisticas_usuario(user))
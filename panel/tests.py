@@ -1,3 +1,111 @@
-from django.test import TestCase
+import threading
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase
+
+from panel import estadisticas
+from proyectos.models import Notificacion, Tarea
+from proyectos.pruebas import SIN_MANIFEST, crear_proyecto, crear_tarea, crear_usuario
+
+
+@SIN_MANIFEST
+class PanelTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = crear_usuario('admin', role='admin')
+        self.miembro = crear_usuario('miembro')
+        self.proyecto = crear_proyecto(self.admin)
+        for estado in ('pendiente', 'en_progreso', 'completada', 'completada'):
+            crear_tarea(self.proyecto, asignado_a=self.miembro, titulo=f'Tarea {estado}', estado=estado)
+        self.client.force_login(self.miembro)
+
+    def test_estadisticas(self):
+        datos = self.client.get('/panel/estadisticas/').json()
+        self.assertEqual(datos['tareas_por_estado']['data'], [1, 1, 2])
+        self.assertEqual(datos['mis_tareas_estado']['data'], [1, 1, 2])
+
+    def test_estadisticas_cacheadas(self):
+        self.client.get('/panel/estadisticas/')
+        with self.assertNumQueries(0):
+            self.client.get('/panel/estadisticas/')
+
+    def test_cambios_invalidan(self):
+        self.client.get('/panel/estadisticas/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Tarea.objects.filter(estado='pendiente').update(estado='completada')
+        datos = self.client.get('/panel/estadisticas/').json()
+        self.assertEqual(datos['tareas_por_estado']['data'], [0, 1, 3])
+
+    def test_campana_de_notificaciones(self):
+        tarea = self.proyecto.tareas.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            Notificacion.objects.bulk_create([
+                Notificacion(usuario=self.miembro, tarea=tarea, mensaje=f'Aviso {numero}', tipo='asignacion')
+                for numero in range(3)
+            ])
+        respuesta = self.client.get('/panel/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.context['bandeja_notificaciones']['no_leidas'], 3)
+        self.assertContains(respuesta, 'Aviso 2')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Notificacion.objects.filter(usuario=self.miembro).update(leida=True)
+        self.assertContains(self.client.get('/panel/'), 'No hay notificaciones sin leer')
+
+
+@SIN_MANIFEST
+class PanelAsyncTests(TransactionTestCase):
+    """Las vistas async dan lo mismo que las síncronas; sus consultas van en hilos con su propia conexión"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = crear_usuario('admin', role='admin')
+        self.miembro = crear_usuario('miembro')
+        self.proyecto = crear_proyecto(self.admin)
+        for estado in ('pendiente', 'en_progreso', 'completada'):
+            crear_tarea(self.proyecto, asignado_a=self.miembro, titulo=f'Tarea {estado}', estado=estado)
+        self.client.force_login(self.miembro)
+        self.async_client.force_login(self.miembro)
+
+    async def sincrona(self, url):
+        """Respuesta de la vista síncrona, calculada sin la caché que dejó la async"""
+        await sync_to_async(cache.clear)()
+        return await sync_to_async(self.client.get)(url)
+
+    async def test_estadisticas(self):
+        asincrona = await self.async_client.get('/panel/async/estadisticas/')
+        self.assertEqual(asincrona.status_code, 200)
+        self.assertEqual(asincrona.json()['mis_tareas_estado']['data'], [1, 1, 1])
+        self.assertEqual(asincrona.json(), (await self.sincrona('/panel/estadisticas/')).json())
+
+    async def test_dashboard(self):
+        asincrona = await self.async_client.get('/panel/async/')
+        self.assertEqual(asincrona.status_code, 200)
+        sincrona = await self.sincrona('/panel/')
+        for clave in ('total_proyectos', 'total_tareas', 'mis_tareas', 'tareas_por_estado', 'proyectos_por_mes_data'):
+            self.assertEqual(asincrona.context[clave], sincrona.context[clave], clave)
+
+    async def test_requiere_sesion(self):
+        await self.async_client.alogout()
+        respuesta = await self.async_client.get('/panel/async/estadisticas/')
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertTrue(respuesta['Location'].startswith('/cuentas/login/'))
+
+    async def test_piezas_a_la_vez(self):
+        # Cada pieza espera a todas las demás: en serie la barrera no se completaría
+        piezas = estadisticas.PIEZAS_USUARIO
+        barrera = threading.Barrier(len(piezas))
+
+        def esperando(pieza):
+            def envoltura(user, hoy):
+                barrera.wait(timeout=5)
+                return pieza(user, hoy)
+            return envoltura
+
+        with mock.patch.object(estadisticas, 'PIEZAS_USUARIO', tuple(esperando(pieza) for pieza in piezas)):
+            respuesta = await self.async_client.get('/panel/async/estadisticas/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(barrera.broken)
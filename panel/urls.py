@@ -6,4 +6,7 @@ app_name = 'panel'
 urlpatterns = [
     path('', views.dashboard, name='home'),
     path('estadisticas/', views.estadisticas_json, name='estadisticas_json'),
+    # Versiones async (requieren un servidor ASGI para ejecutar las consultas a la vez)
+    path('async/', views.dashboard_async, name='dashboard_async'),
+    path('async/estadisticas/', views.estadisticas_json_async, name='estadisticas_json_async'),
 ]
@@ -1,11 +1,12 @@
+import json
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
-from django.db.models import Count, Q
 from django.utils import timezone
-from datetime import timedelta
 
-from proyectos.models import Proyecto, Tarea, Notificacion
+from .estadisticas import aestadisticas, estadisticas_globales, estadisticas_usuario
 
 
 def home(request):
@@ -18,90 +19,33 @@ def home(request):
 @login_required
 def dashboard(request):
     """Vista del dashboard principal con estadísticas"""
-    user = request.user
-    
-    # Estadísticas generales
-    total_proyectos = Proyecto.objects.filter(activo=True).count()
-    mis_proyectos = Proyecto.objects.filter(
-        Q(creado_por=user) | Q(miembros=user)
-    ).distinct().count()
-    
-    # Estadísticas de tareas
-    total_tareas = Tarea.objects.count()
-    mis_tareas = user.tareas_asignadas.count()
-    tareas_pendientes = user.tareas_asignadas.filter(estado='pendiente').count()
-    tareas_en_progreso = user.tareas_asignadas.filter(estado='en_progreso').count()
-    tareas_completadas = user.tareas_asignadas.filter(estado='completada').count()
-    
-    # Tareas próximas a vencer (próximos 7 días)
-    fecha_limite = timezone.now().date() + timedelta(days=7)
-    tareas_proximas = user.tareas_asignadas.filter(
-        fecha_limite__lte=fecha_limite,
-        fecha_limite__gte=timezone.now().date(),
-        estado__in=['pendiente', 'en_progreso']
-    ).order_by('fecha_limite')[:5]
-    
-    # Tareas vencidas
-    tareas_vencidas = user.tareas_asignadas.filter(
-        fecha_limite__lt=timezone.now().date(),
-        estado__in=['pendiente', 'en_progreso']
-    ).count()
-    
-    # Notificaciones no leídas
-    notificaciones_count = user.notificaciones.filter(leida=False).count()
-    notificaciones_recientes = user.notificaciones.filter(leida=False).order_by('-fecha_creacion')[:5]
-    
-    # Proyectos recientes
-    proyectos_recientes = Proyecto.objects.filter(
-        Q(creado_por=user) | Q(miembros=user)
-    ).distinct().order_by('-fecha_creacion')[:5]
-    
-    # Actividad reciente (últimos 10 cambios)
-    from proyectos.models import Historial
-    actividad_reciente = Historial.objects.filter(
-        Q(tarea__proyecto__creado_por=user) | Q(tarea__proyecto__miembros=user)
-    ).distinct().order_by('-fecha')[:10]
-    
-    # Datos para gráficos
-    # Tareas por estado
-    tareas_por_estado = {
-        'pendiente': Tarea.objects.filter(estado='pendiente').count(),
-        'en_progreso': Tarea.objects.filter(estado='en_progreso').count(),
-        'completada': Tarea.objects.filter(estado='completada').count(),
-    }
-    
-    # Tareas por prioridad
-    tareas_por_prioridad = {
-        'baja': Tarea.objects.filter(prioridad='baja').count(),
-        'media': Tarea.objects.filter(prioridad='media').count(),
-        'alta': Tarea.objects.filter(prioridad='alta').count(),
-    }
-    
-    # Proyectos por mes (últimos 6 meses) para gráfica
-    import json
-    from django.db.models.functions import TruncMonth
-    seis_meses_atras = timezone.now() - timedelta(days=180)
-    proyectos_mensuales = Proyecto.objects.filter(
-        fecha_creacion__gte=seis_meses_atras
-    ).annotate(
-        mes=TruncMonth('fecha_creacion')
-    ).values('mes').annotate(
-        total=Count('id')
-    ).order_by('mes')
-    
+    context = contexto_dashboard(estadisticas_globales(), estadisticas_usuario(request.user))
+    return render(request, 'panel/home.html', context)
+
+
+@login_required
+async def dashboard_async(request):
+    """
+    Dashboard async (servidor ASGI): las consultas independientes se ejecutan
+    a la vez en distintos hilos y conexiones
+    """
+    globales, usuario = await aestadisticas(await request.auser())
+    # render() puede consultar la BD (request.user en las plantillas)
+    return await sync_to_async(render)(request, 'panel/home.html', contexto_dashboard(globales, usuario))
+
+
+def contexto_dashboard(globales, usuario):
+    """Contexto de panel/home.html a partir de las instantáneas"""
     # Preparar datos para Chart.js
     meses_labels = []
     meses_data = []
     meses_nombres = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio', 
                      'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
     
-    if proyectos_mensuales:
-        for item in proyectos_mensuales:
-            mes_num = item['mes'].month - 1
-            anio = item['mes'].year
-            mes_label = f"{meses_nombres[mes_num]} {anio}"
-            meses_labels.append(mes_label)
-            meses_data.append(item['total'])
+    if globales['proyectos_por_mes']:
+        for mes, total in globales['proyectos_por_mes']:
+            meses_labels.append(f"{meses_nombres[mes.month - 1]} {mes.year}")
+            meses_data.append(total)
     else:
         # Si no hay datos, mostrar mes actual con 0
         mes_actual = timezone.now().month - 1
@@ -109,35 +53,20 @@ def dashboard(request):
         meses_labels.append(f"{meses_nombres[mes_actual]} {anio_actual}")
         meses_data.append(0)
     
-    proyectos_por_mes_labels = json.dumps(meses_labels)
-    proyectos_por_mes_data = json.dumps(meses_data)
-    
     context = {
         # Estadísticas
-        'total_proyectos': total_proyectos,
-        'mis_proyectos': mis_proyectos,
-        'total_tareas': total_tareas,
-        'mis_tareas': mis_tareas,
-        'tareas_pendientes': tareas_pendientes,
-        'tareas_en_progreso': tareas_en_progreso,
-        'tareas_completadas': tareas_completadas,
-        'tareas_vencidas': tareas_vencidas,
-        'notificaciones_count': notificaciones_count,
-        
-        # Listas
-        'tareas_proximas': tareas_proximas,
-        'notificaciones_recientes': notificaciones_recientes,
-        'proyectos_recientes': proyectos_recientes,
-        'actividad_reciente': actividad_reciente,
-        
+        'total_proyectos': globales['total_proyectos'],
+        'total_tareas': globales['total_tareas'],
+        **usuario,
+
         # Datos para gráficos (JSON)
-        'tareas_por_estado': tareas_por_estado,
-        'tareas_por_prioridad': tareas_por_prioridad,
-        'proyectos_por_mes_labels': proyectos_por_mes_labels,
-        'proyectos_por_mes_data': proyectos_por_mes_data,
+        'tareas_por_estado': globales['tareas_por_estado'],
+        'tareas_por_prioridad': globales['tareas_por_prioridad'],
+        'proyectos_por_mes_labels': json.dumps(meses_labels),
+        'proyectos_por_mes_data': json.dumps(meses_data),
     }
     
-    return render(request, 'panel/home.html', context)
+    return context
 
 
 @login_required
@@ -145,58 +74,49 @@ def estadisticas_json(request):
     """
     Vista que retorna estadísticas en formato JSON para gráficos dinámicos
     """
-    # Tareas por estado
+    return JsonResponse(datos_estadisticas(estadisticas_globales(), estadisticas_usuario(request.user)))
+
+
+@login_required
+async def estadisticas_json_async(request):
+    """Versión async de estadisticas_json (ver dashboard_async)"""
+    globales, usuario = await aestadisticas(await request.auser())
+    return JsonResponse(datos_estadisticas(globales, usuario))
+
+
+def datos_estadisticas(globales, usuario):
+    """Datos de los gráficos a partir de las instantáneas"""
     tareas_por_estado = {
         'labels': ['Pendientes', 'En Progreso', 'Completadas'],
-        'data': [
-            Tarea.objects.filter(estado='pendiente').count(),
-            Tarea.objects.filter(estado='en_progreso').count(),
-            Tarea.objects.filter(estado='completada').count(),
-        ]
+        'data': list(globales['tareas_por_estado'].values()),
     }
     
-    # Tareas por prioridad
     tareas_por_prioridad = {
         'labels': ['Baja', 'Media', 'Alta'],
-        'data': [
-            Tarea.objects.filter(prioridad='baja').count(),
-            Tarea.objects.filter(prioridad='media').count(),
-            Tarea.objects.filter(prioridad='alta').count(),
-        ]
+        'data': list(globales['tareas_por_prioridad'].values()),
     }
     
-    # Proyectos por mes (últimos 6 meses)
-    from django.db.models.functions import TruncMonth
-    from datetime import datetime, timedelta
-    
-    seis_meses_atras = timezone.now() - timedelta(days=180)
-    proyectos_por_mes = Proyecto.objects.filter(
-        fecha_creacion__gte=seis_meses_atras
-    ).annotate(
-        mes=TruncMonth('fecha_creacion')
-    ).values('mes').annotate(
-        total=Count('id')
-    ).order_by('mes')
-    
-    meses_labels = []
-    meses_data = []
-    for item in proyectos_por_mes:
-        mes_nombre = item['mes'].strftime('%B %Y')
-        meses_labels.append(mes_nombre)
-        meses_data.append(item['total'])
-    
     proyectos_mensuales = {
-        'labels': meses_labels,
-        'data': meses_data
+        'labels': [mes.strftime('%B %Y') for mes, _ in globales['proyectos_por_mes']],
+        'data': [total for _, total in globales['proyectos_por_mes']],
+    }
+    
+    # Evolución diaria de las tareas (resúmenes diarios)
+    evolucion = globales['evolucion_tareas']
+    evolucion_tareas = {
+        'labels': [dia['fecha'].strftime('%d/%m') for dia in evolucion],
+        'creadas': [dia['tareas_creadas'] for dia in evolucion],
+        'completadas': [dia['tareas_completadas'] for dia in evolucion],
+        'abiertas': [dia['abiertas_pendiente'] + dia['abiertas_en_progreso'] for dia in evolucion],
     }
     
     # Tareas del usuario actual por estado
     mis_tareas_estado = {
         'labels': ['Pendientes', 'En Progreso', 'Completadas'],
         'data': [
-            request.user.tareas_asignadas.filter(estado='pendiente').count(),
-            request.user.tareas_asignadas.filter(estado='en_progreso').count(),
-            request.user.tareas_asignadas.filter(estado='completada').count(),
+            usuario['tareas_pendientes'],
+            usuario['tareas_en_progreso'],
+            usuario['tareas_completadas'],
         ]
     }
     
@@ -204,7 +124,8 @@ def estadisticas_json(request):
         'tareas_por_estado': tareas_por_estado,
         'tareas_por_prioridad': tareas_por_prioridad,
         'proyectos_mensuales': proyectos_mensuales,
+        'evolucion_tareas': evolucion_tareas,
         'mis_tareas_estado': mis_tareas_estado,
     }
     
-    return JsonResponse(data)
+    return data
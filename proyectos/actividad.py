@@ -0,0 +1,118 @@
+"""
+Feed de actividad por usuario (fan-out en escritura).
+
+Cada fila de Historial escrita con registro.escribir se reparte en una entrada
+de Actividad para el creador y cada miembro del proyecto de la tarea. Leer el
+feed es un rango sobre el índice (usuario, fecha, id), sin joins ni distinct().
+Los feeds se recortan a MAXIMO_POR_USUARIO entradas con recortar_actividad.
+"""
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Q
+
+from .models import Actividad, Historial, Proyecto, Tarea
+
+
+MAXIMO_POR_USUARIO = 500
+
+
+def destinatarios(proyectos_ids, using=DEFAULT_DB_ALIAS):
+    """{proyecto_id: {usuario_id, ...}} con el creador y los miembros de cada proyecto"""
+    usuarios = defaultdict(set)
+    for pk, creador_id in Proyecto.objects.using(using).filter(pk__in=proyectos_ids).values_list('pk', 'creado_por_id'):
+        usuarios[pk].add(creador_id)
+    for pk, usuario_id in Proyecto.miembros.through.objects.using(using).filter(
+        proyecto_id__in=proyectos_ids
+    ).values_list('proyecto_id', 'user_id'):
+        usuarios[pk].add(usuario_id)
+    return usuarios
+
+
+def repartir(historiales, using=DEFAULT_DB_ALIAS, usuarios_ids=None, ignore_conflicts=False):
+    """
+    Crea las entradas de Actividad de filas de Historial ya guardadas.
+    Con usuarios_ids solo para esos usuarios (nuevos miembros).
+    """
+    historiales = [historial for historial in historiales if historial.pk]
+    if not historiales:
+        return []
+
+    # Proyecto de cada tarea: las filas de registro.filas_tarea ya traen la tarea
+    proyectos = {
+        historial.tarea_id: historial.tarea.proyecto_id
+        for historial in historiales
+        if Historial.tarea.is_cached(historial)
+    }
+    faltan = {historial.tarea_id for historial in historiales} - proyectos.keys()
+    if faltan:
+        proyectos.update(Tarea.objects.using(using).filter(pk__in=faltan).values_list('pk', 'proyecto_id'))
+
+    usuarios = destinatarios(set(proyectos.values()), using=using)
+    entradas = []
+    for historial in historiales:
+        proyecto_id = proyectos.get(historial.tarea_id)
+        for usuario_id in usuarios.get(proyecto_id, ()):
+            if usuarios_ids is None or usuario_id in usuarios_ids:
+                entradas.append(Actividad(
+                    usuario_id=usuario_id,
+                    historial_id=historial.pk,
+                    proyecto_id=proyecto_id,
+                    fecha=historial.fecha,
+                ))
+    return Actividad.objects.using(using).bulk_create(entradas, ignore_conflicts=ignore_conflicts)
+
+
+def feed(usuario, antes=None, limite=20):
+    """
+    Entradas del feed del usuario, más recientes primero. antes=(fecha, id)
+    de la última entrada recibida para pedir la página siguiente.
+    """
+    entradas = Actividad.objects.filter(usuario=usuario)
+    if antes is not None:
+        fecha, pk = antes
+        entradas = entradas.filter(Q(fecha__lt=fecha) | Q(fecha=fecha, pk__lt=pk))
+    return entradas.select_related('historial__usuario', 'historial__tarea').order_by('-fecha', '-id')[:limite]
+
+
+def anadir_miembros(proyecto_id, usuarios_ids, using=DEFAULT_DB_ALIAS):
+    """Da a los nuevos miembros la actividad reciente del proyecto"""
+    historiales = Historial.objects.using(using).filter(
+        tarea__proyecto_id=proyecto_id
+    ).order_by('-fecha')[:MAXIMO_POR_USUARIO]
+    repartir(historiales, using=using, usuarios_ids=set(usuarios_ids), ignore_conflicts=True)
+
+
+def quitar_miembros(proyecto_id, usuarios_ids, using=DEFAULT_DB_ALIAS):
+    """Quita la actividad del proyecto a quien deja de ser miembro (salvo al creador)"""
+    Actividad.objects.using(using).filter(proyecto_id=proyecto_id, usuario_id__in=usuarios_ids).exclude(
+        usuario_id__in=Proyecto.objects.using(using).filter(pk=proyecto_id).values('creado_por_id')
+    ).delete()
+
+
+def recortar(maximo=MAXIMO_POR_USUARIO):
+    """Deja como mucho `maximo` entradas por usuario. Devuelve las eliminadas."""
+    eliminadas = 0
+    excedidos = Actividad.objects.order_by().values('usuario_id').annotate(
+        total=Count('pk')
+    ).filter(total__gt=maximo).values_list('usuario_id', flat=True)
+    for usuario_id in excedidos:
+        entradas = Actividad.objects.filter(usuario_id=usuario_id)
+        fecha, pk = entradas.order_by('-fecha', '-id').values_list('fecha', 'pk')[maximo - 1]
+        eliminadas += entradas.filter(Q(fecha__lt=fecha) | Q(fecha=fecha, pk__lt=pk)).delete()[0]
+    return eliminadas
+
+
+def rellenar(desde=None, tamano_lote=2000):
+    """Reparte las filas de Historial existentes (desde la fecha indicada). Devuelve las entradas creadas."""
+    historiales = Historial.objects.select_related('tarea').only('pk', 'fecha', 'tarea_id', 'tarea__proyecto_id')
+    if desde is not None:
+        historiales = historiales.filter(fecha__gte=desde)
+
+    antes = Actividad.objects.count()
+    ultimo_pk = 0
+    while bloque := list(historiales.filter(pk__gt=ultimo_pk).order_by('pk')[:tamano_lote]):
+        ultimo_pk = bloque[-1].pk
+        # ignore_conflicts: puede haber entradas ya repartidas
+        repartir(bloque, ignore_conflicts=True)
+    return Actividad.objects.count() - antes
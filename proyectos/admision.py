@@ -0,0 +1,201 @@
+"""
+Control de admisión por nivel de coste de las vistas.
+
+Cada vista tiene un nivel (por defecto 'ligero'; se cambia con @nivel_coste).
+Cada petición gasta el coste de su nivel del presupuesto de su usuario, un
+cubo de fichas que se rellena a ritmo constante; si no alcanza, 429. Los
+niveles con 'concurrencia' tienen además un número fijo de plazas: quien no
+encuentra plaza recibe 429 con Retry-After (el coste ya gastado no se
+devuelve). Con 'cola' y 'espera' puede esperar antes en una cola acotada, pero
+la espera ocupa el hilo del servidor que atiende la petición: solo conviene
+con esperas de pocos segundos y hilos de sobra.
+
+Plazas, colas, presupuestos y métricas viven en la caché, así que los límites
+son comunes a todos los procesos solo si la caché es compartida (Redis en
+producción); con la caché en memoria cada proceso tiene los suyos, y
+check --deploy lo avisa (ver checks.py). Las plazas
+son claves con cache.add() y caducan solas tras 'duracion_maxima' por si un
+proceso muere sin liberarlas. Cada plaza guarda una ficha única y solo se
+borra si aún guarda la suya: una plaza caducada y ocupada por otra petición
+no se libera al terminar la primera. El presupuesto se lee y se escribe sin
+bloqueo: dos peticiones simultáneas del mismo usuario pueden gastar algo de más.
+"""
+import math
+import secrets
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+NIVEL_POR_DEFECTO = 'ligero'
+
+NIVELES = getattr(settings, 'ADMISION_NIVELES', {
+    'ligero': {'coste': 1},
+    'medio': {'coste': 5},
+    'pesado': {'coste': 30, 'concurrencia': 2, 'duracion_maxima': 300},
+})
+
+# Fichas del cubo de cada usuario y fichas que recupera por segundo
+PRESUPUESTO = getattr(settings, 'ADMISION_PRESUPUESTO', {'capacidad': 200, 'recarga': 5})
+
+EVENTOS = ('admitidas', 'encoladas', 'rechazadas', 'sin_presupuesto')
+
+# Cada cuánto se vuelve a buscar plaza desde la cola
+INTERVALO_COLA = 0.1
+
+
+class Rechazada(Exception):
+    """La petición no se admite; `reintentar` son los segundos para Retry-After"""
+
+    def __init__(self, mensaje, reintentar):
+        super().__init__(mensaje)
+        self.reintentar = reintentar
+
+
+def nivel_coste(nivel):
+    """Decorador que asigna un nivel de coste a una vista o a una acción de un viewset"""
+    if nivel not in NIVELES:
+        raise ValueError(f"Nivel de coste desconocido: '{nivel}'")
+
+    def decorador(vista):
+        vista.nivel_coste = nivel
+        return vista
+    return decorador
+
+
+def nivel_de_vista(vista, metodo):
+    """Nivel de coste de la función de vista que resuelve la URL"""
+    nivel = getattr(vista, 'nivel_coste', None)
+    # Vistas basadas en clase: de DRF (cls, con sus acciones) o de Django (view_class)
+    clase = getattr(vista, 'cls', None) or getattr(vista, 'view_class', None)
+    if nivel is None and clase is not None:
+        accion = getattr(clase, (getattr(vista, 'actions', None) or {}).get(metodo.lower(), ''), None)
+        nivel = getattr(accion, 'nivel_coste', None) or getattr(clase, 'nivel_coste', None)
+    return nivel or NIVEL_POR_DEFECTO
+
+
+def _contar(nivel, evento):
+    clave = f'admision:metricas:{nivel}:{evento}'
+    if not cache.add(clave, 1, timeout=None):
+        cache.incr(clave)
+
+
+def metricas():
+    """{nivel: {evento: total}} desde el último reinicio"""
+    claves = {
+        f'admision:metricas:{nivel}:{evento}': (nivel, evento)
+        for nivel in NIVELES for evento in EVENTOS
+    }
+    valores = cache.get_many(claves)
+    resultado = {nivel: dict.fromkeys(EVENTOS, 0) for nivel in NIVELES}
+    for clave, valor in valores.items():
+        nivel, evento = claves[clave]
+        resultado[nivel][evento] = valor
+    return resultado
+
+
+def reiniciar_metricas():
+    cache.delete_many([f'admision:metricas:{nivel}:{evento}' for nivel in NIVELES for evento in EVENTOS])
+
+
+def gastar(identidad, coste):
+    """Descuenta `coste` fichas del cubo de `identidad`; Rechazada si no alcanzan"""
+    capacidad, recarga = PRESUPUESTO['capacidad'], PRESUPUESTO['recarga']
+    clave = f'admision:presupuesto:{identidad}'
+    ahora = time.time()
+    fichas, fecha = cache.get(clave, (capacidad, ahora))
+    fichas = min(capacidad, fichas + (ahora - fecha) * recarga)
+    if fichas < coste:
+        raise Rechazada('Presupuesto de peticiones agotado', math.ceil((coste - fichas) / recarga))
+    # Pasado ese tiempo el cubo vuelve a estar lleno y la clave sobra
+    cache.set(clave, (fichas - coste, ahora), timeout=math.ceil(capacidad / recarga))
+
+
+# Borra la clave solo si guarda la ficha, en una sola operación de Redis
+_BORRAR_SI_ES = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _borrar_si_es(clave, ficha):
+    """Borra `clave` de la caché solo si aún guarda `ficha`"""
+    cliente = getattr(cache, '_cache', None)
+    if hasattr(cliente, 'get_client'):
+        # RedisCache guarda los enteros tal cual, sin serializar
+        clave = cache.make_and_validate_key(clave)
+        cliente.get_client(clave, write=True).eval(_BORRAR_SI_ES, 1, clave, ficha)
+    elif cache.get(clave) == ficha:
+        cache.delete(clave)
+
+
+class Plaza:
+    """Plaza (o turno en la cola) ocupada en un nivel con concurrencia limitada"""
+
+    def __init__(self, clave, ficha):
+        self.clave = clave
+        self.ficha = ficha
+
+    def liberar(self):
+        if self.clave is not None:
+            _borrar_si_es(self.clave, self.ficha)
+            self.clave = None
+
+
+def _ocupar(nivel, tipo, total, duracion):
+    """Primera Plaza libre de `tipo` ('plaza' o 'cola'), o None"""
+    ficha = secrets.randbits(63)
+    for indice in range(total):
+        clave = f'admision:{nivel}:{tipo}:{indice}'
+        if cache.add(clave, ficha, timeout=duracion):
+            return Plaza(clave, ficha)
+    return None
+
+
+def _entrar(nivel, configuracion):
+    """Plaza del nivel, esperando en la cola si hace falta"""
+    concurrencia, duracion = configuracion['concurrencia'], configuracion.get('duracion_maxima', 300)
+    plaza = _ocupar(nivel, 'plaza', concurrencia, duracion)
+    if plaza:
+        return plaza
+
+    espera = configuracion.get('espera', 0)
+    reintentar = max(1, math.ceil(espera))
+    turno = _ocupar(nivel, 'cola', configuracion.get('cola', 0), math.ceil(espera) + 1)
+    if turno is None:
+        _contar(nivel, 'rechazadas')
+        raise Rechazada('Demasiadas peticiones de este tipo en curso', reintentar)
+
+    _contar(nivel, 'encoladas')
+    try:
+        limite = time.monotonic() + espera
+        while time.monotonic() < limite:
+            time.sleep(INTERVALO_COLA)
+            plaza = _ocupar(nivel, 'plaza', concurrencia, duracion)
+            if plaza:
+                return plaza
+    finally:
+        turno.liberar()
+    _contar(nivel, 'rechazadas')
+    raise Rechazada('Demasiadas peticiones de este tipo en curso', reintentar)
+
+
+def admitir(nivel, identidad):
+    """
+    Admite una petición de `nivel` de `identidad` o lanza Rechazada. Devuelve
+    la Plaza ocupada, que hay que liberar al terminar, o None si el nivel no
+    limita la concurrencia.
+    """
+    configuracion = NIVELES[nivel]
+    try:
+        gastar(identidad, configuracion['coste'])
+    except Rechazada:
+        _contar(nivel, 'sin_presupuesto')
+        raise
+
+    plaza = _entrar(nivel, configuracion) if configuracion.get('concurrencia') else None
+    _contar(nivel, 'admitidas')
+    return plaza
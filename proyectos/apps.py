@@ -7,3 +7,4 @@ class ProyectosConfig(AppConfig):
 
     def ready(self):
         import proyectos.signals  # Importar signals
+        import proyectos.checks  # noqa: F401
@@ -0,0 +1,30 @@
+"""
+Ejecución de código síncrono (ORM) desde vistas y aplicaciones async.
+
+sync_to_async con thread_sensitive=True (lo que usa el ORM async de Django)
+ejecuta todas las llamadas de una petición en un mismo hilo, una detrás de
+otra. en_hilo_compartido usa el pool compartido de hilos: cada llamada puede
+ir en un hilo distinto, con su propia conexión a la BD, y varias pueden
+ejecutarse a la vez con asyncio.gather().
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+
+def _con_conexion(funcion):
+    """Las conexiones de los hilos del pool no pasan por request_started/finished"""
+    @wraps(funcion)
+    def envoltura(*args, **kwargs):
+        close_old_connections()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return envoltura
+
+
+def en_hilo_compartido(funcion):
+    """Versión async de `funcion` que se ejecuta en el pool compartido de hilos"""
+    return sync_to_async(_con_conexion(funcion), thread_sensitive=False)
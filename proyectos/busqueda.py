@@ -0,0 +1,432 @@
+"""
+Búsqueda de texto completo en proyectos, tareas y comentarios.
+
+Cada base de datos tiene su motor: en SQLite una tabla virtual FTS5 por
+modelo (con contenido externo: solo guarda el índice) mantenida por triggers;
+en PostgreSQL una columna tsvector generada con índice GIN; en el resto,
+icontains sin orden de relevancia. Los triggers y la columna generada siguen
+a cualquier escritura, también a los update(), bulk_create() y borrados en
+cascada que no envían señales.
+
+Una búsqueda pide al motor los LIMITE resultados más relevantes dentro del
+queryset ya filtrado, entre sus CANDIDATOS coincidencias más recientes, y
+devuelve ese queryset anotado con 'rango' (1 es el más relevante). Lo que
+queda fuera de esos topes no aparece en ninguna página: la clasificación dice
+si los alcanzó (truncada) para que las vistas lo avisen. Los
+fragmentos resaltados se calculan aparte y solo para las filas que se
+muestran (en Python salvo en PostgreSQL, que usa ts_headline para marcar
+también las palabras con la misma raíz), con las coincidencias entre <mark>
+y el resto escapado.
+
+La última palabra busca también por prefijo (si tiene al menos dos letras),
+para las búsquedas mientras se escribe.
+"""
+import re
+import unicodedata
+from collections import namedtuple
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import IntegerField, Q, TextField, Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Comentario, Proyecto, Tarea
+
+
+# Campos indexados de cada modelo, de más a menos peso
+CAMPOS = {
+    Proyecto: ('nombre', 'descripcion'),
+    Tarea: ('titulo', 'descripcion'),
+    Comentario: ('contenido',),
+}
+
+# Resultados más relevantes que devuelve una búsqueda
+LIMITE = 500
+
+# Coincidencias que se puntúan como mucho, las más recientes: con una palabra
+# que aparece en casi todas las filas puntuarlas todas costaría segundos
+CANDIDATOS = 5000
+
+# pk de los resultados, en orden de relevancia, y si algún tope dejó fuera coincidencias
+Clasificacion = namedtuple('Clasificacion', ['pks', 'truncada'])
+
+# Configuración de texto de PostgreSQL (idioma de las raíces y palabras vacías)
+CONFIGURACION = 'spanish'
+
+# Palabras que no se buscan si la búsqueda tiene otras, como en la configuración
+# 'spanish' de PostgreSQL: están en casi todas las filas y no distinguen ninguna
+PALABRAS_VACIAS = frozenset(
+    'a al como con de del el en es la las lo los o para por que se sin su sus un una y'.split()
+)
+
+# Marcas de las coincidencias en el texto del motor, antes de escapar el HTML
+_INICIO, _FIN = '\x02', '\x03'
+
+# Palabras de un fragmento resaltado
+PALABRAS_FRAGMENTO = 24
+
+
+def indexado(modelo):
+    return modelo in CAMPOS
+
+
+def palabras(texto):
+    todas = re.findall(r'\w+', texto.lower())
+    # La última se conserva: puede ser el principio de una palabra que se está escribiendo
+    utiles = [palabra for palabra in todas[:-1] if palabra not in PALABRAS_VACIAS] + todas[-1:]
+    return utiles if set(utiles) - PALABRAS_VACIAS else todas
+
+
+def _prefijo(terminos):
+    return len(terminos[-1]) >= 2
+
+
+def _html(texto):
+    return mark_safe(escape(texto).replace(_INICIO, '<mark>').replace(_FIN, '</mark>'))
+
+
+def _sin_acentos(texto):
+    return ''.join(letra for letra in unicodedata.normalize('NFD', texto) if not unicodedata.combining(letra))
+
+
+def _largo(modelo, campo):
+    """Los campos de texto largo se resaltan con un fragmento y no enteros"""
+    return isinstance(modelo._meta.get_field(campo), TextField)
+
+
+def _subconsulta(queryset):
+    """
+    SQL y parámetros de las pk del queryset, o None si no filtra nada. Lanza
+    EmptyResultSet si el queryset no puede tener filas.
+    """
+    if not queryset.query.where:
+        return None
+    return queryset.order_by().values('pk').query.sql_with_params()
+
+
+def _candidatos(sql, pk):
+    """
+    Las CANDIDATOS + 1 coincidencias más recientes de `sql` (pk y puntuacion),
+    numeradas en 'orden' y con su número en 'total': la que sobra solo dice si
+    hay más coincidencias que candidatos
+    """
+    return (
+        f'SELECT {pk}, puntuacion, ROW_NUMBER() OVER (ORDER BY {pk} DESC) AS orden, COUNT(*) OVER () AS total '
+        f'FROM ({sql} ORDER BY {pk} DESC LIMIT %s) recientes'
+    )
+
+
+def _clasificacion(filas, limite):
+    """Clasificacion de las filas (pk, total) pedidas con un resultado de más"""
+    truncada = len(filas) > limite or bool(filas) and filas[0][1] > CANDIDATOS
+    return Clasificacion([pk for pk, _ in filas[:limite]], truncada)
+
+
+class MotorBasico:
+    """icontains sobre cada campo: sin índice ni orden de relevancia"""
+
+    def instalar(self, connection, modelo):
+        pass
+
+    def desinstalar(self, connection, modelo):
+        pass
+
+    def reconstruir(self, connection, modelo):
+        pass
+
+    def reparar(self, connection, modelo):
+        """Completa lo que le falte al índice; devuelve si hay que reconstruirlo"""
+        return False
+
+    def clasificar(self, queryset, terminos, limite):
+        condicion = Q()
+        for termino in terminos:
+            alguno = Q()
+            for campo in CAMPOS[queryset.model]:
+                alguno |= Q(**{f'{campo}__icontains': termino})
+            condicion &= alguno
+        pks = list(queryset.filter(condicion).values_list('pk', flat=True)[:limite + 1])
+        return Clasificacion(pks[:limite], len(pks) > limite)
+
+    def coincide(self, palabra, terminos):
+        return any(termino in palabra for termino in terminos)
+
+    def resaltar(self, modelo, pks, terminos, using):
+        """Marca en Python las palabras de las filas que coinciden con la búsqueda"""
+        resultado = {}
+        for pk, *valores in modelo.objects.using(using).filter(pk__in=pks).values_list('pk', *CAMPOS[modelo]):
+            resultado[pk] = {
+                campo: _html(self.marcar(valor or '', terminos, _largo(modelo, campo)))
+                for campo, valor in zip(CAMPOS[modelo], valores)
+            }
+        return resultado
+
+    def marcar(self, texto, terminos, fragmento):
+        """`texto` con las coincidencias marcadas; si `fragmento`, solo las palabras de alrededor"""
+        palabras_texto = list(re.finditer(r'\w+', texto))
+        coincidencias = [
+            posicion for posicion, palabra in enumerate(palabras_texto)
+            if self.coincide(palabra.group().lower(), terminos)
+        ]
+        desde, hasta = 0, len(palabras_texto)
+        if fragmento and hasta > PALABRAS_FRAGMENTO:
+            desde = max(0, min((coincidencias or [0])[0] - PALABRAS_FRAGMENTO // 4, hasta - PALABRAS_FRAGMENTO))
+            hasta = desde + PALABRAS_FRAGMENTO
+
+        inicio = palabras_texto[desde].start() if fragmento and desde else 0
+        partes = ['…'] if inicio else []
+        for posicion in coincidencias:
+            if desde <= posicion < hasta:
+                palabra = palabras_texto[posicion]
+                partes += [texto[inicio:palabra.start()], _INICIO, palabra.group(), _FIN]
+                inicio = palabra.end()
+        if fragmento and hasta < len(palabras_texto):
+            partes += [texto[inicio:palabras_texto[hasta - 1].end()], '…']
+        else:
+            partes.append(texto[inicio:])
+        return ''.join(partes)
+
+
+class MotorSQLite(MotorBasico):
+    """Tabla virtual FTS5 <tabla>_busqueda con los campos del modelo"""
+
+    def _tabla(self, modelo):
+        return f'{modelo._meta.db_table}_busqueda'
+
+    def _triggers(self, modelo):
+        tabla, indice = modelo._meta.db_table, self._tabla(modelo)
+        columnas = ', '.join(CAMPOS[modelo])
+        nuevos = ', '.join(f'new.{campo}' for campo in CAMPOS[modelo])
+        viejos = ', '.join(f'old.{campo}' for campo in CAMPOS[modelo])
+        # Con contenido externo el borrado repite los valores indexados de la fila
+        alta = f"INSERT INTO {indice}(rowid, {columnas}) VALUES (new.id, {nuevos});"
+        baja = f"INSERT INTO {indice}({indice}, rowid, {columnas}) VALUES ('delete', old.id, {viejos});"
+        return {
+            f'{indice}_ai': f'AFTER INSERT ON {tabla} BEGIN {alta} END',
+            f'{indice}_ad': f'AFTER DELETE ON {tabla} BEGIN {baja} END',
+            f'{indice}_au': f'AFTER UPDATE OF {columnas} ON {tabla} BEGIN {baja} {alta} END',
+        }
+
+    def _existentes(self, connection, modelo):
+        """Nombres de la tabla virtual y los triggers del modelo que ya existen"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE %s",
+                [f'{self._tabla(modelo)}%'],
+            )
+            return {nombre for (nombre,) in cursor.fetchall()}
+
+    def instalar(self, connection, modelo):
+        indice = self._tabla(modelo)
+        nuevo = indice not in self._existentes(connection, modelo)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {indice} USING fts5("
+                f"{', '.join(CAMPOS[modelo])}, content='{modelo._meta.db_table}', content_rowid='id', "
+                f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            )
+            for nombre, definicion in self._triggers(modelo).items():
+                cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {nombre} {definicion}')
+        # Con contenido externo el índice nace vacío aunque la tabla tenga filas
+        if nuevo:
+            self.reconstruir(connection, modelo)
+
+    def desinstalar(self, connection, modelo):
+        with connection.cursor() as cursor:
+            for nombre in self._triggers(modelo):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {nombre}')
+            cursor.execute(f'DROP TABLE IF EXISTS {self._tabla(modelo)}')
+
+    def reconstruir(self, connection, modelo):
+        indice = self._tabla(modelo)
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {indice}({indice}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {indice}({indice}) VALUES ('optimize')")
+
+    def reparar(self, connection, modelo):
+        """
+        Vuelve a crear los triggers que falten: SQLite rehace la tabla en
+        algunas migraciones y los pierde. Devuelve si faltaba alguno.
+        """
+        existentes = self._existentes(connection, modelo)
+        if self._tabla(modelo) not in existentes or set(self._triggers(modelo)) <= existentes:
+            return False
+        self.instalar(connection, modelo)
+        return True
+
+    def _consulta(self, terminos):
+        return ' '.join(f'"{termino}"' for termino in terminos) + ('*' if _prefijo(terminos) else '')
+
+    def clasificar(self, queryset, terminos, limite):
+        modelo = queryset.model
+        indice = self._tabla(modelo)
+        pesos = ', '.join(str(float(len(CAMPOS[modelo]) - posicion)) for posicion in range(len(CAMPOS[modelo])))
+        sql = f'SELECT rowid, bm25({indice}, {pesos}) AS puntuacion FROM {indice} WHERE {indice} MATCH %s'
+        parametros = [self._consulta(terminos)]
+        subconsulta = _subconsulta(queryset)
+        if subconsulta:
+            # Con +rowid SQLite no pasa cada pk a FTS5 como una búsqueda aparte
+            sql += f' AND +rowid IN ({subconsulta[0]})'
+            parametros.extend(subconsulta[1])
+        # FTS5 recorre las coincidencias por rowid y se detiene en los candidatos;
+        # bm25() es menor cuanto más relevante
+        sql = (
+            f'SELECT rowid, total FROM ({_candidatos(sql, "rowid")}) '
+            f'WHERE orden <= %s ORDER BY puntuacion, rowid DESC LIMIT %s'
+        )
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(sql, [*parametros, CANDIDATOS + 1, CANDIDATOS, limite + 1])
+            return _clasificacion(cursor.fetchall(), limite)
+
+    def coincide(self, palabra, terminos):
+        # Como el tokenizador unicode61 con remove_diacritics
+        palabra = _sin_acentos(palabra)
+        terminos = [_sin_acentos(termino) for termino in terminos]
+        return palabra in terminos or (_prefijo(terminos) and palabra.startswith(terminos[-1]))
+
+
+class MotorPostgreSQL(MotorBasico):
+    """Columna tsvector 'busqueda' generada a partir de los campos, con índice GIN"""
+
+    def _vector(self, modelo):
+        pesos = 'ABCD'
+        return ' || '.join(
+            f"setweight(to_tsvector('{CONFIGURACION}', coalesce({campo}, '')), '{pesos[min(posicion, 3)]}')"
+            for posicion, campo in enumerate(CAMPOS[modelo])
+        )
+
+    def instalar(self, connection, modelo):
+        tabla = modelo._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'ALTER TABLE {tabla} ADD COLUMN IF NOT EXISTS busqueda tsvector '
+                f'GENERATED ALWAYS AS ({self._vector(modelo)}) STORED'
+            )
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {tabla}_busqueda_idx ON {tabla} USING gin (busqueda)')
+
+    def desinstalar(self, connection, modelo):
+        with connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {modelo._meta.db_table} DROP COLUMN IF EXISTS busqueda')
+
+    def reconstruir(self, connection, modelo):
+        # La columna generada siempre está al día: solo se rehace el índice
+        with connection.cursor() as cursor:
+            cursor.execute(f'REINDEX INDEX {modelo._meta.db_table}_busqueda_idx')
+
+    def _consulta(self, terminos):
+        return ' & '.join(f"'{termino}'" for termino in terminos) + (':*' if _prefijo(terminos) else '')
+
+    def clasificar(self, queryset, terminos, limite):
+        tabla = queryset.model._meta.db_table
+        sql = (
+            f'SELECT id, ts_rank(busqueda, consulta) AS puntuacion '
+            f'FROM {tabla}, to_tsquery(%s::regconfig, %s) consulta WHERE busqueda @@ consulta'
+        )
+        parametros = [CONFIGURACION, self._consulta(terminos)]
+        subconsulta = _subconsulta(queryset)
+        if subconsulta:
+            sql += f' AND id IN ({subconsulta[0]})'
+            parametros.extend(subconsulta[1])
+        sql = (
+            f'SELECT id, total FROM ({_candidatos(sql, "id")}) candidatos '
+            f'WHERE orden <= %s ORDER BY puntuacion DESC, id DESC LIMIT %s'
+        )
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(sql, [*parametros, CANDIDATOS + 1, CANDIDATOS, limite + 1])
+            return _clasificacion(cursor.fetchall(), limite)
+
+    def resaltar(self, modelo, pks, terminos, using):
+        marcas = f'StartSel={_INICIO}, StopSel={_FIN}'
+        opciones = {
+            False: f'{marcas}, HighlightAll=true',
+            True: f'{marcas}, MaxWords={PALABRAS_FRAGMENTO}, MinWords={PALABRAS_FRAGMENTO // 2}',
+        }
+        columnas = ', '.join(
+            f"ts_headline('{CONFIGURACION}', coalesce({campo}, ''), consulta, %s)" for campo in CAMPOS[modelo]
+        )
+        sql = (
+            f'SELECT id, {columnas} FROM {modelo._meta.db_table}, to_tsquery(%s::regconfig, %s) consulta '
+            f'WHERE id = ANY(%s)'
+        )
+        parametros = [opciones[_largo(modelo, campo)] for campo in CAMPOS[modelo]]
+        with connections[using].cursor() as cursor:
+            cursor.execute(sql, [*parametros, CONFIGURACION, self._consulta(terminos), list(pks)])
+            return {
+                pk: {campo: _html(valor) for campo, valor in zip(CAMPOS[modelo], valores)}
+                for pk, *valores in cursor.fetchall()
+            }
+
+
+MOTORES = {
+    'sqlite': MotorSQLite(),
+    'postgresql': MotorPostgreSQL(),
+}
+
+
+def motor(connection):
+    return MOTORES.get(connection.vendor, MotorBasico())
+
+
+def clasificar(queryset, texto, limite=LIMITE):
+    """Clasificacion con los `limite` resultados más relevantes de `texto` dentro de `queryset`"""
+    terminos = palabras(texto)
+    if not terminos:
+        return Clasificacion([], False)
+    try:
+        return motor(connections[queryset.db]).clasificar(queryset, terminos, limite)
+    except EmptyResultSet:
+        # El queryset no puede tener filas (por ejemplo pk__in=[]) y no tiene SQL
+        return Clasificacion([], False)
+
+
+def por_rango(queryset, pks):
+    """Las filas `pks` del queryset anotadas con su posición en 'rango' y en ese orden"""
+    if not pks:
+        return queryset.none().annotate(rango=Value(0, output_field=IntegerField()))
+    columna = '%s.%s' % tuple(
+        connections[queryset.db].ops.quote_name(nombre)
+        for nombre in (queryset.model._meta.db_table, queryset.model._meta.pk.column)
+    )
+    # SQL escrito a mano: un Case() de cientos de When() tarda más en compilarse que en ejecutarse
+    casos = ' '.join(['WHEN %s THEN %s'] * len(pks))
+    posiciones = [valor for posicion, pk in enumerate(pks, start=1) for valor in (pk, posicion)]
+    return queryset.filter(pk__in=pks).annotate(
+        rango=RawSQL(f'CASE {columna} {casos} ELSE 0 END', posiciones, output_field=IntegerField())
+    ).order_by('rango')
+
+
+def buscar(queryset, texto, limite=LIMITE):
+    """Los resultados más relevantes de `texto` dentro de `queryset`, anotados con 'rango'"""
+    return por_rango(queryset, clasificar(queryset, texto, limite).pks)
+
+
+def resaltar(modelo, pks, texto, using='default'):
+    """{pk: {campo: HTML con las coincidencias entre <mark>}} de las filas `pks`"""
+    terminos = palabras(texto)
+    if not pks or not terminos:
+        return {}
+    return motor(connections[using]).resaltar(modelo, list(pks), terminos, using)
+
+
+def resaltar_objetos(objetos, texto):
+    """Guarda en `resaltado` de cada objeto sus campos resaltados"""
+    objetos = list(objetos)
+    if not objetos:
+        return objetos
+    modelo = type(objetos[0])
+    resaltados = resaltar(modelo, [objeto.pk for objeto in objetos], texto, objetos[0]._state.db)
+    for objeto in objetos:
+        objeto.resaltado = resaltados.get(objeto.pk, {})
+    return objetos
+
+
+def instalar(connection):
+    for modelo in CAMPOS:
+        motor(connection).instalar(connection, modelo)
+
+
+def desinstalar(connection):
+    for modelo in CAMPOS:
+        motor(connection).desinstalar(connection, modelo)
@@ -0,0 +1,30 @@
+"""
+Comprobaciones de `manage.py check --deploy`.
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from .admision import NIVELES
+
+
+# Cachés propias de cada proceso (o que no guardan nada)
+CACHES_NO_COMPARTIDAS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def cache_compartida(app_configs, **kwargs):
+    """El control de admisión y las versiones necesitan una caché común a todos los procesos"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend not in CACHES_NO_COMPARTIDAS:
+        return []
+    limitados = sorted(nivel for nivel, configuracion in NIVELES.items() if configuracion.get('concurrencia'))
+    return [Warning(
+        'La caché por defecto no es compartida entre procesos: cada proceso lleva sus propias plazas '
+        f"y presupuestos del control de admisión (niveles con concurrencia: {', '.join(limitados) or 'ninguno'}) "
+        'y sus propias versiones de los datos cacheados.',
+        hint='Define REDIS_URL para usar Redis como caché.',
+        id='proyectos.W001',
+    )]
@@ -0,0 +1,14 @@
+from django.utils.functional import SimpleLazyObject
+
+from .notificaciones import bandeja
+
+
+def notificaciones(request):
+    """
+    Bandeja de notificaciones de base.html. Solo se lee si la plantilla la
+    usa, y con la caché caliente no consulta la BD.
+    """
+    usuario = getattr(request, 'user', None)
+    if usuario is None or not usuario.is_authenticated:
+        return {}
+    return {'bandeja_notificaciones': SimpleLazyObject(lambda: bandeja(usuario.pk))}
@@ -0,0 +1,87 @@
+"""
+Difusión en proceso de los cambios en las notificaciones de cada usuario.
+
+Al confirmarse una transacción que crea o modifica notificaciones se avisa a
+las conexiones SSE abiertas de esos usuarios en este proceso (ver sse.py). El
+aviso no lleva datos: la conexión vuelve a leer de la BD lo que le falta, así
+que perder un aviso (p. ej. si la escritura ocurrió en otro proceso) solo
+retrasa la entrega hasta la siguiente comprobación periódica.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .versiones import invalidar_usuarios
+
+
+class Suscripcion:
+    """Aviso pendiente de una conexión, que se despierta desde cualquier hilo"""
+
+    def __init__(self, usuario_id):
+        self.usuario_id = usuario_id
+        self.loop = asyncio.get_running_loop()
+        self.evento = asyncio.Event()
+
+    def avisar(self):
+        try:
+            self.loop.call_soon_threadsafe(self.evento.set)
+        except RuntimeError:
+            # El bucle de eventos ya se cerró
+            pass
+
+    async def esperar(self, timeout):
+        """True si llegó un aviso antes de `timeout` segundos"""
+        try:
+            await asyncio.wait_for(self.evento.wait(), timeout)
+        except TimeoutError:
+            return False
+        self.evento.clear()
+        return True
+
+
+class Difusor:
+
+    def __init__(self):
+        self._suscripciones = defaultdict(set)
+        self._cerrojo = threading.Lock()
+
+    def suscribir(self, usuario_id):
+        suscripcion = Suscripcion(usuario_id)
+        with self._cerrojo:
+            self._suscripciones[usuario_id].add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion):
+        with self._cerrojo:
+            suscripciones = self._suscripciones.get(suscripcion.usuario_id)
+            if suscripciones is not None:
+                suscripciones.discard(suscripcion)
+                if not suscripciones:
+                    del self._suscripciones[suscripcion.usuario_id]
+
+    def publicar(self, usuarios_ids):
+        with self._cerrojo:
+            suscripciones = [
+                suscripcion
+                for usuario_id in usuarios_ids
+                for suscripcion in self._suscripciones.get(usuario_id, ())
+            ]
+        for suscripcion in suscripciones:
+            suscripcion.avisar()
+
+
+difusor = Difusor()
+
+
+def notificaciones_cambiadas(usuarios_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Las notificaciones de estos usuarios cambiaron: invalida sus instantáneas
+    cacheadas y avisa a sus conexiones SSE al confirmar la transacción
+    """
+    usuarios_ids = {pk for pk in usuarios_ids if pk}
+    if not usuarios_ids:
+        return
+    invalidar_usuarios(usuarios_ids, using=using)
+    transaction.on_commit(lambda: difusor.publicar(usuarios_ids), using=using)
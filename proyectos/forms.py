@@ -4,6 +4,20 @@ from django.core.exceptions import ValidationError
 from django.utils import timezone
 
 
+def validar_fecha_limite_nueva(fecha_limite):
+    """La fecha límite de una tarea nueva no puede estar en el pasado"""
+    if fecha_limite < timezone.now().date():
+        raise ValidationError('La fecha límite no puede ser en el pasado')
+
+
+def validar_fecha_limite_proyecto(fecha_limite, fecha_inicio, fecha_fin):
+    """La fecha límite debe estar dentro del rango de fechas del proyecto"""
+    if fecha_limite < fecha_inicio:
+        raise ValidationError('La fecha límite no puede ser anterior al inicio del proyecto')
+    if fecha_fin and fecha_limite > fecha_fin:
+        raise ValidationError('La fecha límite no puede ser posterior al fin del proyecto')
+
+
 class ProyectoForm(forms.ModelForm):
     """
     Formulario para crear/editar proyectos
@@ -83,8 +97,7 @@ class TareaForm(forms.ModelForm):
         
         # Validar que la fecha límite no sea en el pasado (solo para nuevas tareas)
         if not self.instance.pk:  # Solo si es una tarea nueva
-            if fecha_limite < timezone.now().date():
-                raise ValidationError('La fecha límite no puede ser en el pasado')
+            validar_fecha_limite_nueva(fecha_limite)
         
         return fecha_limite
     
@@ -95,10 +108,7 @@ class TareaForm(forms.ModelForm):
         
         # Validar que la fecha límite esté dentro del rango del proyecto
         if proyecto and fecha_limite:
-            if fecha_limite < proyecto.fecha_inicio:
-                raise ValidationError('La fecha límite no puede ser anterior al inicio del proyecto')
-            if proyecto.fecha_fin and fecha_limite > proyecto.fecha_fin:
-                raise ValidationError('La fecha límite no puede ser posterior al fin del proyecto')
+            validar_fecha_limite_proyecto(fecha_limite, proyecto.fecha_inicio, proyecto.fecha_fin)
         
         return cleaned_data
 
@@ -146,6 +156,28 @@ class ComentarioForm(forms.ModelForm):
         return contenido
 
 
+class ImportarTareasForm(forms.Form):
+    """
+    Formulario para importar tareas desde un archivo CSV o Excel
+    """
+    EXTENSIONES = ('.csv', '.xlsx')
+    
+    archivo = forms.FileField(
+        widget=forms.ClearableFileInput(attrs={
+            'class': 'form-control',
+            'accept': '.csv,.xlsx'
+        })
+    )
+    
+    def clean_archivo(self):
+        archivo = self.cleaned_data.get('archivo')
+        
+        if not archivo.name.lower().endswith(self.EXTENSIONES):
+            raise ValidationError('El archivo debe ser CSV o Excel (.xlsx)')
+        
+        return archivo
+
+
 class BusquedaAvanzadaForm(forms.Form):
     """
     Formulario para búsqueda avanzada de tareas
@@ -0,0 +1,197 @@
+"""
+Importación masiva de tareas desde archivos CSV o Excel (.xlsx).
+
+El archivo se lee fila a fila (módulo csv u openpyxl en modo read_only) y
+las tareas válidas se insertan en bloques con lotes.crear_tareas, de modo que
+la memoria usada no depende del tamaño del archivo. Proyectos y usuarios se
+resuelven con diccionarios construidos una sola vez al empezar.
+"""
+import csv
+import io
+from datetime import date, datetime
+
+import openpyxl
+from django.core.exceptions import ValidationError
+
+from cuentas.models import User
+from .forms import validar_fecha_limite_nueva, validar_fecha_limite_proyecto
+from .lotes import crear_tareas
+from .models import Proyecto, Tarea
+
+
+FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y')
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, float) and valor.is_integer():
+        # Excel guarda los números enteros como float
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _opciones(choices):
+    """Acepta tanto el valor guardado como la etiqueta visible ('en_progreso' o 'En Progreso')"""
+    opciones = {}
+    for valor, etiqueta in choices:
+        opciones[valor] = valor
+        opciones[etiqueta.lower()] = valor
+    return opciones
+
+
+def leer_filas(archivo, nombre):
+    """Genera (número de fila, {columna: valor}) sin cargar el archivo completo"""
+    if nombre.lower().endswith('.xlsx'):
+        libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            filas = libro.active.iter_rows(values_only=True)
+            columnas = [_texto(columna).lower() for columna in next(filas, ())]
+            for numero, valores in enumerate(filas, start=2):
+                if any(valor not in (None, '') for valor in valores):
+                    yield numero, dict(zip(columnas, valores))
+        finally:
+            libro.close()
+        return
+
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    try:
+        muestra = texto.read(4096)
+        texto.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+        except csv.Error:
+            dialecto = csv.excel
+
+        lector = csv.reader(texto, dialecto)
+        columnas = [_texto(columna).lower() for columna in next(lector, [])]
+        for numero, valores in enumerate(lector, start=2):
+            if any(valor.strip() for valor in valores):
+                yield numero, dict(zip(columnas, valores))
+    finally:
+        # No cerrar el archivo subido al liberar el TextIOWrapper
+        texto.detach()
+
+
+class ImportadorTareas:
+    """
+    Valida cada fila con las mismas reglas que TareaForm y crea las tareas
+    válidas en bloques de tamano_lote. El resultado incluye los errores por fila.
+    """
+    ESTADOS = _opciones(Tarea.ESTADOS)
+    PRIORIDADES = _opciones(Tarea.PRIORIDADES)
+
+    def __init__(self, usuario, tamano_lote=500, max_errores=1000):
+        self.usuario = usuario
+        self.tamano_lote = tamano_lote
+        self.max_errores = max_errores
+
+        # Mapas de búsqueda construidos una sola vez: proyectos por id y por nombre
+        self.proyectos = {}
+        self.proyectos_por_nombre = {}
+        for pk, nombre, fecha_inicio, fecha_fin in Proyecto.objects.values_list(
+            'pk', 'nombre', 'fecha_inicio', 'fecha_fin'
+        ):
+            self.proyectos[pk] = (pk, fecha_inicio, fecha_fin)
+            clave = nombre.strip().lower()
+            # Un nombre repetido no identifica a un proyecto
+            self.proyectos_por_nombre[clave] = None if clave in self.proyectos_por_nombre else pk
+        self.usuarios = dict(User.objects.values_list('username', 'pk'))
+
+    def importar(self, archivo, nombre):
+        resultado = {'filas': 0, 'creadas': 0, 'con_errores': 0, 'errores': []}
+        pendientes = []
+
+        for numero, fila in leer_filas(archivo, nombre):
+            resultado['filas'] += 1
+            tarea, errores = self.validar_fila(fila)
+            if errores:
+                resultado['con_errores'] += 1
+                if len(resultado['errores']) < self.max_errores:
+                    resultado['errores'].append({'fila': numero, 'errores': errores})
+                continue
+
+            pendientes.append(tarea)
+            if len(pendientes) >= self.tamano_lote:
+                resultado['creadas'] += len(crear_tareas(pendientes, self.usuario))
+                pendientes = []
+
+        if pendientes:
+            resultado['creadas'] += len(crear_tareas(pendientes, self.usuario))
+        return resultado
+
+    def validar_fila(self, fila):
+        """Devuelve (Tarea sin guardar, []) o (None, [errores])"""
+        errores = []
+
+        titulo = _texto(fila.get('titulo'))
+        if not titulo:
+            errores.append('El título es obligatorio')
+        elif len(titulo) > 200:
+            errores.append('El título no puede superar los 200 caracteres')
+
+        descripcion = _texto(fila.get('descripcion'))
+        if not descripcion:
+            errores.append('La descripción es obligatoria')
+
+        proyecto = self.resolver_proyecto(_texto(fila.get('proyecto')))
+        if proyecto is None:
+            errores.append(f"Proyecto no encontrado: '{_texto(fila.get('proyecto'))}'")
+
+        asignado_a = _texto(fila.get('asignado_a'))
+        asignado_a_id = self.usuarios.get(asignado_a) if asignado_a else None
+        if asignado_a and asignado_a_id is None:
+            errores.append(f"Usuario no encontrado: '{asignado_a}'")
+
+        estado = self.ESTADOS.get(_texto(fila.get('estado')).lower() or 'pendiente')
+        if estado is None:
+            errores.append(f"Estado no válido: '{_texto(fila.get('estado'))}'")
+
+        prioridad = self.PRIORIDADES.get(_texto(fila.get('prioridad')).lower() or 'media')
+        if prioridad is None:
+            errores.append(f"Prioridad no válida: '{_texto(fila.get('prioridad'))}'")
+
+        fecha_limite = self.leer_fecha(fila.get('fecha_limite'))
+        if fecha_limite is None:
+            errores.append('La fecha límite es obligatoria (AAAA-MM-DD o DD/MM/AAAA)')
+        else:
+            # Mismas reglas que TareaForm para una tarea nueva
+            try:
+                validar_fecha_limite_nueva(fecha_limite)
+                if proyecto is not None:
+                    validar_fecha_limite_proyecto(fecha_limite, proyecto[1], proyecto[2])
+            except ValidationError as error:
+                errores.extend(error.messages)
+
+        if errores:
+            return None, errores
+
+        return Tarea(
+            proyecto_id=proyecto[0],
+            titulo=titulo,
+            descripcion=descripcion,
+            asignado_a_id=asignado_a_id,
+            creado_por=self.usuario,
+            fecha_limite=fecha_limite,
+            estado=estado,
+            prioridad=prioridad,
+        ), []
+
+    def resolver_proyecto(self, valor):
+        if valor.isdigit():
+            return self.proyectos.get(int(valor))
+        pk = self.proyectos_por_nombre.get(valor.lower())
+        return self.proyectos.get(pk)
+
+    def leer_fecha(self, valor):
+        if isinstance(valor, datetime):
+            return valor.date()
+        if isinstance(valor, date):
+            return valor
+        valor = _texto(valor)
+        for formato in FORMATOS_FECHA:
+            try:
+                return datetime.strptime(valor, formato).date()
+            except ValueError:
+                continue
+        return None
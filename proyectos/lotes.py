@@ -0,0 +1,52 @@
+"""
+Operaciones en bloque sobre tareas.
+
+bulk_create/bulk_update no disparan los signals de Tarea, así que estas
+funciones generan ellas mismas las filas de Historial y Notificacion (que se
+escriben en lote con registro.registrar). Los contadores de Proyecto los
+mantiene TareaQuerySet.
+"""
+from itertools import chain
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Tarea
+from .registro import filas_tarea, registrar
+
+
+def crear_tareas(tareas, usuario, batch_size=None):
+    """Inserta las tareas con bulk_create y registra su historial de creación"""
+    with transaction.atomic():
+        tareas = Tarea.objects.bulk_create(tareas, batch_size=batch_size)
+        registrar(*chain.from_iterable(filas_tarea(tarea, usuario.pk) for tarea in tareas))
+
+    for tarea in tareas:
+        tarea.guardar_estado_cargado()
+    return tareas
+
+
+def actualizar_tareas(tareas, campos, usuario, batch_size=None):
+    """
+    Guarda los campos indicados de tareas cargadas desde la BD con bulk_update,
+    registrando en el historial los cambios detectados con changed_fields()
+    """
+    ahora = timezone.now()
+    filas = []
+    for tarea in tareas:
+        # bulk_update no aplica auto_now
+        tarea.fecha_actualizacion = ahora
+        filas.extend(filas_tarea(tarea, usuario.pk, tarea.changed_fields()))
+
+    with transaction.atomic():
+        Tarea.objects.bulk_update(tareas, [*campos, 'fecha_actualizacion'], batch_size=batch_size)
+        registrar(*filas)
+
+    for tarea in tareas:
+        tarea.guardar_estado_cargado()
+    return tareas
+
+
+def eliminar_tareas(ids):
+    """Elimina las tareas indicadas en un solo borrado en bloque"""
+    return Tarea.objects.filter(pk__in=ids).delete()
@@ -0,0 +1,71 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.renderers import ORJSONRenderer
+from api.views import HistorialViewSet, TareaViewSet
+from cuentas.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara peticiones por segundo de los listados de la API con páginas grandes: '
+        'serializers de DRF con el JSON estándar, serializers con orjson y el listado '
+        'rápido (values() + codificador compilado) con orjson. Usa los datos existentes: '
+        'para un conjunto grande, ejecutar antes benchmark_consultas --conservar'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=1000, help='Filas por página')
+        parser.add_argument('--repeticiones', type=int, default=20)
+
+    def handle(self, *args, **options):
+        usuario = User.objects.filter(is_superuser=True).first() or User.objects.first()
+        if usuario is None:
+            raise CommandError('No hay usuarios')
+
+        filas = options['filas']
+        repeticiones = options['repeticiones']
+        self.stdout.write(f'Base de datos: {connection.vendor}, {filas} filas por página')
+
+        variantes = {
+            'serializers + json': {'listado_rapido': False, 'renderer_classes': [JSONRenderer]},
+            'serializers + orjson': {'listado_rapido': False, 'renderer_classes': [ORJSONRenderer]},
+            'listado rápido + orjson': {'listado_rapido': True, 'renderer_classes': [ORJSONRenderer]},
+        }
+        for ruta, vista in (('/api/tareas/', TareaViewSet), ('/api/historial/', HistorialViewSet)):
+            # Misma paginación por cursor de la vista, sin el máximo de 100 filas
+            paginacion = type('PaginaGrande', (vista.pagination_class,), {'page_size': filas, 'max_page_size': filas})
+            self.stdout.write(ruta)
+            base = None
+            for nombre, opciones in variantes.items():
+                funcion = vista.as_view({'get': 'list'}, pagination_class=paginacion, **opciones)
+                tiempo, total = self.medir(lambda: self.pedir(funcion, ruta, usuario), repeticiones)
+                base = base or tiempo
+                self.stdout.write(
+                    f'  {nombre:<26}{1000 / tiempo:>8.1f} pet/s{tiempo:>10.2f} ms'
+                    f'{base / tiempo:>7.2f}x  ({total} filas)'
+                )
+
+    def pedir(self, funcion, ruta, usuario):
+        host = settings.ALLOWED_HOSTS[0].lstrip('.') if settings.ALLOWED_HOSTS else 'localhost'
+        peticion = APIRequestFactory().get(ruta, HTTP_HOST='localhost' if host == '*' else host)
+        force_authenticate(peticion, user=usuario)
+        respuesta = funcion(peticion)
+        respuesta.render()
+        return len(respuesta.data['results'])
+
+    def medir(self, funcion, repeticiones):
+        """Mediana en milisegundos y resultado de la última ejecución"""
+        resultado = funcion()  # calentamiento
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            resultado = funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos), resultado
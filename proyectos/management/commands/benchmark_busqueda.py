@@ -0,0 +1,122 @@
+import itertools
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from cuentas.models import User
+from proyectos.busqueda import buscar, resaltar
+from proyectos.models import Proyecto, Tarea
+
+
+PALABRAS_VACIAS = 'de la el en y a que los del se las por un para con una su al lo como'.split()
+
+DOMINIO = (
+    'revisar configurar servidor cliente informe factura despliegue base datos copia seguridad '
+    'migración usuario permiso error corregir página diseño prueba integración pago pedido correo '
+    'notificación documento contrato reunión presupuesto proveedor inventario almacén envío ruta '
+    'aplicación móvil escritorio rendimiento caché consulta índice memoria registro auditoría'
+).split()
+
+SILABAS = (
+    'ba be bi bo ca ce co da de do fa ga la le li lo ma me mi mo na ne no pa pe po ra re ro sa se ta te to'
+).split()
+
+
+def vocabulario(total=20000):
+    """
+    Palabras por frecuencia (ley de Zipf): las vacías, que salen en casi todas
+    las filas, luego palabras inventadas con las del dominio repartidas entre ellas
+    """
+    generador = random.Random(0)
+    inventadas = set()
+    while len(inventadas) < total:
+        inventadas.add(''.join(generador.choices(SILABAS, k=generador.randint(2, 4))))
+    palabras = sorted(inventadas)
+    generador.shuffle(palabras)
+    for posicion, palabra in enumerate(DOMINIO):
+        palabras.insert(50 + posicion * 40, palabra)
+    return PALABRAS_VACIAS + palabras
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera tareas con texto y compara el tiempo de la primera página de una búsqueda '
+        'con icontains y con el índice de texto completo (relevancia y resaltado incluidos)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tareas', type=int, default=100000)
+        parser.add_argument('--repeticiones', type=int, default=10)
+        parser.add_argument('--conservar', action='store_true',
+                            help='No revertir los datos generados al terminar')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Base de datos: {connection.vendor}')
+
+        with transaction.atomic():
+            usuario = self.generar_datos(options['tareas'])
+            # Una palabra habitual, una poco frecuente, dos palabras, un prefijo, una
+            # errata sin resultados (icontains recorre toda la tabla) y el peor caso
+            # del índice: una palabra vacía, presente en casi todas las filas
+            busquedas = ['servidor', 'auditoría', 'copia seguridad', 'migr', 'sevridor', 'de']
+            for texto in busquedas:
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\n'{texto}'"))
+                for alcance, tareas in (('todas', Tarea.objects.all()), ('member', usuario.tareas_asignadas.all())):
+                    antes = self.medir(lambda: self.icontains(tareas, texto), options['repeticiones'])
+                    despues = self.medir(lambda: self.indice(tareas, texto), options['repeticiones'])
+                    self.stdout.write(
+                        f'  {alcance:<8} icontains {antes:>9.2f} ms   índice {despues:>8.2f} ms'
+                    )
+
+            if not options['conservar']:
+                transaction.set_rollback(True)
+
+    def generar_datos(self, total):
+        inicio = time.perf_counter()
+        hoy = timezone.now().date()
+        usuarios = User.objects.bulk_create([User(username=f'bench_busqueda_{i}', role='member') for i in range(100)])
+        proyecto = Proyecto.objects.create(
+            nombre='bench_busqueda', descripcion='', fecha_inicio=hoy, creado_por=usuarios[0],
+        )
+        palabras = vocabulario()
+        pesos = list(itertools.accumulate(1 / (posicion + 1) for posicion in range(len(palabras))))
+        Tarea.objects.bulk_create((
+            Tarea(
+                proyecto=proyecto, creado_por=usuarios[0], asignado_a=random.choice(usuarios),
+                titulo=' '.join(random.choices(palabras, cum_weights=pesos, k=4)).capitalize(),
+                descripcion=' '.join(random.choices(palabras, cum_weights=pesos, k=30)),
+                fecha_limite=hoy + timedelta(days=random.randint(-60, 60)),
+            )
+            for _ in range(total)
+        ), batch_size=2000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.stdout.write(f'{total} tareas generadas en {time.perf_counter() - inicio:.1f}s')
+        return usuarios[0]
+
+    def icontains(self, tareas, texto):
+        """La búsqueda anterior: primera página por fecha de creación"""
+        return list(tareas.filter(
+            Q(titulo__icontains=texto) | Q(descripcion__icontains=texto)
+        ).order_by('-fecha_creacion')[:20])
+
+    def indice(self, tareas, texto):
+        pagina = list(buscar(tareas, texto)[:20])
+        resaltar(Tarea, [tarea.pk for tarea in pagina], texto)
+        return pagina
+
+    def medir(self, funcion, repeticiones):
+        """Mediana en milisegundos"""
+        funcion()  # calentamiento
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos)
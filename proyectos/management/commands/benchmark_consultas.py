@@ -0,0 +1,134 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from cuentas.models import User
+from proyectos.models import Proyecto, Tarea, Historial, Notificacion
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera un conjunto de datos grande y muestra el plan (EXPLAIN) y el tiempo '
+        'de las consultas más frecuentes, para comprobar que usan los índices'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=200)
+        parser.add_argument('--proyectos', type=int, default=500)
+        parser.add_argument('--tareas', type=int, default=100000)
+        parser.add_argument('--repeticiones', type=int, default=20,
+                            help='Veces que se ejecuta cada consulta para medir el tiempo')
+        parser.add_argument('--conservar', action='store_true',
+                            help='No revertir los datos generados al terminar')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'Base de datos: {connection.vendor}')
+
+        with transaction.atomic():
+            self.generar_datos(options)
+            self.analizar_tablas()
+
+            usuario = User.objects.filter(username__startswith='bench_').first()
+            proyecto = Proyecto.objects.filter(nombre__startswith='bench_').first()
+            tarea = Tarea.objects.filter(proyecto=proyecto).first()
+            hoy = timezone.now().date()
+
+            consultas = {
+                'Tareas próximas del usuario (dashboard)': usuario.tareas_asignadas.filter(
+                    fecha_limite__gte=hoy,
+                    fecha_limite__lte=hoy + timedelta(days=7),
+                    estado__in=['pendiente', 'en_progreso'],
+                ).order_by('fecha_limite')[:5],
+                'Tareas vencidas del usuario': usuario.tareas_asignadas.filter(
+                    fecha_limite__lt=hoy,
+                    estado__in=['pendiente', 'en_progreso'],
+                ).order_by().values('pk'),
+                'Tareas de un proyecto por estado': Tarea.objects.filter(
+                    proyecto=proyecto, estado='completada',
+                ).order_by().values('pk'),
+                'Tareas abiertas por vencimiento': Tarea.objects.exclude(
+                    estado='completada',
+                ).filter(fecha_limite__lte=hoy + timedelta(days=7)).order_by('fecha_limite')[:50],
+                'Notificaciones no leídas': Notificacion.objects.filter(
+                    usuario=usuario, leida=False,
+                ).order_by('-fecha_creacion')[:5],
+                'Historial de una tarea': Historial.objects.filter(tarea=tarea).order_by('-fecha'),
+                'Últimas tareas creadas': Tarea.objects.order_by('-fecha_creacion')[:10],
+                'Últimos proyectos creados': Proyecto.objects.order_by('-fecha_creacion')[:10],
+            }
+
+            for nombre, queryset in consultas.items():
+                self.medir(nombre, queryset, options['repeticiones'])
+
+            if not options['conservar']:
+                transaction.set_rollback(True)
+
+    def generar_datos(self, options):
+        """Inserta los datos de prueba en bloque"""
+        inicio = time.perf_counter()
+        hoy = timezone.now().date()
+
+        usuarios = User.objects.bulk_create([
+            User(username=f'bench_{i}', role='member') for i in range(options['usuarios'])
+        ])
+        proyectos = Proyecto.objects.bulk_create([
+            Proyecto(
+                nombre=f'bench_{i}', descripcion='', fecha_inicio=hoy - timedelta(days=365),
+                creado_por=random.choice(usuarios),
+            )
+            for i in range(options['proyectos'])
+        ])
+
+        estados = [estado for estado, _ in Tarea.ESTADOS]
+        prioridades = [prioridad for prioridad, _ in Tarea.PRIORIDADES]
+        tareas = Tarea.objects.bulk_create((
+            Tarea(
+                proyecto=random.choice(proyectos), titulo=f'Tarea {i}', descripcion='',
+                asignado_a=random.choice(usuarios), creado_por=random.choice(usuarios),
+                fecha_limite=hoy + timedelta(days=random.randint(-60, 60)),
+                estado=random.choice(estados), prioridad=random.choice(prioridades),
+            )
+            for i in range(options['tareas'])
+        ), batch_size=2000)
+
+        Historial.objects.bulk_create((
+            Historial(tarea=tarea, usuario=tarea.creado_por, accion=f"Tarea '{tarea.titulo}' creada")
+            for tarea in tareas
+        ), batch_size=2000)
+        Notificacion.objects.bulk_create((
+            Notificacion(
+                usuario=tarea.asignado_a, tarea=tarea, tipo='asignacion',
+                mensaje=f'Se te ha asignado la tarea: {tarea.titulo}',
+                leida=random.random() < 0.8,
+            )
+            for tarea in tareas
+        ), batch_size=2000)
+
+        self.stdout.write(
+            f'Datos generados en {time.perf_counter() - inicio:.1f}s: '
+            f'{len(usuarios)} usuarios, {len(proyectos)} proyectos, {len(tareas)} tareas'
+        )
+
+    def analizar_tablas(self):
+        """Actualiza las estadísticas del planificador tras la carga masiva"""
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                for modelo in (Proyecto, Tarea, Historial, Notificacion):
+                    cursor.execute(f'ANALYZE {modelo._meta.db_table}')
+            else:
+                cursor.execute('ANALYZE')
+
+    def medir(self, nombre, queryset, repeticiones):
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n{nombre}'))
+        self.stdout.write(str(queryset.query))
+        self.stdout.write(queryset.explain())
+
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            list(queryset.all())
+        promedio = (time.perf_counter() - inicio) / repeticiones * 1000
+        self.stdout.write(self.style.SUCCESS(f'Tiempo medio: {promedio:.2f} ms'))
@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from cuentas.models import User
+from proyectos.models import Proyecto, Tarea
+from proyectos.registro import registro_en_lote
+
+
+class Command(BaseCommand):
+    help = (
+        'Cuenta las consultas de Tarea.save() con la tarea cargada desde la BD '
+        '(estado de from_db) frente a una instancia sin estado cargado, que '
+        'necesita el SELECT previo que hacía el signal pre_save. No se cuentan '
+        'BEGIN/COMMIT/SAVEPOINT'
+    )
+
+    def handle(self, *args, **options):
+        hoy = timezone.now().date()
+        usuarios = [
+            User.objects.create(username=f'bench_guardado_{i}', role='member')
+            for i in range(2)
+        ]
+        try:
+            proyecto = Proyecto.objects.create(
+                nombre='bench_guardado', descripcion='', fecha_inicio=hoy,
+                creado_por=usuarios[0],
+            )
+
+            def nueva_tarea():
+                return Tarea.objects.create(
+                    proyecto=proyecto, titulo='Tarea', descripcion='', creado_por=usuarios[0],
+                    asignado_a=usuarios[0], fecha_limite=hoy + timedelta(days=7),
+                )
+
+            casos = {
+                'Sin cambios': {},
+                'Cambio de título': {'titulo': 'Tarea renombrada'},
+                'Cambio de estado': {'estado': 'en_progreso'},
+                'Cambio de estado y asignación': {'estado': 'completada', 'asignado_a_id': usuarios[1].pk},
+            }
+
+            self.stdout.write(f"{'Caso':<32}{'Sin estado cargado':>20}{'Con from_db':>14}")
+            for nombre, cambios in casos.items():
+                antes = self.contar(self.sin_estado(nueva_tarea()), cambios)
+                despues = self.contar(Tarea.objects.get(pk=nueva_tarea().pk), cambios)
+                self.stdout.write(f'{nombre:<32}{antes:>20}{despues:>14}')
+        finally:
+            User.objects.filter(pk__in=[usuario.pk for usuario in usuarios]).delete()
+
+    def sin_estado(self, tarea):
+        """Copia de la tarea tal como está en la BD, sin pasar por from_db()"""
+        return Tarea(**{campo.attname: getattr(tarea, campo.attname) for campo in Tarea._meta.concrete_fields})
+
+    def contar(self, tarea, cambios):
+        """Aplica los cambios y devuelve las consultas del guardado, escrituras en lote incluidas"""
+        for campo, valor in cambios.items():
+            setattr(tarea, campo, valor)
+        with CaptureQueriesContext(connection) as consultas:
+            with registro_en_lote():
+                tarea.save()
+        control = ('BEGIN', 'COMMIT', 'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK')
+        return sum(1 for consulta in consultas if not consulta['sql'].startswith(control))
@@ -0,0 +1,76 @@
+import asyncio
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from cuentas.models import User
+from panel.estadisticas import (
+    PIEZAS_GLOBALES, PIEZAS_USUARIO, acalcular_globales, acalcular_usuario,
+    calcular_globales, calcular_usuario,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el tiempo en frío (sin caché) de los datos del dashboard calculados '
+        'en serie (vista síncrona) y a la vez en varios hilos (vista async). Usa los '
+        'datos existentes: para un conjunto grande, ejecutar antes '
+        'benchmark_consultas --conservar'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help='Usuario del dashboard (por defecto, el que tiene más tareas)')
+        parser.add_argument('--repeticiones', type=int, default=10)
+
+    def handle(self, *args, **options):
+        if options['usuario']:
+            usuario = User.objects.filter(username=options['usuario']).first()
+        else:
+            usuario = User.objects.annotate(total=Count('tareas_asignadas')).order_by('-total').first()
+        if usuario is None:
+            raise CommandError('No hay usuarios')
+
+        hoy = timezone.localdate()
+        repeticiones = options['repeticiones']
+        self.stdout.write(f'Base de datos: {connection.vendor}, usuario: {usuario.username}')
+
+        piezas = {pieza.__name__: (lambda pieza=pieza: pieza(hoy)) for pieza in PIEZAS_GLOBALES}
+        piezas.update({pieza.__name__: (lambda pieza=pieza: pieza(usuario, hoy)) for pieza in PIEZAS_USUARIO})
+        tiempos = {nombre: self.medir(funcion, repeticiones) for nombre, funcion in piezas.items()}
+        for nombre, tiempo in tiempos.items():
+            self.stdout.write(f'  {nombre:<24}{tiempo:>10.2f} ms')
+
+        serie = self.medir(lambda: (calcular_globales(), calcular_usuario(usuario, hoy)), repeticiones)
+        # Un solo bucle de eventos para todas las repeticiones, como en un servidor ASGI
+        paralelo = asyncio.run(self.amedir(
+            lambda: asyncio.gather(acalcular_globales(), acalcular_usuario(usuario, hoy)),
+            repeticiones,
+        ))
+
+        self.stdout.write(f"{'Pieza más lenta':<26}{max(tiempos.values()):>10.2f} ms")
+        self.stdout.write(f"{'Suma de las piezas':<26}{sum(tiempos.values()):>10.2f} ms")
+        self.stdout.write(f"{'Vista síncrona (serie)':<26}{serie:>10.2f} ms")
+        self.stdout.write(self.style.SUCCESS(f"{'Vista async (a la vez)':<26}{paralelo:>10.2f} ms"))
+
+    def medir(self, funcion, repeticiones):
+        """Mediana en milisegundos"""
+        funcion()  # calentamiento
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos)
+
+    async def amedir(self, funcion, repeticiones):
+        await funcion()  # calentamiento
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            await funcion()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tiempos)
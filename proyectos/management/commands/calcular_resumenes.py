@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from proyectos.resumenes import reconstruir
+
+
+class Command(BaseCommand):
+    help = (
+        'Rehace los resúmenes diarios (ResumenDiario) a partir de las fechas de creación '
+        'y del historial de cambios de estado. Después se mantienen de forma incremental'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=2000,
+                            help='Tareas procesadas por bloque')
+
+    def handle(self, *args, **options):
+        filas = reconstruir(options['lote'])
+        self.stdout.write(self.style.SUCCESS(f'{filas} resúmenes diarios creados'))
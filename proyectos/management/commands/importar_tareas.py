@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cuentas.models import User
+from proyectos.importacion import ImportadorTareas
+
+
+class Command(BaseCommand):
+    help = 'Importa tareas desde un archivo CSV o Excel (.xlsx), leyéndolo fila a fila'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx')
+        parser.add_argument('--usuario', required=True,
+                            help='Usuario que figura como creador de las tareas')
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Tareas insertadas por cada bulk_create')
+
+    def handle(self, *args, **options):
+        try:
+            usuario = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"El usuario '{options['usuario']}' no existe")
+
+        importador = ImportadorTareas(usuario, tamano_lote=options['lote'])
+        with open(options['archivo'], 'rb') as archivo:
+            resultado = importador.importar(archivo, options['archivo'])
+
+        for error in resultado['errores']:
+            self.stderr.write(f"Fila {error['fila']}: {'; '.join(error['errores'])}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['filas']} filas leídas, {resultado['creadas']} tareas creadas, "
+            f"{resultado['con_errores']} filas con errores"
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from proyectos.admision import EVENTOS, NIVELES, PRESUPUESTO, metricas, reiniciar_metricas
+
+
+class Command(BaseCommand):
+    help = 'Muestra cuántas peticiones de cada nivel de coste se admitieron, encolaron y rechazaron'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reiniciar', action='store_true', help='Poner los contadores a cero después de mostrarlos')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"Presupuesto por usuario: {PRESUPUESTO['capacidad']} fichas, {PRESUPUESTO['recarga']} por segundo"
+        )
+        self.stdout.write(f"{'nivel':<10}{'coste':>7}{'plazas':>8}" + ''.join(f'{evento:>17}' for evento in EVENTOS))
+        for nivel, totales in metricas().items():
+            configuracion = NIVELES[nivel]
+            plazas = configuracion.get('concurrencia', '-')
+            self.stdout.write(
+                f"{nivel:<10}{configuracion['coste']:>7}{plazas:>8}"
+                + ''.join(f'{totales[evento]:>17}' for evento in EVENTOS)
+            )
+        if options['reiniciar']:
+            reiniciar_metricas()
+            self.stdout.write(self.style.SUCCESS('Contadores reiniciados'))
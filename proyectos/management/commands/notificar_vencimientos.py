@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from proyectos.vencimientos import notificar_vencimientos
+
+
+class Command(BaseCommand):
+    help = (
+        'Crea avisos de vencimiento para las tareas abiertas que vencen en los próximos '
+        'días. Puede ejecutarse periódicamente (cron) o como proceso continuo con --continuo'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=3,
+                            help='Ventana de aviso en días a partir de hoy')
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Tareas procesadas por bloque')
+        parser.add_argument('--continuo', action='store_true',
+                            help='Repetir la revisión indefinidamente')
+        parser.add_argument('--intervalo', type=int, default=3600,
+                            help='Segundos entre revisiones en modo continuo')
+
+    def handle(self, *args, **options):
+        while True:
+            revisadas, creadas = notificar_vencimientos(options['dias'], options['lote'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{revisadas} tareas próximas a vencer revisadas, {creadas} avisos creados'
+            ))
+            if not options['continuo']:
+                return
+
+            close_old_connections()
+            try:
+                time.sleep(options['intervalo'])
+            except KeyboardInterrupt:
+                return
@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from proyectos.sincronizacion import RETENCION, purgar
+
+
+class Command(BaseCommand):
+    help = (
+        'Elimina las lápidas de borrados más antiguas que la retención de la sincronización '
+        '(ejecutar periódicamente); los tokens anteriores tendrán que sincronizar de cero'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=RETENCION.days,
+                            help='Días que se conservan las lápidas')
+
+    def handle(self, *args, **options):
+        eliminadas = purgar(timedelta(days=options['dias']))
+        self.stdout.write(self.style.SUCCESS(f'{eliminadas} lápidas eliminadas'))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from proyectos.models import Proyecto
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores de tareas almacenados en cada proyecto'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'proyectos', nargs='*', type=int,
+            help='IDs de los proyectos a recalcular (por defecto, todos)'
+        )
+
+    def handle(self, *args, **options):
+        proyectos = Proyecto.objects.all()
+        if options['proyectos']:
+            proyectos = proyectos.filter(pk__in=options['proyectos'])
+
+        total = proyectos.recalcular_contadores()
+        self.stdout.write(self.style.SUCCESS(f'Contadores recalculados en {total} proyectos'))
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from proyectos.busqueda import CAMPOS, motor
+
+
+class Command(BaseCommand):
+    help = (
+        'Vuelve a generar el índice de búsqueda de texto completo de proyectos, tareas y '
+        'comentarios a partir de las tablas (tras restaurar una copia o cargar datos a mano)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        self.stdout.write(f'Base de datos: {connection.vendor}')
+        for modelo in CAMPOS:
+            inicio = time.perf_counter()
+            motor(connection).reparar(connection, modelo)
+            motor(connection).reconstruir(connection, modelo)
+            self.stdout.write(f'  {modelo._meta.verbose_name_plural}: {time.perf_counter() - inicio:.2f} s')
+        self.stdout.write(self.style.SUCCESS('Índice de búsqueda reconstruido'))
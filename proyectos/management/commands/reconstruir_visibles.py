@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from proyectos.visibilidad import reconstruir
+
+
+class Command(BaseCommand):
+    help = 'Rehace desde cero los proyectos visibles de cada usuario'
+
+    def handle(self, *args, **options):
+        total = reconstruir()
+        self.stdout.write(self.style.SUCCESS(f'{total} pares usuario-proyecto visibles'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from proyectos.actividad import MAXIMO_POR_USUARIO, recortar
+
+
+class Command(BaseCommand):
+    help = 'Elimina las entradas más antiguas del feed de actividad de cada usuario (ejecutar periódicamente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--maximo', type=int, default=MAXIMO_POR_USUARIO,
+                            help='Entradas que se conservan por usuario')
+
+    def handle(self, *args, **options):
+        eliminadas = recortar(options['maximo'])
+        self.stdout.write(self.style.SUCCESS(f'{eliminadas} entradas de actividad eliminadas'))
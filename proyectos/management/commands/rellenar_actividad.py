@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from proyectos.actividad import MAXIMO_POR_USUARIO, recortar, rellenar
+
+
+class Command(BaseCommand):
+    help = (
+        'Reparte en el feed de actividad de cada usuario las filas de Historial '
+        'existentes y recorta después los feeds al máximo de entradas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=None,
+                            help='Solo el historial de los últimos N días (por defecto todo)')
+        parser.add_argument('--lote', type=int, default=2000,
+                            help='Filas de historial procesadas por bloque')
+        parser.add_argument('--maximo', type=int, default=MAXIMO_POR_USUARIO,
+                            help='Entradas que se conservan por usuario')
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['dias'] is not None:
+            desde = timezone.now() - timedelta(days=options['dias'])
+
+        creadas = rellenar(desde, options['lote'])
+        eliminadas = recortar(options['maximo'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{creadas} entradas de actividad creadas, {eliminadas} eliminadas al recortar'
+        ))
@@ -0,0 +1,76 @@
+from django.http import HttpResponse, JsonResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .admision import Rechazada, admitir, nivel_de_vista
+from .registro import registro_en_lote
+
+
+class RegistroEnLoteMiddleware:
+    """
+    Agrupa las filas de Historial y Notificacion generadas durante la petición
+    y las escribe en lote al terminarla
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with registro_en_lote():
+            return self.get_response(request)
+
+
+class AdmisionMiddleware:
+    """
+    Control de admisión por nivel de coste de la vista (ver admision.py). Va
+    después de AuthenticationMiddleware: el presupuesto es del usuario de la
+    sesión o del token JWT, y de la IP en las peticiones anónimas.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.jwt = JWTAuthentication()
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        plaza = getattr(request, '_plaza_admision', None)
+        if plaza is not None:
+            if response.streaming:
+                # La respuesta sigue generándose después de la vista
+                response.streaming_content = self._liberar_al_terminar(response.streaming_content, plaza)
+            else:
+                plaza.liberar()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        nivel = nivel_de_vista(view_func, request.method)
+        try:
+            request._plaza_admision = admitir(nivel, self.identidad(request))
+        except Rechazada as rechazo:
+            if request.path.startswith('/api/'):
+                respuesta = JsonResponse({'detail': str(rechazo)}, status=429)
+            else:
+                respuesta = HttpResponse(str(rechazo), status=429, content_type='text/plain; charset=utf-8')
+            respuesta['Retry-After'] = str(rechazo.reintentar)
+            return respuesta
+        return None
+
+    def identidad(self, request):
+        if request.user.is_authenticated:
+            return f'usuario:{request.user.pk}'
+        # Solo se comprueba la firma del token: sin consultar el usuario en la BD
+        cabecera = self.jwt.get_header(request)
+        crudo = self.jwt.get_raw_token(cabecera) if cabecera else None
+        if crudo:
+            try:
+                return f'usuario:{self.jwt.get_validated_token(crudo)[jwt_settings.USER_ID_CLAIM]}'
+            except (InvalidToken, KeyError):
+                pass
+        return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+    def _liberar_al_terminar(self, contenido, plaza):
+        try:
+            yield from contenido
+        finally:
+            plaza.liberar()
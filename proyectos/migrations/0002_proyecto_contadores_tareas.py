@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:16
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def calcular_contadores(apps, schema_editor):
+    Proyecto = apps.get_model('proyectos', 'Proyecto')
+    Tarea = apps.get_model('proyectos', 'Tarea')
+
+    def conteo(**filtro):
+        tareas = Tarea.objects.filter(proyecto=OuterRef('pk'), **filtro).order_by()
+        tareas = tareas.values('proyecto').annotate(total=Count('pk')).values('total')
+        return Coalesce(Subquery(tareas), 0)
+
+    Proyecto.objects.update(
+        total_tareas=conteo(),
+        tareas_pendientes=conteo(estado='pendiente'),
+        tareas_en_progreso=conteo(estado='en_progreso'),
+        tareas_completadas=conteo(estado='completada'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proyecto',
+            name='tareas_completadas',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='proyecto',
+            name='tareas_en_progreso',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='proyecto',
+            name='tareas_pendientes',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='proyecto',
+            name='total_tareas',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(calcular_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0002_proyecto_contadores_tareas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comentario',
+            index=models.Index(fields=['tarea', '-fecha'], name='comentario_tarea_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historial',
+            index=models.Index(fields=['tarea', '-fecha'], name='historial_tarea_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['usuario', 'leida', '-fecha_creacion'], name='notif_usuario_leida_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(condition=models.Q(('leida', False)), fields=['usuario', '-fecha_creacion'], name='notif_no_leidas_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['-fecha_creacion'], name='proyecto_fecha_creacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['asignado_a', 'estado', 'fecha_limite'], name='tarea_asignado_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['proyecto', 'estado'], name='tarea_proyecto_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(condition=models.Q(('estado', 'completada'), _negated=True), fields=['fecha_limite'], name='tarea_abiertas_limite_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['-fecha_creacion'], name='tarea_fecha_creacion_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0004_notificacion_vencimiento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('proyectos_creados', models.PositiveIntegerField(default=0)),
+                ('tareas_creadas', models.PositiveIntegerField(default=0)),
+                ('tareas_completadas', models.PositiveIntegerField(default=0)),
+                ('abiertas_pendiente', models.IntegerField(default=0)),
+                ('abiertas_en_progreso', models.IntegerField(default=0)),
+                ('abiertas_baja', models.IntegerField(default=0)),
+                ('abiertas_media', models.IntegerField(default=0)),
+                ('abiertas_alta', models.IntegerField(default=0)),
+                ('proyecto', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='resumenes', to='proyectos.proyecto')),
+            ],
+            options={
+                'verbose_name': 'Resumen diario',
+                'verbose_name_plural': 'Resúmenes diarios',
+                'ordering': ['fecha'],
+                'constraints': [models.UniqueConstraint(fields=('proyecto', 'fecha'), name='resumen_proyecto_fecha_unico'), models.UniqueConstraint(condition=models.Q(('proyecto__isnull', True)), fields=('fecha',), name='resumen_global_fecha_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0005_resumen_diario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Actividad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField()),
+                ('historial', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='actividad', to='proyectos.historial')),
+                ('proyecto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='actividad', to='proyectos.proyecto')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='actividad', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Actividad',
+                'verbose_name_plural': 'Actividad',
+                'ordering': ['-fecha', '-id'],
+                'indexes': [models.Index(fields=['usuario', '-fecha', '-id'], name='actividad_usuario_fecha_idx')],
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'historial'), name='actividad_usuario_historial_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0006_actividad'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='tarea',
+            name='tarea_fecha_creacion_idx',
+        ),
+        migrations.AddIndex(
+            model_name='historial',
+            index=models.Index(fields=['-fecha', '-id'], name='historial_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['usuario', '-fecha_creacion', '-id'], name='notif_usuario_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='tarea_fecha_creacion_id_idx'),
+        ),
+    ]
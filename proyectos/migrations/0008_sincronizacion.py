@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:59
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copiar_fecha_comentarios(apps, schema_editor):
+    """Los comentarios existentes se dan por actualizados al crearse"""
+    Comentario = apps.get_model('proyectos', 'Comentario')
+    Comentario.objects.update(fecha_actualizacion=models.F('fecha'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0007_paginacion_cursor'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Eliminacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(choices=[('proyecto', 'Proyecto'), ('tarea', 'Tarea'), ('comentario', 'Comentario')], max_length=20)),
+                ('objeto_id', models.PositiveBigIntegerField()),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Eliminación',
+                'verbose_name_plural': 'Eliminaciones',
+                'ordering': ['fecha', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='comentario',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(copiar_fecha_comentarios, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comentario',
+            index=models.Index(fields=['fecha_actualizacion', 'id'], name='comentario_sincronizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['fecha_actualizacion', 'id'], name='proyecto_sincronizacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tarea',
+            index=models.Index(fields=['fecha_actualizacion', 'id'], name='tarea_sincronizacion_idx'),
+        ),
+        migrations.AddField(
+            model_name='eliminacion',
+            name='usuario',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='eliminacion',
+            index=models.Index(fields=['fecha', 'id'], name='eliminacion_fecha_id_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from proyectos import busqueda
+
+
+def instalar_busqueda(apps, schema_editor):
+    """Índice de texto completo del motor de la base de datos, con las filas existentes"""
+    busqueda.instalar(schema_editor.connection)
+
+
+def desinstalar_busqueda(apps, schema_editor):
+    busqueda.desinstalar(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0008_sincronizacion'),
+    ]
+
+    operations = [
+        migrations.RunPython(instalar_busqueda, desinstalar_busqueda),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def rellenar_visibles(apps, schema_editor):
+    """Pares (usuario, proyecto) de los creadores, los miembros y los asignados existentes"""
+    using = schema_editor.connection.alias
+    Proyecto = apps.get_model('proyectos', 'Proyecto')
+    Tarea = apps.get_model('proyectos', 'Tarea')
+    ProyectoVisible = apps.get_model('proyectos', 'ProyectoVisible')
+    pares = set(Proyecto.objects.using(using).values_list('creado_por_id', 'pk'))
+    pares.update(Proyecto.miembros.through.objects.using(using).values_list('user_id', 'proyecto_id'))
+    pares.update(
+        Tarea.objects.using(using).filter(asignado_a__isnull=False).order_by()
+        .values_list('asignado_a_id', 'proyecto_id').distinct()
+    )
+    ProyectoVisible.objects.using(using).bulk_create([
+        ProyectoVisible(usuario_id=usuario_id, proyecto_id=proyecto_id)
+        for usuario_id, proyecto_id in pares
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proyectos', '0009_busqueda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProyectoVisible',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('proyecto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visibles', to='proyectos.proyecto')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='proyectos_visibles', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Proyecto visible',
+                'verbose_name_plural': 'Proyectos visibles',
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'proyecto'), name='proyecto_visible_unico')],
+            },
+        ),
+        migrations.RunPython(rellenar_visibles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def contar_no_leidas(apps, schema_editor):
+    """Contador de cada usuario con notificaciones sin leer"""
+    using = schema_editor.connection.alias
+    Notificacion = apps.get_model('proyectos', 'Notificacion')
+    ContadorNotificaciones = apps.get_model('proyectos', 'ContadorNotificaciones')
+    totales = Notificacion.objects.using(using).filter(leida=False).order_by().values('usuario_id').annotate(
+        total=Count('pk')
+    ).values_list('usuario_id', 'total')
+    ContadorNotificaciones.objects.using(using).bulk_create([
+        ContadorNotificaciones(usuario_id=usuario_id, no_leidas=total)
+        for usuario_id, total in totales
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas', '0001_initial'),
+        ('proyectos', '0010_proyectos_visibles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorNotificaciones',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='contador_notificaciones', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('no_leidas', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Contador de notificaciones',
+                'verbose_name_plural': 'Contadores de notificaciones',
+            },
+        ),
+        migrations.RunPython(contar_no_leidas, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,86 @@
-from django.db import models
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, When
+from django.db.models.functions import Coalesce, Greatest
 from django.conf import settings
 from django.utils import timezone
 
+from .difusion import notificaciones_cambiadas
+from .versiones import invalidar_global
+
+
+# Campo contador de Proyecto que corresponde a cada estado de Tarea
+CONTADORES_POR_ESTADO = {
+    'pendiente': 'tareas_pendientes',
+    'en_progreso': 'tareas_en_progreso',
+    'completada': 'tareas_completadas',
+}
+
+
+def _con_fecha_actualizacion(kwargs):
+    """update() no aplica auto_now: la fecha de actualización se pone aquí"""
+    kwargs.setdefault('fecha_actualizacion', timezone.now())
+    return kwargs
+
+
+def _sumas(modelo, incrementos, clave):
+    """
+    Valores de update() que suman a cada fila de `modelo` los suyos en una sola
+    sentencia: `incrementos` es {valor de `clave` en la fila: {campo: incremento}}
+    """
+    campos = {campo for valores in incrementos.values() for campo, valor in valores.items() if valor}
+    sumas = {}
+    for campo in campos:
+        por_fila = {fila: valores.get(campo, 0) for fila, valores in incrementos.items()}
+        if len(set(por_fila.values())) == 1:
+            sumas[campo] = F(campo) + por_fila.popitem()[1]
+        else:
+            sumas[campo] = Case(
+                *(When(**{clave: fila}, then=F(campo) + valor) for fila, valor in por_fila.items() if valor),
+                default=F(campo),
+                output_field=modelo._meta.get_field(campo),
+            )
+    return sumas
+
+
+class ProyectoQuerySet(models.QuerySet):
+
+    def update(self, **kwargs):
+        # También los contadores y los miembros cuentan como cambios del proyecto
+        filas = super().update(**_con_fecha_actualizacion(kwargs))
+        invalidar_global(using=self.db)
+        return filas
+    update.alters_data = True
+
+    def ajustar_contadores(self, cambios):
+        """
+        Suma a los contadores de cada proyecto sus tareas de más o de menos por
+        estado, {proyecto_id: {estado: delta}}, en un solo UPDATE atómico
+        """
+        incrementos = defaultdict(Counter)
+        for proyecto_id, por_estado in cambios.items():
+            for estado, delta in por_estado.items():
+                incrementos[proyecto_id][CONTADORES_POR_ESTADO[estado]] += delta
+                incrementos[proyecto_id]['total_tareas'] += delta
+        sumas = _sumas(self.model, incrementos, 'pk')
+        if not sumas:
+            return 0
+        return self.filter(pk__in=incrementos).update(**sumas)
+
+    def recalcular_contadores(self):
+        """Recalcula desde cero los contadores de tareas en un solo UPDATE"""
+        def conteo(**filtro):
+            tareas = Tarea.objects.filter(proyecto=OuterRef('pk'), **filtro).order_by()
+            tareas = tareas.values('proyecto').annotate(total=Count('pk')).values('total')
+            return Coalesce(Subquery(tareas), 0)
+
+        contadores = {
+            campo: conteo(estado=estado)
+            for estado, campo in CONTADORES_POR_ESTADO.items()
+        }
+        return self.update(total_tareas=conteo(), **contadores)
+
 
 class Proyecto(models.Model):
     nombre = models.CharField(max_length=200)
@@ -14,21 +93,32 @@ class Proyecto(models.Model):
     fecha_actualizacion = models.DateTimeField(auto_now=True)
     activo = models.BooleanField(default=True)
 
+    # Contadores de tareas mantenidos por signals y por TareaQuerySet
+    total_tareas = models.PositiveIntegerField(default=0, editable=False)
+    tareas_pendientes = models.PositiveIntegerField(default=0, editable=False)
+    tareas_en_progreso = models.PositiveIntegerField(default=0, editable=False)
+    tareas_completadas = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = ProyectoQuerySet.as_manager()
+
     class Meta:
         ordering = ['-fecha_creacion']
         verbose_name = 'Proyecto'
+        indexes = [
+            models.Index(fields=['-fecha_creacion'], name='proyecto_fecha_creacion_idx'),
+            # Cambios desde la última sincronización
+            models.Index(fields=['fecha_actualizacion', 'id'], name='proyecto_sincronizacion_idx'),
+        ]
         verbose_name_plural = 'Proyectos'
 
     def __str__(self):
         return self.nombre
     
     def progreso(self):
-        """Calcula el porcentaje de tareas completadas"""
-        total = self.tareas.count()
-        if total == 0:
+        """Calcula el porcentaje de tareas completadas a partir de los contadores"""
+        if self.total_tareas == 0:
             return 0
-        completadas = self.tareas.filter(estado='completada').count()
-        return round((completadas / total) * 100, 2)
+        return round((self.tareas_completadas / self.total_tareas) * 100, 2)
     
     def calcular_progreso(self):
         """Alias de progreso() para compatibilidad"""
@@ -41,6 +131,160 @@ class Proyecto(models.Model):
         return False
 
 
+class TareaQuerySet(models.QuerySet):
+    """
+    Mantiene los contadores de Proyecto, los resúmenes diarios y las
+    instantáneas cacheadas en las operaciones en bloque, que no disparan los
+    signals de guardado
+    """
+    CAMPOS_CONTADORES = {'estado', 'proyecto', 'proyecto_id'}
+    CAMPOS_RESUMEN = CAMPOS_CONTADORES | {'prioridad'}
+    # Campos que cambian qué usuarios ven la tarea
+    CAMPOS_ALCANCE = {'proyecto', 'proyecto_id', 'asignado_a', 'asignado_a_id'}
+
+    def _sin_contadores(self):
+        """Copia como QuerySet normal, para operaciones que recalculan los contadores aparte"""
+        return models.QuerySet(model=self.model, query=self.query.chain(), using=self._db, hints=self._hints)
+
+    def _proyectos_ids(self):
+        return set(self.order_by().values_list('proyecto_id', flat=True).distinct())
+
+    def _alcance(self):
+        """{tarea_id: (proyecto_id, asignado_a_id)}: quién ve cada tarea (ver sincronizacion.py)"""
+        return {
+            pk: (proyecto_id, asignado_a_id)
+            for pk, proyecto_id, asignado_a_id in self.order_by().values_list('pk', 'proyecto_id', 'asignado_a_id')
+        }
+
+    def update(self, **kwargs):
+        _con_fecha_actualizacion(kwargs)
+        if not self.CAMPOS_ALCANCE.intersection(kwargs):
+            return self._actualizar(kwargs)
+
+        from .sincronizacion import cambios_alcance
+        with transaction.atomic(using=self.db):
+            antes = self._alcance()
+            filas = self._actualizar(kwargs)
+            cambios_alcance(antes, Tarea.objects.using(self.db).filter(pk__in=antes)._alcance(), using=self.db)
+        return filas
+    update.alters_data = True
+
+    def _actualizar(self, kwargs):
+        if not self.CAMPOS_RESUMEN.intersection(kwargs):
+            filas = super().update(**kwargs)
+            invalidar_global(using=self.db)
+            return filas
+
+        with transaction.atomic(using=self.db):
+            proyectos_ids = self._proyectos_ids()
+            completadas = {}
+            if kwargs.get('estado') == 'completada':
+                completadas = dict(
+                    self.exclude(estado='completada').order_by().values('proyecto_id')
+                    .annotate(total=Count('pk')).values_list('proyecto_id', 'total')
+                )
+            filas = super().update(**kwargs)
+            nuevo_proyecto = kwargs.get('proyecto', kwargs.get('proyecto_id'))
+            if isinstance(nuevo_proyecto, models.Model):
+                proyectos_ids.add(nuevo_proyecto.pk)
+            elif isinstance(nuevo_proyecto, int):
+                proyectos_ids.add(nuevo_proyecto)
+            if self.CAMPOS_CONTADORES.intersection(kwargs):
+                Proyecto.objects.filter(pk__in=proyectos_ids).recalcular_contadores()
+            ResumenDiario.objects.using(self.db).sumar({
+                pk: {'tareas_completadas': total} for pk, total in completadas.items()
+            })
+            ResumenDiario.objects.using(self.db).sincronizar_niveles(proyectos_ids)
+            invalidar_global(using=self.db)
+        return filas
+
+    def delete(self):
+        from .sincronizacion import cambios_alcance
+        with transaction.atomic(using=self.db):
+            antes = self._alcance()
+            proyectos_ids = {proyecto_id for proyecto_id, _ in antes.values()}
+            # Sus notificaciones se borran en cascada sin pasar por NotificacionQuerySet
+            lectores = Notificacion.objects.using(self.db).filter(tarea_id__in=list(antes), leida=False)._usuarios_ids()
+            resultado = super().delete()
+            ContadorNotificaciones.objects.using(self.db).recalcular(lectores)
+            notificaciones_cambiadas(lectores, using=self.db)
+            # Las lápidas del borrado en bloque se escriben aquí y no en post_delete
+            Eliminacion.objects.using(self.db).anotar('tarea', antes)
+            cambios_alcance(antes, {}, using=self.db)
+            Proyecto.objects.filter(pk__in=proyectos_ids).recalcular_contadores()
+            ResumenDiario.objects.using(self.db).sincronizar_niveles(proyectos_ids)
+            invalidar_global(using=self.db)
+        return resultado
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from .visibilidad import anadir
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            proyectos_ids = {tarea.proyecto_id for tarea in objs}
+            anadir([(tarea.asignado_a_id, tarea.proyecto_id) for tarea in objs], using=self.db)
+            Proyecto.objects.filter(pk__in=proyectos_ids).recalcular_contadores()
+            flujos = defaultdict(Counter)
+            for tarea in objs:
+                flujos[tarea.proyecto_id]['tareas_creadas'] += 1
+                if tarea.estado == 'completada':
+                    flujos[tarea.proyecto_id]['tareas_completadas'] += 1
+            ResumenDiario.objects.using(self.db).sumar(flujos)
+            ResumenDiario.objects.using(self.db).sincronizar_niveles(proyectos_ids)
+            invalidar_global(using=self.db)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if 'fecha_actualizacion' not in fields:
+            ahora = timezone.now()
+            for tarea in objs:
+                tarea.fecha_actualizacion = ahora
+            fields = [*fields, 'fecha_actualizacion']
+        if not self.CAMPOS_ALCANCE.intersection(fields):
+            return self._actualizar_en_bloque(objs, fields, *args, **kwargs)
+
+        # Como con las completadas, los valores anteriores son los de las tareas cargadas desde la BD
+        from .sincronizacion import cambios_alcance
+        antes, despues = {}, {}
+        for tarea in objs:
+            cambios = tarea.changed_fields()
+            antes[tarea.pk] = (
+                cambios.get('proyecto_id', tarea.proyecto_id),
+                cambios.get('asignado_a_id', tarea.asignado_a_id),
+            )
+            despues[tarea.pk] = (tarea.proyecto_id, tarea.asignado_a_id)
+        with transaction.atomic(using=self.db):
+            filas = self._actualizar_en_bloque(objs, fields, *args, **kwargs)
+            cambios_alcance(antes, despues, using=self.db)
+        return filas
+
+    def _actualizar_en_bloque(self, objs, fields, *args, **kwargs):
+        # bulk_update llama a update() por cada lote; la invalidación y los
+        # contadores se hacen una sola vez aquí
+        if not self.CAMPOS_RESUMEN.intersection(fields):
+            filas = self._sin_contadores().bulk_update(objs, fields, *args, **kwargs)
+            invalidar_global(using=self.db)
+            return filas
+
+        with transaction.atomic(using=self.db):
+            proyectos_ids = self.filter(pk__in=[tarea.pk for tarea in objs])._proyectos_ids()
+            filas = self._sin_contadores().bulk_update(objs, fields, *args, **kwargs)
+            proyectos_ids.update(tarea.proyecto_id for tarea in objs)
+            if self.CAMPOS_CONTADORES.intersection(fields):
+                Proyecto.objects.filter(pk__in=proyectos_ids).recalcular_contadores()
+            # Las completadas solo se conocen en las tareas cargadas desde la BD
+            flujos = defaultdict(Counter)
+            for tarea in objs:
+                if tarea.estado == 'completada' and tarea.changed_fields().get('estado', 'completada') != 'completada':
+                    flujos[tarea.proyecto_id]['tareas_completadas'] += 1
+            ResumenDiario.objects.using(self.db).sumar(flujos)
+            ResumenDiario.objects.using(self.db).sincronizar_niveles(proyectos_ids)
+            invalidar_global(using=self.db)
+        return filas
+
+
 class Tarea(models.Model):
     proyecto = models.ForeignKey(Proyecto, on_delete=models.CASCADE, related_name='tareas')
     titulo = models.CharField(max_length=200)
@@ -65,14 +309,80 @@ class Tarea(models.Model):
     ]
     prioridad = models.CharField(max_length=10, choices=PRIORIDADES, default='media')
 
+    objects = TareaQuerySet.as_manager()
+
     class Meta:
         ordering = ['-fecha_creacion']
         verbose_name = 'Tarea'
         verbose_name_plural = 'Tareas'
+        indexes = [
+            # Tareas del usuario por estado y vencimiento (dashboard)
+            models.Index(fields=['asignado_a', 'estado', 'fecha_limite'], name='tarea_asignado_estado_idx'),
+            # Conteos por estado dentro de un proyecto
+            models.Index(fields=['proyecto', 'estado'], name='tarea_proyecto_estado_idx'),
+            # Tareas abiertas ordenadas por vencimiento
+            models.Index(
+                fields=['fecha_limite'],
+                condition=~Q(estado='completada'),
+                name='tarea_abiertas_limite_idx',
+            ),
+            # Orden de la API paginada por cursor
+            models.Index(fields=['-fecha_creacion', '-id'], name='tarea_fecha_creacion_id_idx'),
+            # Cambios desde la última sincronización
+            models.Index(fields=['fecha_actualizacion', 'id'], name='tarea_sincronizacion_idx'),
+        ]
 
     def __str__(self):
         return self.titulo
     
+    # Campos cuyo valor al cargar la tarea se conserva para detectar cambios
+    CAMPOS_RASTREADOS = ('estado', 'prioridad', 'asignado_a_id', 'proyecto_id')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.guardar_estado_cargado()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.guardar_estado_cargado()
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self.guardar_estado_cargado()
+            return
+        # Solo los campos escritos reflejan ahora el valor de la BD
+        estado_cargado = getattr(self, '_estado_cargado', {})
+        for campo in self.CAMPOS_RASTREADOS:
+            if campo in update_fields or campo.removesuffix('_id') in update_fields:
+                estado_cargado[campo] = self.__dict__.get(campo)
+        self.guardar_estado_cargado(estado_cargado)
+
+    def guardar_estado_cargado(self, valores=None):
+        """Guarda una copia de los campos rastreados tal como están en la base de datos"""
+        if valores is None:
+            valores = {
+                campo: self.__dict__[campo]
+                for campo in self.CAMPOS_RASTREADOS
+                if campo in self.__dict__
+            }
+        self._estado_cargado = valores
+
+    def tiene_estado_cargado(self):
+        return bool(getattr(self, '_estado_cargado', None))
+
+    def changed_fields(self):
+        """Devuelve {campo: valor_anterior} de los campos rastreados que cambiaron"""
+        estado_cargado = getattr(self, '_estado_cargado', {})
+        return {
+            campo: valor
+            for campo, valor in estado_cargado.items()
+            if self.__dict__.get(campo, valor) != valor
+        }
+
     def esta_vencida(self):
         """Verifica si la tarea está vencida"""
         return timezone.now().date() > self.fecha_limite and self.estado != 'completada'
@@ -83,20 +393,55 @@ class Tarea(models.Model):
         return delta.days
 
 
+class ComentarioQuerySet(models.QuerySet):
+    """Fecha de actualización y lápidas en las operaciones en bloque"""
+
+    def update(self, **kwargs):
+        return super().update(**_con_fecha_actualizacion(kwargs))
+    update.alters_data = True
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            ids = list(self.order_by().values_list('pk', flat=True))
+            resultado = super().delete()
+            Eliminacion.objects.using(self.db).anotar('comentario', ids)
+        return resultado
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
 class Comentario(models.Model):
     tarea = models.ForeignKey(Tarea, on_delete=models.CASCADE, related_name='comentarios')
     usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     contenido = models.TextField()
     fecha = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    objects = ComentarioQuerySet.as_manager()
 
     class Meta:
         ordering = ['-fecha']
         verbose_name = 'Comentario'
         verbose_name_plural = 'Comentarios'
+        indexes = [
+            models.Index(fields=['tarea', '-fecha'], name='comentario_tarea_fecha_idx'),
+            # Cambios desde la última sincronización
+            models.Index(fields=['fecha_actualizacion', 'id'], name='comentario_sincronizacion_idx'),
+        ]
 
     def __str__(self):
         return f"Comentario de {self.usuario.username} en {self.tarea.titulo}"
 
+    def delete(self, *args, **kwargs):
+        # Sin signal post_delete, para no impedir el borrado rápido en cascada:
+        # los comentarios de una tarea o proyecto borrado no necesitan lápida
+        using = kwargs.get('using') or self._state.db
+        pk = self.pk
+        with transaction.atomic(using=using):
+            resultado = super().delete(*args, **kwargs)
+            Eliminacion.objects.using(using).anotar('comentario', [pk])
+        return resultado
+
 
 class Historial(models.Model):
     tarea = models.ForeignKey(Tarea, on_delete=models.CASCADE, related_name='historial')
@@ -108,11 +453,166 @@ class Historial(models.Model):
         ordering = ['-fecha']
         verbose_name = 'Historial'
         verbose_name_plural = 'Historiales'
+        indexes = [
+            models.Index(fields=['tarea', '-fecha'], name='historial_tarea_fecha_idx'),
+            # Orden de la API paginada por cursor
+            models.Index(fields=['-fecha', '-id'], name='historial_fecha_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.accion} - {self.tarea.titulo}"
 
 
+class Actividad(models.Model):
+    """
+    Entrada del feed de actividad de un usuario: una por cada miembro o creador
+    del proyecto al escribir una fila de Historial (ver actividad.py). La fecha
+    se copia del historial para paginar por (usuario, fecha) sin joins.
+    """
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='actividad')
+    historial = models.ForeignKey(Historial, on_delete=models.CASCADE, related_name='actividad')
+    proyecto = models.ForeignKey(Proyecto, on_delete=models.CASCADE, related_name='actividad')
+    fecha = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-fecha', '-id']
+        verbose_name = 'Actividad'
+        verbose_name_plural = 'Actividad'
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'historial'], name='actividad_usuario_historial_unico'),
+        ]
+        indexes = [
+            # Feed del usuario paginado por (fecha, id)
+            models.Index(fields=['usuario', '-fecha', '-id'], name='actividad_usuario_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario_id} - {self.historial_id}"
+
+
+class ProyectoVisible(models.Model):
+    """
+    Proyecto que ve un usuario: lo creó, es miembro o tiene alguna tarea
+    asignada en él. Se mantiene al cambiar esas relaciones (ver visibilidad.py).
+    """
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='proyectos_visibles')
+    proyecto = models.ForeignKey(Proyecto, on_delete=models.CASCADE, related_name='visibles')
+
+    class Meta:
+        verbose_name = 'Proyecto visible'
+        verbose_name_plural = 'Proyectos visibles'
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'proyecto'], name='proyecto_visible_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario_id} - {self.proyecto_id}"
+
+
+class EliminacionQuerySet(models.QuerySet):
+
+    def anotar(self, modelo, ids, usuario_id=None):
+        """Escribe las lápidas de los `ids` de `modelo` en un solo INSERT"""
+        ahora = timezone.now()
+        return self.bulk_create([
+            Eliminacion(modelo=modelo, objeto_id=pk, usuario_id=usuario_id, fecha=ahora)
+            for pk in ids
+        ])
+
+
+class Eliminacion(models.Model):
+    """
+    Lápida de un proyecto, tarea o comentario borrado, para la sincronización
+    incremental (ver sincronizacion.py). Con usuario, la fila sigue existiendo
+    pero ese usuario ha dejado de verla.
+    """
+    MODELOS = [
+        ('proyecto', 'Proyecto'),
+        ('tarea', 'Tarea'),
+        ('comentario', 'Comentario'),
+    ]
+    modelo = models.CharField(max_length=20, choices=MODELOS)
+    objeto_id = models.PositiveBigIntegerField()
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='+'
+    )
+    fecha = models.DateTimeField(default=timezone.now)
+
+    objects = EliminacionQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['fecha', 'id']
+        verbose_name = 'Eliminación'
+        verbose_name_plural = 'Eliminaciones'
+        indexes = [
+            models.Index(fields=['fecha', 'id'], name='eliminacion_fecha_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.modelo} {self.objeto_id}"
+
+
+class NotificacionQuerySet(models.QuerySet):
+    """
+    Mantiene el contador de no leídas de cada usuario, invalida las
+    instantáneas cacheadas y avisa a las conexiones SSE de los usuarios afectados
+    """
+
+    def _usuarios_ids(self):
+        return set(self.order_by().values_list('usuario_id', flat=True).distinct())
+
+    def update(self, **kwargs):
+        usuarios_ids = self._usuarios_ids()
+        with transaction.atomic(using=self.db):
+            if kwargs.keys() == {'leida'}:
+                filas = self._marcar(kwargs['leida'], usuarios_ids)
+            else:
+                filas = super().update(**kwargs)
+                if kwargs.keys() & {'leida', 'usuario', 'usuario_id'}:
+                    nuevo = kwargs.get('usuario', kwargs.get('usuario_id'))
+                    nuevos = {getattr(nuevo, 'pk', nuevo)} if nuevo is not None else set()
+                    ContadorNotificaciones.objects.using(self.db).recalcular(usuarios_ids | nuevos)
+        notificaciones_cambiadas(usuarios_ids, using=self.db)
+        return filas
+    update.alters_data = True
+
+    def _marcar(self, leida, usuarios_ids):
+        """
+        Marca como leídas (o no leídas) usuario a usuario: las filas que
+        devuelve cada UPDATE son exactamente las que mueven su contador
+        """
+        filas = 0
+        for usuario_id in usuarios_ids:
+            cambiadas = models.QuerySet.update(
+                self.filter(usuario_id=usuario_id).exclude(leida=leida), leida=leida
+            )
+            if cambiadas:
+                ContadorNotificaciones.objects.using(self.db).ajustar(usuario_id, -cambiadas if leida else cambiadas)
+            filas += cambiadas
+        return filas
+
+    def delete(self):
+        usuarios_ids = self._usuarios_ids()
+        with transaction.atomic(using=self.db):
+            resultado = super().delete()
+            ContadorNotificaciones.objects.using(self.db).recalcular(usuarios_ids)
+        notificaciones_cambiadas(usuarios_ids, using=self.db)
+        return resultado
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            if kwargs.get('ignore_conflicts'):
+                # No se sabe qué filas se insertaron
+                ContadorNotificaciones.objects.using(self.db).recalcular({obj.usuario_id for obj in objs})
+            else:
+                for usuario_id, total in Counter(obj.usuario_id for obj in objs if not obj.leida).items():
+                    ContadorNotificaciones.objects.using(self.db).ajustar(usuario_id, total)
+        return objs
+
+
 class Notificacion(models.Model):
     usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notificaciones')
     tarea = models.ForeignKey(Tarea, on_delete=models.CASCADE, related_name='notificaciones')
@@ -127,11 +627,240 @@ class Notificacion(models.Model):
         ('comentario', 'Nuevo Comentario'),
     ]
     tipo = models.CharField(max_length=20, choices=TIPOS)
+    # Fecha límite a la que se refiere un aviso de vencimiento
+    fecha_limite = models.DateField(null=True, blank=True)
+
+    objects = NotificacionQuerySet.as_manager()
 
     class Meta:
         ordering = ['-fecha_creacion']
         verbose_name = 'Notificación'
         verbose_name_plural = 'Notificaciones'
+        constraints = [
+            # Un solo aviso de vencimiento por tarea, usuario y fecha límite
+            models.UniqueConstraint(
+                fields=['tarea', 'usuario', 'fecha_limite'],
+                condition=Q(tipo='vencimiento'),
+                name='notif_vencimiento_unico',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['usuario', 'leida', '-fecha_creacion'], name='notif_usuario_leida_idx'),
+            # Bandeja de no leídas: solo indexa las filas pendientes de leer
+            models.Index(
+                fields=['usuario', '-fecha_creacion'],
+                condition=Q(leida=False),
+                name='notif_no_leidas_idx',
+            ),
+            # Bandeja completa en el orden de la API paginada por cursor
+            models.Index(fields=['usuario', '-fecha_creacion', '-id'], name='notif_usuario_fecha_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.tipo} - {self.usuario.username}"
+
+    def delete(self, *args, **kwargs):
+        # Sin signal post_delete, para no impedir el borrado rápido en cascada
+        using = kwargs.get('using') or self._state.db
+        with transaction.atomic(using=using):
+            resultado = super().delete(*args, **kwargs)
+            ContadorNotificaciones.objects.using(using).recalcular([self.usuario_id])
+        notificaciones_cambiadas([self.usuario_id], using=using)
+        return resultado
+
+
+class ContadorNotificacionesQuerySet(models.QuerySet):
+
+    def ajustar(self, usuario_id, delta):
+        """Suma delta a las no leídas del usuario de forma atómica"""
+        filas = self.filter(usuario_id=usuario_id).update(no_leidas=Greatest(F('no_leidas') + delta, 0))
+        if not filas:
+            # Primera notificación del usuario: la fila se crea con el total real
+            self.recalcular([usuario_id])
+
+    def recalcular(self, usuarios_ids):
+        """Vuelve a contar las no leídas de los usuarios y guarda el total"""
+        usuarios_ids = {pk for pk in usuarios_ids if pk}
+        if not usuarios_ids:
+            return
+        totales = dict(
+            Notificacion.objects.using(self.db).filter(usuario_id__in=usuarios_ids, leida=False).order_by()
+            .values('usuario_id').annotate(total=Count('pk')).values_list('usuario_id', 'total')
+        )
+        self.bulk_create(
+            [ContadorNotificaciones(usuario_id=pk, no_leidas=totales.get(pk, 0)) for pk in usuarios_ids],
+            update_conflicts=True, unique_fields=['usuario'], update_fields=['no_leidas'],
+        )
+
+
+class ContadorNotificaciones(models.Model):
+    """
+    Notificaciones sin leer de cada usuario, mantenidas por NotificacionQuerySet
+    y por signals (ver notificaciones.py)
+    """
+    usuario = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='contador_notificaciones'
+    )
+    no_leidas = models.PositiveIntegerField(default=0)
+
+    objects = ContadorNotificacionesQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Contador de notificaciones'
+        verbose_name_plural = 'Contadores de notificaciones'
+
+    def __str__(self):
+        return f"{self.usuario_id}: {self.no_leidas}"
+
+
+class ResumenDiarioQuerySet(models.QuerySet):
+    """
+    Actualización incremental de los resúmenes del día. Cada cambio se suma a la
+    fila del proyecto y a la global; la primera fila del día parte de los
+    niveles de la última fila anterior.
+    """
+
+    def _fila(self, fecha, proyecto_id):
+        return self.filter(fecha=fecha, proyecto_id=proyecto_id)
+
+    def _filas(self, fecha, proyectos_ids):
+        """Filas del día de los proyectos (None es la fila global)"""
+        condicion = Q(proyecto_id__isnull=True) if None in proyectos_ids else Q()
+        if set(proyectos_ids) - {None}:
+            condicion |= Q(proyecto_id__in=set(proyectos_ids) - {None})
+        return self.filter(condicion, fecha=fecha)
+
+    def _guardar(self, fecha, proyecto_id, valores, sumar):
+        """Suma (sumar=True) o fija los valores en la fila del día, creándola si no existe"""
+        fila = self._fila(fecha, proyecto_id)
+        cambios = {campo: F(campo) + valor for campo, valor in valores.items()} if sumar else valores
+        if fila.update(**cambios):
+            return
+
+        anterior = self.filter(proyecto_id=proyecto_id, fecha__lt=fecha).order_by('-fecha').values(
+            *ResumenDiario.NIVELES
+        ).first() or {}
+        nueva = {campo: anterior.get(campo, 0) for campo in ResumenDiario.NIVELES}
+        for campo, valor in valores.items():
+            nueva[campo] = nueva.get(campo, 0) + valor if sumar else valor
+        try:
+            with transaction.atomic(using=self.db):
+                self.create(fecha=fecha, proyecto_id=proyecto_id, **nueva)
+        except IntegrityError:
+            # Otra transacción creó la fila del día entre tanto
+            fila.update(**cambios)
+
+    def _sumar_existentes(self, fecha, filas):
+        """
+        Suma `filas` ({proyecto_id: {campo: incremento}}) a las filas del día
+        que ya existen, en un solo UPDATE. Devuelve los proyecto_id de esas filas.
+        """
+        existentes = set(self._filas(fecha, filas).values_list('proyecto_id', flat=True))
+        if existentes:
+            # Las filas creadas después de la consulta las suma _guardar(), que empieza con un UPDATE
+            incrementos = {pk: valores for pk, valores in filas.items() if pk in existentes}
+            self._filas(fecha, existentes).update(**_sumas(self.model, incrementos, 'proyecto_id'))
+        return existentes
+
+    def sumar(self, cambios, fecha=None):
+        """
+        cambios: {proyecto_id: {campo: incremento}}. El total global se
+        calcula sumando los de todos los proyectos. Las filas que ya existen
+        se actualizan juntas; las que faltan se crean de una en una.
+        """
+        fecha = fecha or timezone.localdate()
+        filas = {}
+        total = Counter()
+        for proyecto_id, valores in cambios.items():
+            valores = {campo: valor for campo, valor in valores.items() if valor}
+            if valores:
+                total.update(valores)
+                filas[proyecto_id] = valores
+        total = {campo: valor for campo, valor in total.items() if valor}
+        if total:
+            filas[None] = total
+        if not filas:
+            return
+
+        actualizadas = self._sumar_existentes(fecha, filas)
+        for proyecto_id, valores in filas.items():
+            if proyecto_id not in actualizadas:
+                self._guardar(fecha, proyecto_id, valores, sumar=True)
+
+    def sincronizar_niveles(self, proyectos_ids, fecha=None):
+        """
+        Fija los niveles del día de los proyectos indicados y los globales con
+        los conteos reales de la tabla de tareas (tras operaciones en bloque)
+        """
+        fecha = fecha or timezone.localdate()
+        abiertas = Tarea.objects.using(self.db).exclude(estado='completada').order_by()
+
+        niveles = {pk: dict.fromkeys(ResumenDiario.NIVELES, 0) for pk in proyectos_ids}
+        for proyecto_id, estado, prioridad, total in abiertas.filter(proyecto_id__in=niveles).values(
+            'proyecto_id', 'estado', 'prioridad'
+        ).annotate(total=Count('pk')).values_list('proyecto_id', 'estado', 'prioridad', 'total'):
+            for campo in ResumenDiario.campos_nivel(estado, prioridad):
+                niveles[proyecto_id][campo] += total
+
+        niveles[None] = dict.fromkeys(ResumenDiario.NIVELES, 0)
+        for estado, prioridad, total in abiertas.values('estado', 'prioridad').annotate(
+            total=Count('pk')
+        ).values_list('estado', 'prioridad', 'total'):
+            for campo in ResumenDiario.campos_nivel(estado, prioridad):
+                niveles[None][campo] += total
+
+        existentes = set(Proyecto.objects.using(self.db).filter(pk__in=proyectos_ids).values_list('pk', flat=True))
+        for proyecto_id, valores in niveles.items():
+            if proyecto_id is None or proyecto_id in existentes:
+                self._guardar(fecha, proyecto_id, valores, sumar=False)
+
+
+class ResumenDiario(models.Model):
+    """
+    Cifras diarias para las gráficas de evolución, globales (proyecto vacío) o
+    por proyecto. Los campos de creadas/completadas cuentan lo ocurrido ese día;
+    los de tareas abiertas son el nivel al final del día. Un día sin cambios no
+    tiene fila: vale el nivel de la última fila anterior (ver resumenes.py).
+    """
+    fecha = models.DateField()
+    proyecto = models.ForeignKey(Proyecto, on_delete=models.CASCADE, null=True, blank=True, related_name='resumenes')
+
+    proyectos_creados = models.PositiveIntegerField(default=0)
+    tareas_creadas = models.PositiveIntegerField(default=0)
+    tareas_completadas = models.PositiveIntegerField(default=0)
+
+    # Tareas abiertas al final del día, por estado y por prioridad
+    abiertas_pendiente = models.IntegerField(default=0)
+    abiertas_en_progreso = models.IntegerField(default=0)
+    abiertas_baja = models.IntegerField(default=0)
+    abiertas_media = models.IntegerField(default=0)
+    abiertas_alta = models.IntegerField(default=0)
+
+    objects = ResumenDiarioQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['fecha']
+        verbose_name = 'Resumen diario'
+        verbose_name_plural = 'Resúmenes diarios'
+        constraints = [
+            models.UniqueConstraint(fields=['proyecto', 'fecha'], name='resumen_proyecto_fecha_unico'),
+            # NULL no se considera repetido en una restricción única
+            models.UniqueConstraint(
+                fields=['fecha'],
+                condition=Q(proyecto__isnull=True),
+                name='resumen_global_fecha_unico',
+            ),
+        ]
+
+    FLUJOS = ('proyectos_creados', 'tareas_creadas', 'tareas_completadas')
+    NIVELES = ('abiertas_pendiente', 'abiertas_en_progreso', 'abiertas_baja', 'abiertas_media', 'abiertas_alta')
+
+    def __str__(self):
+        return f"{self.fecha} - {self.proyecto or 'Global'}"
+
+    @staticmethod
+    def campos_nivel(estado, prioridad):
+        """Campos de nivel en los que cuenta una tarea con ese estado y prioridad"""
+        if estado == 'completada':
+            return ()
+        return (f'abiertas_{estado}', f'abiertas_{prioridad}')
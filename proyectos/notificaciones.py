@@ -0,0 +1,46 @@
+"""
+Contador de no leídas y bandeja de notificaciones de la barra de navegación.
+
+ContadorNotificaciones guarda las no leídas de cada usuario. Crear y marcar
+notificaciones le suma o resta las filas afectadas con un UPDATE atómico; los
+borrados y los cambios sin valor anterior conocido lo vuelven a contar.
+
+La bandeja (contador y últimas no leídas) se guarda en caché bajo la versión
+'usuario:<id>' de proyectos.versiones, que cambia con cualquier cambio en las
+notificaciones del usuario: con la caché caliente no consulta la BD.
+"""
+from django.core.cache import cache
+
+from .models import ContadorNotificaciones, Notificacion
+from .versiones import versiones
+
+
+# Notificaciones sin leer que se muestran en la bandeja
+RECIENTES = 5
+
+# Las versiones ya invalidan los cambios
+TIEMPO_CACHE = 60 * 15
+
+
+def no_leidas(usuario_id):
+    """Notificaciones sin leer del usuario, según su contador"""
+    return ContadorNotificaciones.objects.filter(usuario_id=usuario_id).values_list('no_leidas', flat=True).first() or 0
+
+
+def bandeja(usuario_id):
+    """{'no_leidas': total, 'recientes': [las últimas no leídas]} del usuario"""
+    version, = versiones(f'usuario:{usuario_id}')
+    clave = f'bandeja:{usuario_id}:{version}'
+    datos = cache.get(clave)
+    if datos is None:
+        total = no_leidas(usuario_id)
+        recientes = []
+        if total:
+            recientes = list(
+                Notificacion.objects.filter(usuario_id=usuario_id, leida=False)
+                .order_by('-fecha_creacion')
+                .values('id', 'mensaje', 'tipo', 'tarea_id', 'fecha_creacion')[:RECIENTES]
+            )
+        datos = {'no_leidas': total, 'recientes': recientes}
+        cache.set(clave, datos, TIEMPO_CACHE)
+    return datos
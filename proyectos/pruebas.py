@@ -0,0 +1,36 @@
+"""
+Utilidades comunes de las pruebas de todas las apps.
+"""
+from datetime import date
+
+from django.test import override_settings
+
+from cuentas.models import User
+from .models import Proyecto, Tarea
+
+
+HOY = date(2026, 1, 15)
+
+# Las plantillas usan {% static %}; en las pruebas no hay manifest de collectstatic
+SIN_MANIFEST = override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+
+
+def crear_usuario(username, role='member'):
+    return User.objects.create_user(username, password='clave-segura-1', role=role)
+
+
+def crear_proyecto(creado_por, nombre='Proyecto', **kwargs):
+    kwargs.setdefault('descripcion', 'Descripción')
+    kwargs.setdefault('fecha_inicio', HOY)
+    return Proyecto.objects.create(nombre=nombre, creado_por=creado_por, **kwargs)
+
+
+def crear_tarea(proyecto, asignado_a=None, titulo='Tarea', **kwargs):
+    kwargs.setdefault('descripcion', 'Descripción')
+    kwargs.setdefault('fecha_limite', HOY)
+    return Tarea.objects.create(
+        proyecto=proyecto, titulo=titulo, asignado_a=asignado_a, creado_por=proyecto.creado_por, **kwargs
+    )
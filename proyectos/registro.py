@@ -0,0 +1,162 @@
+"""
+Escritura en lote de las filas de Historial y Notificacion (y del feed de
+actividad que se reparte a partir del historial).
+
+Los signals no insertan directamente: registran las filas y estas se escriben
+con un bulk_create por modelo cuando se confirma la transacción en curso
+(transaction.on_commit). Si la transacción se revierte, no se escribe nada.
+Fuera de una transacción las filas se acumulan hasta el final de la petición
+(RegistroEnLoteMiddleware) o se escriben en el momento.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+
+from asgiref.local import Local
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .actividad import repartir
+from .models import Historial, Notificacion
+from .difusion import notificaciones_cambiadas
+
+
+_estado = Local()
+
+
+class _Lote:
+    """Filas pendientes de un mismo nivel de transacción (o savepoint)"""
+
+    def __init__(self, using):
+        self.using = using
+        self.filas = []
+
+    def __call__(self):
+        filas, self.filas = self.filas, []
+        escribir(filas, using=self.using)
+
+
+def escribir(filas, using=DEFAULT_DB_ALIAS, ignore_conflicts=False):
+    """Inserta las filas con un solo bulk_create por modelo"""
+    por_modelo = defaultdict(list)
+    for fila in filas:
+        por_modelo[type(fila)].append(fila)
+
+    # Una sola transacción para todos los modelos: bulk_create abriría una por llamada
+    with transaction.atomic(using=using):
+        for modelo, objs in por_modelo.items():
+            modelo.objects.using(using).bulk_create(objs, ignore_conflicts=ignore_conflicts)
+        # Feed de actividad de los miembros de cada proyecto (ver actividad.py)
+        repartir(por_modelo[Historial], using=using)
+        notificaciones_cambiadas((fila.usuario_id for fila in por_modelo[Notificacion]), using=using)
+
+
+def filas_tarea(tarea, usuario_id, cambios=None):
+    """
+    Filas de Historial y Notificacion de una tarea recién creada (cambios=None)
+    o de los cambios detectados con Tarea.changed_fields()
+    """
+    filas = []
+
+    if cambios is None:
+        # Historial de creación
+        filas.append(Historial(
+            tarea=tarea,
+            usuario_id=usuario_id,
+            accion=f"Tarea '{tarea.titulo}' creada"
+        ))
+
+        # Notificación de asignación si se asigna a alguien
+        if tarea.asignado_a_id:
+            filas.append(Notificacion(
+                usuario_id=tarea.asignado_a_id,
+                tarea=tarea,
+                mensaje=f"Se te ha asignado la tarea: {tarea.titulo}",
+                tipo='asignacion'
+            ))
+        return filas
+
+    # Detectar cambios en el estado
+    if 'estado' in cambios:
+        filas.append(Historial(
+            tarea=tarea,
+            usuario_id=usuario_id,
+            accion=f"Estado cambiado de '{cambios['estado']}' a '{tarea.estado}'"
+        ))
+
+        # Notificación de cambio de estado
+        if tarea.asignado_a_id:
+            filas.append(Notificacion(
+                usuario_id=tarea.asignado_a_id,
+                tarea=tarea,
+                mensaje=f"El estado de '{tarea.titulo}' cambió a {tarea.get_estado_display()}",
+                tipo='cambio_estado'
+            ))
+
+    # Detectar cambio de asignación
+    if 'asignado_a_id' in cambios and tarea.asignado_a_id:
+        filas.append(Historial(
+            tarea=tarea,
+            usuario_id=usuario_id,
+            accion=f"Tarea asignada a {tarea.asignado_a.username}"
+        ))
+
+        filas.append(Notificacion(
+            usuario_id=tarea.asignado_a_id,
+            tarea=tarea,
+            mensaje=f"Se te ha asignado la tarea: {tarea.titulo}",
+            tipo='asignacion'
+        ))
+
+    return filas
+
+
+def _lote_transaccion(conexion, using):
+    """Lote asociado al savepoint actual, registrado en on_commit una sola vez"""
+    pendientes = [func for _, func, _ in conexion.run_on_commit]
+    lotes = getattr(_estado, 'lotes', {})
+    clave = (using, tuple(conexion.savepoint_ids))
+    lote = lotes.get(clave)
+
+    # Un lote que ya no está pendiente se ejecutó o se descartó con un rollback
+    if lote is None or not any(func is lote for func in pendientes):
+        lotes = {
+            k: v for k, v in lotes.items()
+            if any(func is v for func in pendientes)
+        }
+        lote = lotes[clave] = _Lote(using)
+        _estado.lotes = lotes
+        transaction.on_commit(lote, using=using)
+    return lote
+
+
+def registrar(*filas, using=DEFAULT_DB_ALIAS):
+    """Programa la escritura de filas de Historial/Notificacion"""
+    if not filas:
+        return
+
+    conexion = transaction.get_connection(using)
+    if conexion.in_atomic_block:
+        _lote_transaccion(conexion, using).filas.extend(filas)
+    elif getattr(_estado, 'peticion', None) is not None:
+        _estado.peticion[using].extend(filas)
+    else:
+        escribir(filas, using=using)
+
+
+@contextmanager
+def registro_en_lote():
+    """
+    Acumula las filas registradas fuera de transacción hasta salir del bloque.
+    Se escriben también si el bloque termina con una excepción, porque los
+    cambios que las originaron ya están confirmados.
+    """
+    if getattr(_estado, 'peticion', None) is not None:
+        yield
+        return
+
+    _estado.peticion = defaultdict(list)
+    try:
+        yield
+    finally:
+        pendientes, _estado.peticion = _estado.peticion, None
+        for using, filas in pendientes.items():
+            escribir(filas, using=using)
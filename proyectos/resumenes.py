@@ -0,0 +1,136 @@
+"""
+Resúmenes diarios para las gráficas de evolución.
+
+ResumenDiario guarda una fila por día y proyecto (y una global) solo los días
+con cambios. Los signals de Tarea/Proyecto y TareaQuerySet la mantienen al día
+de forma incremental; reconstruir() la rellena a partir del historial. Leer una
+serie cuesta lo mismo sea cual sea el tamaño de las tablas de tareas: solo
+depende del rango de fechas.
+"""
+import re
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models.functions import TruncDate
+
+from .models import Historial, Proyecto, ResumenDiario, Tarea
+
+
+# Texto de Historial de un cambio de estado (ver registro.filas_tarea)
+PATRON_CAMBIO_ESTADO = re.compile(r"^Estado cambiado de '(?P<de>[a-z_]+)' a '(?P<a>[a-z_]+)'$")
+
+
+def cambios_resumen(antes, despues):
+    """
+    Incrementos de ResumenDiario al pasar una tarea de `antes` a `despues`,
+    cada uno (proyecto_id, estado, prioridad) o None si no existe
+    """
+    cambios = defaultdict(Counter)
+    if antes is not None:
+        proyecto_id, estado, prioridad = antes
+        for campo in ResumenDiario.campos_nivel(estado, prioridad):
+            cambios[proyecto_id][campo] -= 1
+    if despues is not None:
+        proyecto_id, estado, prioridad = despues
+        for campo in ResumenDiario.campos_nivel(estado, prioridad):
+            cambios[proyecto_id][campo] += 1
+        if antes is None:
+            cambios[proyecto_id]['tareas_creadas'] += 1
+        if estado == 'completada' and (antes is None or antes[1] != 'completada'):
+            cambios[proyecto_id]['tareas_completadas'] += 1
+    return cambios
+
+
+def serie(desde, hasta, proyecto_id=None):
+    """
+    Una entrada por día entre desde y hasta (incluidos). Los días sin fila
+    tienen flujos a cero y conservan los niveles del día anterior.
+    """
+    resumenes = ResumenDiario.objects.filter(proyecto_id=proyecto_id)
+    campos = ('fecha', *ResumenDiario.FLUJOS, *ResumenDiario.NIVELES)
+
+    anterior = resumenes.filter(fecha__lt=desde).order_by('-fecha').values(*ResumenDiario.NIVELES).first()
+    niveles = anterior or dict.fromkeys(ResumenDiario.NIVELES, 0)
+    filas = {fila['fecha']: fila for fila in resumenes.filter(fecha__range=(desde, hasta)).values(*campos)}
+
+    dias = []
+    fecha = desde
+    while fecha <= hasta:
+        fila = filas.get(fecha)
+        if fila is not None:
+            niveles = {campo: fila[campo] for campo in ResumenDiario.NIVELES}
+        dias.append({
+            'fecha': fecha,
+            **{campo: fila[campo] if fila else 0 for campo in ResumenDiario.FLUJOS},
+            **niveles,
+        })
+        fecha += timedelta(days=1)
+    return dias
+
+
+def reconstruir(tamano_lote=2000):
+    """
+    Rehace todos los resúmenes desde las fechas de creación y los cambios de
+    estado guardados en Historial. Se supone la prioridad actual de cada tarea
+    durante toda su vida y las tareas eliminadas no constan; los niveles del
+    día de hoy se ajustan al final con los conteos reales.
+    Devuelve el número de filas creadas.
+    """
+    # (fecha, proyecto_id) -> incrementos del día
+    dias = defaultdict(Counter)
+
+    for pk, dia in Proyecto.objects.annotate(dia=TruncDate('fecha_creacion')).values_list('pk', 'dia').iterator():
+        dias[dia, pk]['proyectos_creados'] += 1
+
+    tareas = Tarea.objects.annotate(dia=TruncDate('fecha_creacion')).order_by('pk').values_list(
+        'pk', 'proyecto_id', 'estado', 'prioridad', 'dia'
+    )
+    ultimo_pk = 0
+    while bloque := list(tareas.filter(pk__gt=ultimo_pk)[:tamano_lote]):
+        ultimo_pk = bloque[-1][0]
+
+        transiciones = defaultdict(list)
+        for tarea_id, dia, accion in Historial.objects.filter(
+            tarea_id__in=[fila[0] for fila in bloque],
+            accion__startswith='Estado cambiado de ',
+        ).annotate(dia=TruncDate('fecha')).order_by('tarea_id', 'fecha', 'pk').values_list('tarea_id', 'dia', 'accion'):
+            coincidencia = PATRON_CAMBIO_ESTADO.match(accion)
+            if coincidencia:
+                transiciones[tarea_id].append((dia, coincidencia['de'], coincidencia['a']))
+
+        for pk, proyecto_id, estado, prioridad, dia in bloque:
+            cambios = transiciones.get(pk, [])
+            # El estado inicial es el de partida del primer cambio registrado
+            estado_actual = cambios[0][1] if cambios else estado
+            for campo, valor in cambios_resumen(None, (proyecto_id, estado_actual, prioridad))[proyecto_id].items():
+                dias[dia, proyecto_id][campo] += valor
+            for dia_cambio, de, a in cambios:
+                antes = (proyecto_id, de, prioridad)
+                despues = (proyecto_id, a, prioridad)
+                for campo, valor in cambios_resumen(antes, despues)[proyecto_id].items():
+                    dias[dia_cambio, proyecto_id][campo] += valor
+
+    # Totales globales del día
+    for (dia, proyecto_id), valores in list(dias.items()):
+        dias[dia, None].update(valores)
+
+    # Los niveles se acumulan día a día dentro de cada proyecto
+    filas = []
+    niveles = defaultdict(Counter)
+    for dia, proyecto_id in sorted(dias, key=lambda clave: (clave[0], clave[1] or 0)):
+        valores = dias[dia, proyecto_id]
+        acumulado = niveles[proyecto_id]
+        acumulado.update({campo: valores[campo] for campo in ResumenDiario.NIVELES})
+        filas.append(ResumenDiario(
+            fecha=dia,
+            proyecto_id=proyecto_id,
+            **{campo: valores[campo] for campo in ResumenDiario.FLUJOS},
+            **{campo: acumulado[campo] for campo in ResumenDiario.NIVELES},
+        ))
+
+    with transaction.atomic():
+        ResumenDiario.objects.all().delete()
+        ResumenDiario.objects.bulk_create(filas, batch_size=tamano_lote)
+        ResumenDiario.objects.sincronizar_niveles(Proyecto.objects.values_list('pk', flat=True))
+    return len(filas)
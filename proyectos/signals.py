@@ -1,72 +1,350 @@
-from django.db.models.signals import post_save, pre_save
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import Tarea, Historial, Notificacion
+from django.utils import timezone
+from .models import ContadorNotificaciones, Eliminacion, Proyecto, Tarea, Notificacion, ResumenDiario
+from .registro import filas_tarea, registrar
+from .resumenes import cambios_resumen
+from .sincronizacion import cambios_alcance
+from .actividad import anadir_miembros, quitar_miembros
+from .busqueda import CAMPOS, motor
+from .difusion import notificaciones_cambiadas
+from .versiones import invalidar_global
+from . import visibilidad
+
+
+def cambios_guardados(instance, update_fields=None):
+    """Cambios de la tarea que realmente se escribieron en este guardado"""
+    cambios = instance.changed_fields()
+    if update_fields is not None:
+        cambios = {
+            campo: valor for campo, valor in cambios.items()
+            if campo in update_fields or campo.removesuffix('_id') in update_fields
+        }
+    return cambios
 
 
 @receiver(pre_save, sender=Tarea)
 def guardar_estado_anterior(sender, instance, **kwargs):
-    """Guardar el estado anterior antes de modificar"""
-    if instance.pk:
-        try:
-            old_instance = Tarea.objects.get(pk=instance.pk)
-            instance._old_estado = old_instance.estado
-            instance._old_asignado = old_instance.asignado_a
-        except Tarea.DoesNotExist:
-            pass
+    """
+    Guardar el estado anterior antes de modificar.
+    Las tareas cargadas desde la BD ya traen su estado en from_db(); solo se
+    consulta la BD para instancias construidas a mano con una pk existente.
+    """
+    if not instance.pk or instance.tiene_estado_cargado():
+        return
+    valores = Tarea.objects.filter(pk=instance.pk).values(*Tarea.CAMPOS_RASTREADOS).first()
+    if valores:
+        instance.guardar_estado_cargado(valores)
+
+
+def cambios_contadores(antes, despues):
+    """
+    Incrementos de los contadores de los proyectos al pasar una tarea de
+    `antes` a `despues`, cada uno (proyecto_id, estado) o None si no existe
+    """
+    cambios = defaultdict(Counter)
+    if antes is not None:
+        cambios[antes[0]][antes[1]] -= 1
+    if despues is not None:
+        cambios[despues[0]][despues[1]] += 1
+    return cambios
 
 
 @receiver(post_save, sender=Tarea)
-def crear_historial_tarea(sender, instance, created, **kwargs):
-    """Crear registro en historial cuando se crea o modifica una tarea"""
+def tarea_guardada(sender, instance, created, raw=False, update_fields=None, using=None, **kwargs):
+    """
+    Todo lo que sigue al guardado de una tarea, en un solo receptor: historial,
+    contadores del proyecto (un UPDATE), resumen del día (un SELECT y un UPDATE), proyectos
+    visibles y lápidas de sincronización
+    """
+    cambios = None if created else cambios_guardados(instance, update_fields)
+
     # Obtener el usuario que está haciendo la modificación desde el contexto de la tarea
-    usuario_actual = getattr(instance, '_current_user', instance.creado_por)
-    
-    if created:
-        # Historial de creación
-        Historial.objects.create(
-            tarea=instance,
-            usuario=usuario_actual,
-            accion=f"Tarea '{instance.titulo}' creada"
+    usuario_actual = getattr(instance, '_current_user', None)
+    usuario_id = usuario_actual.pk if usuario_actual else instance.creado_por_id
+    # Las filas se escriben en lote al confirmar la transacción (ver registro.py)
+    registrar(*filas_tarea(instance, usuario_id, cambios), using=using)
+
+    if raw or cambios == {}:
+        return
+
+    despues = (instance.proyecto_id, instance.estado, instance.prioridad)
+    antes = None if created else (
+        cambios.get('proyecto_id', instance.proyecto_id),
+        cambios.get('estado', instance.estado),
+        cambios.get('prioridad', instance.prioridad),
+    )
+    if created or 'estado' in cambios or 'proyecto_id' in cambios:
+        Proyecto.objects.using(using).ajustar_contadores(
+            cambios_contadores(None if antes is None else antes[:2], despues[:2])
         )
-        
-        # Notificación de asignación si se asigna a alguien
-        if instance.asignado_a:
-            Notificacion.objects.create(
-                usuario=instance.asignado_a,
-                tarea=instance,
-                mensaje=f"Se te ha asignado la tarea: {instance.titulo}",
-                tipo='asignacion'
-            )
+    if created or cambios.keys() & {'estado', 'prioridad', 'proyecto_id'}:
+        ResumenDiario.objects.using(using).sumar(cambios_resumen(antes, despues))
+
+    if created:
+        # El asignado ve el proyecto; los contadores ya le han cambiado la fecha
+        visibilidad.anadir([(instance.asignado_a_id, instance.proyecto_id)], using=using, actualizar=False)
+    elif 'asignado_a_id' in cambios or 'proyecto_id' in cambios:
+        # Lápidas y fechas para quien deja de ver o empieza a ver la tarea (ver sincronizacion.py)
+        alcance = (instance.proyecto_id, instance.asignado_a_id)
+        anterior = (cambios.get('proyecto_id', alcance[0]), cambios.get('asignado_a_id', alcance[1]))
+        cambios_alcance({instance.pk: anterior}, {instance.pk: alcance}, using=using)
+
+
+@receiver(post_delete, sender=Tarea)
+def tarea_eliminada(sender, instance, origin=None, using=None, **kwargs):
+    """Contadores, resumen del día, lápida y proyectos visibles de una tarea eliminada"""
+    # Al borrar el proyecto no hay nada que actualizar ni tareas que anotar, y
+    # TareaQuerySet.delete() se ocupa de todo una sola vez al final del borrado en bloque
+    if isinstance(origin, Proyecto):
+        return
+    if isinstance(origin, QuerySet) and origin.model in (Proyecto, Tarea):
+        return
+
+    antes = (instance.proyecto_id, instance.estado, instance.prioridad)
+    Proyecto.objects.using(using).ajustar_contadores(cambios_contadores(antes[:2], None))
+    ResumenDiario.objects.using(using).sumar(cambios_resumen(antes, None))
+    Eliminacion.objects.using(using).anotar('tarea', [instance.pk])
+    cambios_alcance({instance.pk: (instance.proyecto_id, instance.asignado_a_id)}, {}, using=using)
+
+
+@receiver(pre_save, sender=Proyecto)
+def guardar_creador_anterior(sender, instance, raw=False, update_fields=None, using=None, **kwargs):
+    if raw or instance.pk is None or update_fields is not None and 'creado_por' not in update_fields:
+        return
+    instance._creador_anterior = Proyecto.objects.using(using).filter(
+        pk=instance.pk
+    ).values_list('creado_por_id', flat=True).first()
+
+
+@receiver(post_save, sender=Proyecto)
+def visibilidad_creador(sender, instance, created, raw=False, using=None, **kwargs):
+    """El creador ve el proyecto; si cambia, el anterior puede dejar de verlo"""
+    if raw:
+        return
+    anterior = instance.__dict__.pop('_creador_anterior', None)
+    if created or anterior not in (None, instance.creado_por_id):
+        # Un proyecto nuevo ya tiene su fecha: no hace falta actualizarla
+        visibilidad.anadir([(instance.creado_por_id, instance.pk)], using=using, actualizar=not created)
+    if anterior not in (None, instance.creado_por_id):
+        visibilidad.revisar([(anterior, instance.pk)], using=using)
+
+
+@receiver(post_delete, sender=Proyecto)
+def anotar_proyecto_eliminado(sender, instance, using=None, **kwargs):
+    Eliminacion.objects.using(using).anotar('proyecto', [instance.pk])
+
+
+@receiver(post_save, sender=Proyecto)
+@receiver(post_delete, sender=Proyecto)
+@receiver(post_save, sender=Tarea)
+@receiver(post_delete, sender=Tarea)
+def invalidar_instantaneas(sender, instance, using=None, origin=None, **kwargs):
+    """Las cifras cacheadas del panel dependen de todos los proyectos y tareas"""
+    # En los borrados de proyectos o en bloque de tareas basta con invalidar una vez
+    if sender is Tarea and (
+        isinstance(origin, Proyecto)
+        or isinstance(origin, QuerySet) and origin.model in (Proyecto, Tarea)
+    ):
+        return
+    invalidar_global(using=using)
+
+
+@receiver(m2m_changed, sender=Proyecto.miembros.through)
+def invalidar_instantaneas_miembros(sender, action, using=None, **kwargs):
+    if action.startswith('post_'):
+        invalidar_global(using=using)
+
+
+@receiver(m2m_changed, sender=Proyecto.miembros.through)
+def actualizar_fecha_miembros(sender, instance, action, reverse, pk_set, using=None, **kwargs):
+    """Los miembros forman parte del proyecto: cambiarlos cambia su fecha de actualización"""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    ahora = timezone.now()
+    if not reverse:
+        Proyecto.objects.using(using).filter(pk=instance.pk).update(fecha_actualizacion=ahora)
+    elif action == 'pre_clear':
+        instance.proyectos.using(using).update(fecha_actualizacion=ahora)
+    else:
+        Proyecto.objects.using(using).filter(pk__in=pk_set).update(fecha_actualizacion=ahora)
+
+
+# Campos del usuario que la API anida en proyectos y tareas (UserSerializer)
+CAMPOS_USUARIO_ANIDADOS = ('username', 'email', 'first_name', 'last_name', 'role')
+
+
+def _actualizar_fecha_de_usuario(tareas_ids, proyectos_ids, using):
+    """Proyectos y tareas que muestran al usuario cambian de fecha (y de ETag)"""
+    ahora = timezone.now()
+    if tareas_ids:
+        Tarea.objects.using(using).filter(pk__in=tareas_ids).update(fecha_actualizacion=ahora)
+    if proyectos_ids:
+        Proyecto.objects.using(using).filter(pk__in=proyectos_ids).update(fecha_actualizacion=ahora)
+
+
+def _referencias_usuario(usuario_id, using):
+    """(ids de tareas, ids de proyectos) en los que aparece el usuario"""
+    tareas_ids = list(
+        Tarea.objects.using(using).filter(Q(asignado_a_id=usuario_id) | Q(creado_por_id=usuario_id))
+        .values_list('pk', flat=True)
+    )
+    proyectos_ids = set(Proyecto.objects.using(using).filter(creado_por_id=usuario_id).values_list('pk', flat=True))
+    proyectos_ids.update(
+        Proyecto.miembros.through.objects.using(using).filter(user_id=usuario_id).values_list('proyecto_id', flat=True)
+    )
+    return tareas_ids, proyectos_ids
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def guardar_usuario_anterior(sender, instance, raw=False, update_fields=None, using=None, **kwargs):
+    # Los guardados de last_login al iniciar sesión no cambian nada visible
+    if raw or instance.pk is None or update_fields is not None and not set(update_fields) & set(CAMPOS_USUARIO_ANIDADOS):
+        return
+    instance._usuario_anterior = sender.objects.using(using).filter(
+        pk=instance.pk
+    ).values(*CAMPOS_USUARIO_ANIDADOS).first()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def actualizar_fecha_usuario(sender, instance, created, raw=False, using=None, **kwargs):
+    """Un usuario renombrado (o con otro rol) cambia lo que devuelven sus proyectos y tareas"""
+    anterior = instance.__dict__.pop('_usuario_anterior', None)
+    if created or anterior is None:
+        return
+    if all(getattr(instance, campo) == valor for campo, valor in anterior.items()):
+        return
+    _actualizar_fecha_de_usuario(*_referencias_usuario(instance.pk, using), using)
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def guardar_referencias_usuario(sender, instance, using=None, **kwargs):
+    instance._referencias = _referencias_usuario(instance.pk, using)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def actualizar_fecha_usuario_eliminado(sender, instance, using=None, **kwargs):
+    """
+    Las tareas que tenía asignadas quedan sin asignar y los proyectos en los
+    que era miembro pierden un miembro, sin pasar por update() ni m2m_changed
+    """
+    referencias = instance.__dict__.pop('_referencias', None)
+    if referencias:
+        _actualizar_fecha_de_usuario(*referencias, using)
+
+
+@receiver(post_save, sender=Notificacion)
+def contar_notificacion(sender, instance, created, raw=False, update_fields=None, using=None, **kwargs):
+    """Mantener el contador de no leídas al crear o guardar una notificación"""
+    if raw:
+        return
+    if created:
+        if not instance.leida:
+            ContadorNotificaciones.objects.using(using).ajustar(instance.usuario_id, 1)
+    elif update_fields is None or 'leida' in update_fields:
+        # Sin el valor anterior de leida: se vuelve a contar
+        ContadorNotificaciones.objects.using(using).recalcular([instance.usuario_id])
+
+
+@receiver(post_save, sender=Notificacion)
+def avisar_cambio_notificacion(sender, instance, using=None, **kwargs):
+    """Invalidar las instantáneas del usuario y avisar a sus conexiones SSE"""
+    # Conectado después de contar_notificacion: en autocommit el aviso sale en el
+    # momento y quien lo reciba debe leer ya el contador actualizado
+    notificaciones_cambiadas([instance.usuario_id], using=using)
+
+
+@receiver(pre_delete, sender=Tarea)
+@receiver(pre_delete, sender=Proyecto)
+def guardar_lectores(sender, instance, origin=None, using=None, **kwargs):
+    """
+    Las notificaciones de la tarea (o de las tareas del proyecto) se borran en
+    cascada sin pasar por NotificacionQuerySet: quién tenía alguna sin leer
+    """
+    # Las tareas de un proyecto borrado van con el proyecto, y TareaQuerySet.delete() ya las cuenta
+    if sender is Tarea and (
+        isinstance(origin, Proyecto)
+        or isinstance(origin, QuerySet) and origin.model in (Proyecto, Tarea)
+    ):
+        return
+    filtro = {'tarea': instance} if sender is Tarea else {'tarea__proyecto': instance}
+    instance._lectores = Notificacion.objects.using(using).filter(leida=False, **filtro)._usuarios_ids()
+
+
+@receiver(post_delete, sender=Tarea)
+@receiver(post_delete, sender=Proyecto)
+def descontar_notificaciones_borradas(sender, instance, using=None, **kwargs):
+    lectores = instance.__dict__.pop('_lectores', None)
+    if lectores:
+        ContadorNotificaciones.objects.using(using).recalcular(lectores)
+        notificaciones_cambiadas(lectores, using=using)
+
+
+@receiver(post_save, sender=Proyecto)
+def resumir_proyecto_creado(sender, instance, created, raw=False, using=None, **kwargs):
+    if created and not raw:
+        ResumenDiario.objects.using(using).sumar({instance.pk: {'proyectos_creados': 1}})
+
+
+@receiver(post_delete, sender=Proyecto)
+def resumir_proyecto_eliminado(sender, instance, using=None, **kwargs):
+    """Las tareas del proyecto ya se borraron: ajustar los niveles globales del día"""
+    ResumenDiario.objects.using(using).sincronizar_niveles([])
+
+
+@receiver(m2m_changed, sender=Proyecto.miembros.through)
+def actualizar_actividad_miembros(sender, instance, action, reverse, pk_set, using=None, **kwargs):
+    """Dar o quitar el feed de actividad del proyecto al cambiar sus miembros"""
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    if action == 'pre_clear':
+        relacionados = instance.proyectos if reverse else instance.miembros
+        pk_set = set(relacionados.using(using).values_list('pk', flat=True))
+    # reverse: instance es el usuario y pk_set los proyectos
+    cambios = [(pk, {instance.pk}) for pk in pk_set] if reverse else [(instance.pk, pk_set)]
+
+    for proyecto_id, usuarios_ids in cambios:
+        if action == 'post_add':
+            anadir_miembros(proyecto_id, usuarios_ids, using=using)
+        else:
+            quitar_miembros(proyecto_id, usuarios_ids, using=using)
+
+
+@receiver(m2m_changed, sender=Proyecto.miembros.through)
+def visibilidad_miembros(sender, instance, action, reverse, pk_set, using=None, **kwargs):
+    """Los miembros ven el proyecto; los que salen pueden seguir viéndolo por otra vía"""
+    if action == 'pre_clear':
+        # post_clear no trae pk_set: se guardan aquí los pares que se quitan
+        relacionados = instance.proyectos if reverse else instance.miembros
+        pk_set = set(relacionados.using(using).values_list('pk', flat=True))
+        instance._miembros_quitados = pk_set
+        return
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_miembros_quitados', set())
+    elif action not in ('post_add', 'post_remove'):
+        return
+
+    # reverse: instance es el usuario y pk_set los proyectos
+    pares = [(instance.pk, pk) for pk in pk_set] if reverse else [(pk, instance.pk) for pk in pk_set]
+    if action == 'post_add':
+        visibilidad.anadir(pares, using=using)
     else:
-        # Detectar cambios en el estado
-        if hasattr(instance, '_old_estado') and instance._old_estado != instance.estado:
-            Historial.objects.create(
-                tarea=instance,
-                usuario=usuario_actual,
-                accion=f"Estado cambiado de '{instance._old_estado}' a '{instance.estado}'"
-            )
-            
-            # Notificación de cambio de estado
-            if instance.asignado_a:
-                Notificacion.objects.create(
-                    usuario=instance.asignado_a,
-                    tarea=instance,
-                    mensaje=f"El estado de '{instance.titulo}' cambió a {instance.get_estado_display()}",
-                    tipo='cambio_estado'
-                )
-        
-        # Detectar cambio de asignación
-        if hasattr(instance, '_old_asignado') and instance._old_asignado != instance.asignado_a:
-            if instance.asignado_a:
-                Historial.objects.create(
-                    tarea=instance,
-                    usuario=usuario_actual,
-                    accion=f"Tarea asignada a {instance.asignado_a.username}"
-                )
-                
-                Notificacion.objects.create(
-                    usuario=instance.asignado_a,
-                    tarea=instance,
-                    mensaje=f"Se te ha asignado la tarea: {instance.titulo}",
-                    tipo='asignacion'
-                )
+        visibilidad.revisar(pares, using=using)
+
+
+@receiver(post_migrate)
+def reparar_busqueda(sender, using='default', **kwargs):
+    """Las migraciones que rehacen una tabla en SQLite borran los triggers del índice"""
+    if sender.name != 'proyectos':
+        return
+    connection = connections[using]
+    for modelo in CAMPOS:
+        # Las filas escritas mientras faltaban no están en el índice
+        if motor(connection).reparar(connection, modelo):
+            motor(connection).reconstruir(connection, modelo)
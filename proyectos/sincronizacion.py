@@ -0,0 +1,96 @@
+"""
+Sincronización incremental de proyectos, tareas y comentarios.
+
+Las tres tablas llevan fecha_actualizacion, que también ponen los update() y
+bulk_update() en bloque, y los borrados dejan una lápida en Eliminacion. Un
+cliente que recuerda hasta cuándo sincronizó pide solo las filas con fecha
+posterior y las lápidas posteriores: el coste depende del volumen de cambios,
+no del tamaño de los datos.
+
+Un member solo sincroniza las tareas que tiene asignadas, sus comentarios y
+sus proyectos visibles (visibilidad.py). Cuando una tarea deja de estar
+asignada a alguien se le deja una lápida propia; cuando pasa a estar asignada
+se actualiza la fecha de sus comentarios, para que lleguen al nuevo usuario en
+su siguiente sincronización. Las lápidas y las fechas de los proyectos que
+alguien deja de ver o empieza a ver las escribe visibilidad.py, que sabe qué
+pares cambian de verdad.
+
+Los borrados en cascada no dejan lápidas de las filas hijas: el cliente borra
+las tareas de un proyecto borrado y los comentarios de una tarea borrada.
+"""
+from datetime import timedelta
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Comentario, Eliminacion, Proyecto, Tarea
+from .visibilidad import cambios_tareas, proyectos_visibles
+
+
+# Tiempo que se conservan las lápidas: un token más antiguo obliga a sincronizar de cero
+RETENCION = timedelta(days=90)
+
+# Las filas toman su fecha antes de confirmar la transacción: cada sincronización
+# vuelve a pedir este margen para no perder las que se confirmaron tarde
+MARGEN = timedelta(seconds=30)
+
+
+def visibles(usuario):
+    """Proyectos, tareas y comentarios que ve el usuario"""
+    proyectos = Proyecto.objects.all()
+    tareas = Tarea.objects.all()
+    comentarios = Comentario.objects.all()
+    if usuario.role == 'member':
+        tareas = tareas.filter(asignado_a=usuario)
+        proyectos = proyectos.filter(pk__in=proyectos_visibles(usuario))
+        comentarios = comentarios.filter(tarea__asignado_a=usuario)
+    return {'proyectos': proyectos, 'tareas': tareas, 'comentarios': comentarios}
+
+
+def eliminaciones(usuario):
+    """Lápidas que afectan al usuario, sin las de filas que ha vuelto a ver"""
+    if usuario.role != 'member':
+        return Eliminacion.objects.filter(usuario__isnull=True)
+    return Eliminacion.objects.filter(
+        Q(usuario__isnull=True) | Q(usuario=usuario)
+    ).exclude(
+        usuario=usuario, modelo='proyecto', objeto_id__in=proyectos_visibles(usuario),
+    ).exclude(
+        usuario=usuario, modelo='tarea', objeto_id__in=visibles(usuario)['tareas'].values('pk'),
+    )
+
+
+def cambios_alcance(antes, despues, using=DEFAULT_DB_ALIAS):
+    """
+    Lápidas y fechas para los usuarios que dejan de ver o empiezan a ver
+    tareas al cambiar su proyecto o su asignación. `antes` y `despues` son
+    {tarea_id: (proyecto_id, asignado_a_id)}; las tareas que faltan en
+    `despues` se han borrado (su lápida general la escribe el borrado).
+    """
+    ahora = timezone.now()
+    lapidas = []
+    reasignadas = []
+    for pk, (proyecto_id, asignado_id) in antes.items():
+        nuevo = despues.get(pk)
+        if nuevo is None or nuevo[1] == asignado_id:
+            continue
+        if asignado_id is not None:
+            lapidas.append(Eliminacion(modelo='tarea', objeto_id=pk, usuario_id=asignado_id, fecha=ahora))
+        if nuevo[1] is not None:
+            reasignadas.append(pk)
+
+    if lapidas:
+        Eliminacion.objects.using(using).bulk_create(lapidas)
+    if reasignadas:
+        Comentario.objects.using(using).filter(tarea_id__in=reasignadas).update(fecha_actualizacion=ahora)
+
+    # Los mismos cambios mueven los proyectos visibles de cada usuario, con
+    # sus lápidas y fechas (ver visibilidad.py)
+    cambios_tareas(antes, despues, using=using)
+
+
+def purgar(retencion=RETENCION):
+    """Elimina las lápidas más antiguas que la retención; devuelve cuántas"""
+    eliminadas, _ = Eliminacion.objects.filter(fecha__lt=timezone.now() - retencion).delete()
+    return eliminadas
@@ -0,0 +1,155 @@
+"""
+Stream SSE (Server-Sent Events) de la bandeja de notificaciones.
+
+Es una aplicación ASGI propia, montada en asgi.py delante de Django: no pasa
+por el manejador de Django ni por sus middleware síncronos, de modo que una
+conexión abierta no ocupa un hilo. Las consultas (sesión, notificaciones
+nuevas y contador de no leídas) se ejecutan en el pool compartido de hilos y
+solo cuando hay un aviso del difusor o vence el intervalo de comprobación.
+
+Eventos:
+- 'notificacion': una notificación nueva; su id es el de la notificación
+- 'no_leidas': el número de no leídas cuando cambia
+El navegador reenvía Last-Event-ID al reconectar y se envían las notificaciones
+posteriores a ese id.
+"""
+import json
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http.cookie import parse_cookie
+from django.http.request import split_domain_port, validate_host
+from django.utils.module_loading import import_string
+
+from .asincrono import en_hilo_compartido
+from .difusion import difusor
+from .models import Notificacion
+from .notificaciones import no_leidas as total_no_leidas
+
+
+RUTA = '/notificaciones/stream/'
+
+# Segundos entre comprobaciones sin aviso (cubre escrituras de otros procesos) y comentario keep-alive
+INTERVALO = 15
+# Notificaciones enviadas como máximo por lectura
+LIMITE = 50
+# Milisegundos que espera el navegador antes de reconectar
+REINTENTO = 3000
+
+
+def _cabeceras(scope):
+    return {nombre.decode('latin-1').lower(): valor.decode('latin-1') for nombre, valor in scope['headers']}
+
+
+@en_hilo_compartido
+def autenticar(cookies):
+    """id del usuario de la sesión o None"""
+    clave = cookies.get(settings.SESSION_COOKIE_NAME)
+    if not clave:
+        return None
+    motor = import_string(settings.SESSION_ENGINE)
+    usuario = get_user(SimpleNamespace(session=motor.SessionStore(clave)))
+    return usuario.pk if usuario.is_authenticated else None
+
+
+@en_hilo_compartido
+def ultimo_id(usuario_id):
+    return Notificacion.objects.filter(usuario_id=usuario_id).order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+@en_hilo_compartido
+def pendientes(usuario_id, desde_id):
+    """Notificaciones posteriores a desde_id y número de no leídas"""
+    notificaciones = Notificacion.objects.filter(usuario_id=usuario_id)
+    nuevas = list(notificaciones.filter(pk__gt=desde_id).order_by('pk').values(
+        'id', 'mensaje', 'tipo', 'tarea_id', 'leida', 'fecha_creacion',
+    )[:LIMITE])
+    return nuevas, total_no_leidas(usuario_id)
+
+
+def evento(nombre, datos, id=None):
+    lineas = [f'event: {nombre}']
+    if id is not None:
+        lineas.append(f'id: {id}')
+    lineas.append(f'data: {json.dumps(datos, cls=DjangoJSONEncoder)}')
+    return ('\n'.join(lineas) + '\n\n').encode()
+
+
+class NotificacionesSSE:
+
+    async def __call__(self, scope, receive, send):
+        cabeceras = _cabeceras(scope)
+
+        # Misma comprobación que HttpRequest.get_host(), ya que aquí no pasa por Django
+        permitidos = settings.ALLOWED_HOSTS
+        if settings.DEBUG and not permitidos:
+            permitidos = ['.localhost', '127.0.0.1', '[::1]']
+        host, _ = split_domain_port(cabeceras.get('host', ''))
+        if not validate_host(host, permitidos):
+            return await self.responder(send, 400, b'Host no permitido')
+
+        usuario_id = await autenticar(parse_cookie(cabeceras.get('cookie', '')))
+        if usuario_id is None:
+            return await self.responder(send, 401, b'No autenticado')
+
+        # Last-Event-ID al reconectar; ?ultimo= para la primera conexión
+        ultimo = cabeceras.get('last-event-id') or parse_qs(scope.get('query_string', b'').decode()).get('ultimo', [''])[0]
+        desde_id = int(ultimo) if ultimo.isdigit() else await ultimo_id(usuario_id)
+
+        suscripcion = difusor.suscribir(usuario_id)
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream; charset=utf-8'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no'),
+                ],
+            })
+            await self.enviar(send, f'retry: {REINTENTO}\n\n'.encode())
+            await self.transmitir(receive, send, suscripcion, usuario_id, desde_id)
+        except OSError:
+            # El cliente cerró la conexión mientras se enviaba
+            pass
+        finally:
+            difusor.cancelar(suscripcion)
+
+    async def transmitir(self, receive, send, suscripcion, usuario_id, desde_id):
+        desconectado = False
+
+        async def escuchar():
+            nonlocal desconectado
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            desconectado = True
+            suscripcion.avisar()
+
+        escucha = suscripcion.loop.create_task(escuchar())
+        try:
+            no_leidas = None
+            while not desconectado:
+                nuevas, total = await pendientes(usuario_id, desde_id)
+                for notificacion in nuevas:
+                    desde_id = notificacion['id']
+                    await self.enviar(send, evento('notificacion', notificacion, id=desde_id))
+                if total != no_leidas:
+                    no_leidas = total
+                    await self.enviar(send, evento('no_leidas', {'total': total}, id=desde_id))
+                if len(nuevas) == LIMITE:
+                    continue
+
+                if not await suscripcion.esperar(INTERVALO) and not desconectado:
+                    await self.enviar(send, b': ping\n\n')
+        finally:
+            escucha.cancel()
+
+    async def enviar(self, send, cuerpo):
+        await send({'type': 'http.response.body', 'body': cuerpo, 'more_body': True})
+
+    async def responder(self, send, estado, cuerpo):
+        await send({'type': 'http.response.start', 'status': estado, 'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+        await send({'type': 'http.response.body', 'body': cuerpo})
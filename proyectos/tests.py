@@ -1,3 +1,729 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from proyectos.busqueda import Clasificacion, buscar, clasificar
+from proyectos import admision, checks, lotes, vencimientos, visibilidad
+from proyectos.importacion import ImportadorTareas
+from proyectos.models import ContadorNotificaciones, Eliminacion, Historial, Notificacion, Proyecto, ProyectoVisible, ResumenDiario, Tarea
+from proyectos.notificaciones import bandeja, no_leidas
+from proyectos.pruebas import SIN_MANIFEST, crear_proyecto, crear_tarea, crear_usuario
+from proyectos.difusion import difusor
+from proyectos.sincronizacion import eliminaciones, visibles
+from proyectos.sse import NotificacionesSSE, RUTA as RUTA_SSE
+from proyectos.vencimientos import notificar_vencimientos
+
+
+class BusquedaTests(TestCase):
+
+    def setUp(self):
+        self.admin = crear_usuario('admin', role='admin')
+        self.proyecto = crear_proyecto(self.admin, nombre='Migración del servidor')
+        crear_tarea(self.proyecto, titulo='Copia de seguridad del servidor')
+        crear_tarea(self.proyecto, titulo='Revisar permisos')
+
+    def test_encuentra_por_palabra_y_prefijo(self):
+        self.assertEqual(len(clasificar(Tarea.objects.all(), 'servidor').pks), 1)
+        self.assertEqual(len(clasificar(Tarea.objects.all(), 'perm').pks), 1)
+
+    def test_alcance_vacio_no_falla(self):
+        """Un queryset sin filas posibles (pk__in=[]) no tiene SQL: la búsqueda queda vacía"""
+        vacio = Proyecto.objects.filter(pk__in=[])
+        self.assertEqual(clasificar(vacio, 'servidor'), Clasificacion([], False))
+        self.assertEqual(list(buscar(vacio, 'servidor')), [])
+
+
+class TopesBusquedaTests(TestCase):
+
+    def setUp(self):
+        admin = crear_usuario('admin', role='admin')
+        proyecto = crear_proyecto(admin)
+        self.tareas = [crear_tarea(proyecto, titulo=f'Informe {numero}') for numero in range(5)]
+
+    def test_sin_truncar(self):
+        clasificacion = clasificar(Tarea.objects.all(), 'informe', limite=5)
+        self.assertEqual(len(clasificacion.pks), 5)
+        self.assertFalse(clasificacion.truncada)
+
+    def test_limite_truncado(self):
+        clasificacion = clasificar(Tarea.objects.all(), 'informe', limite=3)
+        self.assertEqual(len(clasificacion.pks), 3)
+        self.assertTrue(clasificacion.truncada)
+
+    def test_candidatos_truncados(self):
+        """Solo se puntúan las coincidencias más recientes; las demás no aparecen"""
+        with mock.patch('proyectos.busqueda.CANDIDATOS', 2):
+            clasificacion = clasificar(Tarea.objects.all(), 'informe')
+        self.assertEqual(set(clasificacion.pks), {tarea.pk for tarea in self.tareas[-2:]})
+        self.assertTrue(clasificacion.truncada)
+
+    def test_candidatos_justos(self):
+        with mock.patch('proyectos.busqueda.CANDIDATOS', 5):
+            clasificacion = clasificar(Tarea.objects.all(), 'informe')
+        self.assertEqual(len(clasificacion.pks), 5)
+        self.assertFalse(clasificacion.truncada)
+
+    @SIN_MANIFEST
+    def test_aviso_en_la_lista_web(self):
+        self.client.login(username='admin', password='clave-segura-1')
+        with mock.patch('proyectos.views.TareaListView.limite_busqueda', 2):
+            respuesta = self.client.get('/proyectos/tareas/?busqueda=informe')
+        self.assertTrue(respuesta.context['busqueda_truncada'])
+        self.assertContains(respuesta, 'Se muestran los 2 resultados más relevantes')
+        respuesta = self.client.get('/proyectos/tareas/?busqueda=informe')
+        self.assertFalse(respuesta.context['busqueda_truncada'])
+
+
+@SIN_MANIFEST
+class BusquedaAlcanceVacioVistasTests(TestCase):
+    """Un member sin proyectos visibles busca sin errores"""
+
+    def setUp(self):
+        admin = crear_usuario('admin', role='admin')
+        crear_proyecto(admin, nombre='Proyecto principal')
+        crear_usuario('miembro')
+        self.client.login(username='miembro', password='clave-segura-1')
+
+    def test_lista_web(self):
+        respuesta = self.client.get('/proyectos/?busqueda=p')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(list(respuesta.context['proyectos']), [])
+
+    def test_api(self):
+        respuesta = self.client.get('/api/proyectos/?search=p')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['results'], [])
+
+
+class VisibilidadTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.admin = crear_usuario('admin', role='admin')
+        self.miembro = crear_usuario('miembro')
+        self.proyecto = crear_proyecto(self.admin)
+
+    def pares(self):
+        return set(ProyectoVisible.objects.values_list('usuario_id', 'proyecto_id'))
+
+    def lapidas(self):
+        return list(Eliminacion.objects.filter(modelo='proyecto').values_list('usuario_id', 'objeto_id'))
+
+    def test_creador_miembros_y_tareas(self):
+        self.assertEqual(self.pares(), {(self.admin.pk, self.proyecto.pk)})
+        self.proyecto.miembros.add(self.miembro)
+        self.assertEqual(visibilidad.proyectos_visibles(self.miembro), [self.proyecto.pk])
+        tarea = crear_tarea(self.proyecto, asignado_a=self.miembro)
+        self.proyecto.miembros.remove(self.miembro)
+        # Sigue viéndolo por la tarea
+        self.assertIn((self.miembro.pk, self.proyecto.pk), self.pares())
+        self.assertEqual(self.lapidas(), [])
+        tarea.asignado_a = None
+        tarea.save()
+        self.assertEqual(visibilidad.proyectos_visibles(self.miembro), [])
+        self.assertEqual(self.lapidas(), [(self.miembro.pk, self.proyecto.pk)])
+
+    def test_lapida_solo_si_se_quita_el_par(self):
+        """Revisar un par que no se veía no deja lápida"""
+        self.assertEqual(visibilidad.revisar([(self.miembro.pk, self.proyecto.pk)]), set())
+        tarea = crear_tarea(self.proyecto)
+        tarea.asignado_a = self.admin
+        tarea.save()
+        tarea.asignado_a = None
+        tarea.save()
+        # El creador sigue viendo su proyecto
+        self.assertEqual(self.lapidas(), [])
+
+    def test_miembros_vaciados(self):
+        self.proyecto.miembros.add(self.miembro)
+        self.miembro.proyectos.clear()
+        self.assertEqual(self.pares(), {(self.admin.pk, self.proyecto.pk)})
+        self.assertEqual(self.lapidas(), [(self.miembro.pk, self.proyecto.pk)])
+
+    def test_cambio_de_creador(self):
+        otro = crear_usuario('otro', role='admin')
+        self.proyecto.creado_por = otro
+        self.proyecto.save()
+        self.assertEqual(self.pares(), {(otro.pk, self.proyecto.pk)})
+        self.assertEqual(self.lapidas(), [(self.admin.pk, self.proyecto.pk)])
+
+    def test_miembros_desde_el_usuario(self):
+        otro = crear_proyecto(self.admin, nombre='Otro')
+        self.miembro.proyectos.add(self.proyecto, otro)
+        self.assertEqual(sorted(visibilidad.proyectos_visibles(self.miembro)), [self.proyecto.pk, otro.pk])
+        self.miembro.proyectos.remove(otro)
+        self.assertEqual(visibilidad.proyectos_visibles(self.miembro), [self.proyecto.pk])
+
+    def test_asignacion_en_bloque_y_cambio_de_proyecto(self):
+        otro = crear_proyecto(self.admin, nombre='Otro')
+        tarea = crear_tarea(self.proyecto)
+        Tarea.objects.filter(pk=tarea.pk).update(asignado_a=self.miembro)
+        self.assertEqual(visibilidad.proyectos_visibles(self.miembro), [self.proyecto.pk])
+        tarea.refresh_from_db()
+        tarea.proyecto = otro
+        tarea.save()
+        self.assertEqual(visibilidad.proyectos_visibles(self.miembro), [otro.pk])
+        self.assertEqual(self.lapidas(), [(self.miembro.pk, self.proyecto.pk)])
+
+    def test_signals_de_miembros_usan_la_bd_del_cambio(self):
+        with mock.patch('proyectos.signals.anadir_miembros') as anadir, \
+                mock.patch('proyectos.signals.quitar_miembros') as quitar:
+            self.proyecto.miembros.add(self.miembro)
+            self.proyecto.miembros.remove(self.miembro)
+        anadir.assert_called_once_with(self.proyecto.pk, {self.miembro.pk}, using='default')
+        quitar.assert_called_once_with(self.proyecto.pk, {self.miembro.pk}, using='default')
+
+    def test_reconstruir(self):
+        crear_tarea(self.proyecto, asignado_a=self.miembro)
+        ProyectoVisible.objects.all().delete()
+        self.assertEqual(visibilidad.reconstruir(), 2)
+        self.assertEqual(self.pares(), {(self.admin.pk, self.proyecto.pk), (self.miembro.pk, self.proyecto.pk)})
+
+
+class SincronizacionAlcanceTests(TestCase):
+    """La sincronización de un member sigue sus proyectos visibles"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = crear_usuario('admin', role='admin')
+        self.miembro = crear_usuario('miembro')
+        self.proyecto = crear_proyecto(self.admin)
+
+    def test_proyectos_de_los_que_es_miembro(self):
+        self.proyecto.miembros.add(self.miembro)
+        self.assertEqual(list(visibles(self.miembro)['proyectos']), [self.proyecto])
+        self.assertEqual(list(visibles(self.miembro)['tareas']), [])
+
+    def test_volver_a_ver_un_proyecto(self):
+        """El proyecto que se vuelve a ver cambia de fecha y su lápida deja de enviarse"""
+        tarea = crear_tarea(self.proyecto, asignado_a=self.miembro)
+        tarea.asignado_a = None
+        tarea.save()
+        self.assertEqual(
+            list(eliminaciones(self.miembro).values_list('modelo', 'objeto_id')),
+            [('tarea', tarea.pk), ('proyecto', self.proyecto.pk)],
+        )
+        antes = Proyecto.objects.get().fecha_actualizacion
+        tarea.asignado_a = self.miembro
+        tarea.save()
+        self.assertGreater(Proyecto.objects.get().fecha_actualizacion, antes)
+        self.assertEqual(list(eliminaciones(self.miembro)), [])
+
+    def test_reasignar_dentro_de_un_proyecto_visible(self):
+        """Sin pares nuevos ni quitados, ni lápidas de proyecto ni cambios de fecha"""
+        self.proyecto.miembros.add(self.miembro)
+        tarea = crear_tarea(self.proyecto)
+        antes = Proyecto.objects.get().fecha_actualizacion
+        tarea.asignado_a = self.miembro
+        tarea.save()
+        tarea.asignado_a = None
+        tarea.save()
+        self.assertEqual(Proyecto.objects.get().fecha_actualizacion, antes)
+        self.assertEqual(list(eliminaciones(self.miembro).values_list('modelo', flat=True)), ['tarea'])
+
+
+class RegistroEnLoteTests(TransactionTestCase):
+    """Las filas de un savepoint revertido no se escriben al confirmar la transacción"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = crear_usuario('admin', role='admin')
+        self.usuario = crear_usuario('usuario')
+        self.proyecto = crear_proyecto(self.admin)
+
+    def test_savepoint_revertido(self):
+        with transaction.atomic():
+            confirmada = crear_tarea(self.proyecto, asignado_a=self.usuario, titulo='Confirmada')
+            try:
+                with transaction.atomic():
+                    crear_tarea(self.proyecto, asignado_a=self.usuario, titulo='Revertida')
+                    raise RuntimeError('fallo')
+            except RuntimeError:
+                pass
+            # Un savepoint nuevo tras el rollback sí cuenta
+            with transaction.atomic():
+                confirmada.estado = 'en_progreso'
+                confirmada.save()
+
+        self.assertEqual(Tarea.objects.get().pk, confirmada.pk)
+        self.assertEqual(
+            list(Historial.objects.order_by('pk').values_list('tarea_id', flat=True)), [confirmada.pk, confirmada.pk]
+        )
+        self.assertEqual(Notificacion.objects.filter(usuario=self.usuario).count(), 2)
+        self.assertEqual(no_leidas(self.usuario.pk), 2)
+        self.proyecto.refresh_from_db()
+        self.assertEqual((self.proyecto.total_tareas, self.proyecto.tareas_en_progreso), (1, 1))
+
+    def test_transaccion_revertida(self):
+        try:
+            with transaction.atomic():
+                crear_tarea(self.proyecto, asignado_a=self.usuario)
+                raise RuntimeError('fallo')
+        except RuntimeError:
+            pass
+        self.assertFalse(Historial.objects.exists())
+        self.assertFalse(Notificacion.objects.exists())
+        self.assertEqual(no_leidas(self.usuario.pk), 0)
+
+
+class ContadoresYResumenTests(TestCase):
+    """Contadores de los proyectos y resumen del día al guardar y borrar tareas"""
+
+    def setUp(self):
+        self.admin = crear_usuario('admin', role='admin')
+        self.proyecto = crear_proyecto(self.admin, nombre='Uno')
+        self.otro = crear_proyecto(self.admin, nombre='Dos')
+        # Las filas del resumen de hoy ya existen
+        self.tarea = crear_tarea(self.proyecto, asignado_a=self.admin)
+        crear_tarea(self.otro)
+
+    def contadores(self, proyecto):
+        proyecto.refresh_from_db()
+        return (proyecto.total_tareas, proyecto.tareas_pendientes, proyecto.tareas_en_progreso,
+                proyecto.tareas_completadas)
+
+    def resumen(self, proyecto=None):
+        return ResumenDiario.objects.filter(proyecto=proyecto).values(
+            'tareas_creadas', 'tareas_completadas', 'abiertas_pendiente', 'abiertas_en_progreso', 'abiertas_media',
+        ).get()
+
+    def test_guardar_cuesta_un_update_por_tabla(self):
+        # UPDATE de la tarea y de los contadores; SELECT y UPDATE de las filas del resumen del día
+        with self.assertNumQueries(4):
+            self.tarea.estado = 'completada'
+            self.tarea.save()
+        # INSERT, contadores, resumen (SELECT y UPDATE) y proyectos visibles del asignado
+        with self.assertNumQueries(5):
+            crear_tarea(self.proyecto, asignado_a=self.admin)
+        # Sin cambios en los campos que se resumen, solo la tarea
+        with self.assertNumQueries(1):
+            self.tarea.titulo = 'Otro título'
+            self.tarea.save()
+
+    def test_cambio_de_estado(self):
+        self.tarea.estado = 'en_progreso'
+        self.tarea.save()
+        self.assertEqual(self.contadores(self.proyecto), (1, 0, 1, 0))
+        self.assertEqual(self.resumen(self.proyecto), {
+            'tareas_creadas': 1, 'tareas_completadas': 0,
+            'abiertas_pendiente': 0, 'abiertas_en_progreso': 1, 'abiertas_media': 1,
+        })
+        self.assertEqual(self.resumen()['tareas_creadas'], 2)
+        self.assertEqual(self.resumen()['abiertas_en_progreso'], 1)
+
+    def test_cambio_de_proyecto(self):
+        """Un solo UPDATE suma a un proyecto y resta al otro"""
+        self.tarea.proyecto = self.otro
+        self.tarea.estado = 'completada'
+        self.tarea.save()
+        self.assertEqual(self.contadores(self.proyecto), (0, 0, 0, 0))
+        self.assertEqual(self.contadores(self.otro), (2, 1, 0, 1))
+        self.assertEqual(self.resumen(self.proyecto)['abiertas_pendiente'], 0)
+        self.assertEqual(self.resumen(self.otro)['tareas_completadas'], 1)
+        self.assertEqual(self.resumen()['abiertas_pendiente'], 1)
+        self.assertEqual(self.resumen()['tareas_completadas'], 1)
+
+    def test_borrar(self):
+        self.tarea.delete()
+        self.assertEqual(self.contadores(self.proyecto), (0, 0, 0, 0))
+        self.assertEqual(self.resumen(self.proyecto)['abiertas_pendiente'], 0)
+        self.assertEqual(self.resumen()['abiertas_media'], 1)
+
+    def test_en_bloque(self):
+        Tarea.objects.filter(proyecto=self.proyecto).update(estado='completada')
+        self.assertEqual(self.contadores(self.proyecto), (1, 0, 0, 1))
+        Tarea.objects.all().delete()
+        self.assertEqual(self.contadores(self.proyecto), (0, 0, 0, 0))
+        self.assertEqual(self.contadores(self.otro), (0, 0, 0, 0))
+        self.assertEqual(self.resumen()['abiertas_pendiente'], 0)
+
+    def test_primera_fila_del_dia(self):
+        """Las filas que faltan se crean a partir de los niveles anteriores"""
+        ResumenDiario.objects.filter(proyecto=self.otro).delete()
+        self.tarea.proyecto = self.otro
+        self.tarea.save()
+        self.assertEqual(self.resumen(self.otro)['abiertas_pendiente'], 1)
+        self.assertEqual(self.resumen(self.proyecto)['abiertas_pendiente'], 0)
+
+
+class PlazasTests(TestCase):
+
+    NIVELES = {'pesado': {'coste': 1, 'concurrencia': 1, 'cola': 0, 'espera': 0, 'duracion_maxima': 60}}
+
+    def setUp(self):
+        cache.clear()
+
+    def test_liberar_solo_la_plaza_propia(self):
+        """Una plaza caducada y ocupada por otra petición no la libera la primera"""
+        with mock.patch.dict(admision.NIVELES, self.NIVELES):
+            primera = admision.admitir('pesado', 'usuario:1')
+            # La plaza caduca y la ocupa otra petición
+            cache.delete(primera.clave)
+            segunda = admision.admitir('pesado', 'usuario:2')
+            primera.liberar()
+            with self.assertRaises(admision.Rechazada):
+                admision.admitir('pesado', 'usuario:3')
+            segunda.liberar()
+            admision.admitir('pesado', 'usuario:3').liberar()
+
+    def test_liberar_dos_veces(self):
+        with mock.patch.dict(admision.NIVELES, self.NIVELES):
+            plaza = admision.admitir('pesado', 'usuario:1')
+            plaza.liberar()
+            otra = admision.admitir('pesado', 'usuario:2')
+            plaza.liberar()
+            self.assertIsNotNone(cache.get(otra.clave))
+
+
+class CacheCompartidaCheckTests(TestCase):
+
+    def test_avisa_con_cache_por_proceso(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            avisos = checks.cache_compartida(None)
+        self.assertEqual([aviso.id for aviso in avisos], ['proyectos.W001'])
+
+    def test_sin_aviso_con_cache_compartida(self):
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(checks.cache_compartida(None), [])
+
+
+class ContadorNotificacionesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = crear_usuario('usuario')
+        self.tarea = crear_tarea(crear_proyecto(crear_usuario('admin', role='admin')))
+
+    def notificar(self, total, usuario=None):
+        return Notificacion.objects.bulk_create([
+            Notificacion(usuario=usuario or self.usuario, tarea=self.tarea, mensaje=f'Aviso {numero}', tipo='asignacion')
+            for numero in range(total)
+        ])
+
+    def real(self):
+        return Notificacion.objects.filter(usuario=self.usuario, leida=False).count()
+
+    def test_altas_marcados_y_borrados(self):
+        Notificacion.objects.create(usuario=self.usuario, tarea=self.tarea, mensaje='Aviso', tipo='asignacion')
+        notificaciones = self.notificar(3)
+        self.notificar(2, usuario=crear_usuario('otro'))
+        self.assertEqual(no_leidas(self.usuario.pk), 4)
+
+        Notificacion.objects.filter(pk__in=[notificaciones[0].pk, notificaciones[1].pk]).update(leida=True)
+        self.assertEqual(no_leidas(self.usuario.pk), 2)
+        # Marcar otra vez las mismas no descuenta nada
+        Notificacion.objects.filter(pk=notificaciones[0].pk).update(leida=True)
+        self.assertEqual(no_leidas(self.usuario.pk), 2)
+
+        notificaciones[2].delete()
+        self.assertEqual(no_leidas(self.usuario.pk), self.real())
+        Notificacion.objects.filter(usuario=self.usuario).update(leida=False)
+        self.assertEqual(no_leidas(self.usuario.pk), 3)
+
+    def test_borrar_la_tarea(self):
+        self.notificar(2)
+        self.tarea.delete()
+        self.assertEqual(no_leidas(self.usuario.pk), 0)
+
+    def test_marcar_con_una_consulta_por_usuario(self):
+        self.notificar(5)
+        # UPDATE de las notificaciones y UPDATE del contador (más los usuarios afectados y el savepoint)
+        with self.assertNumQueries(5):
+            Notificacion.objects.filter(usuario=self.usuario).update(leida=True)
+        self.assertEqual(ContadorNotificaciones.objects.get(usuario=self.usuario).no_leidas, 0)
+
+    def test_bandeja_cacheada(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notificar(2)
+        self.assertEqual(bandeja(self.usuario.pk)['no_leidas'], 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(bandeja(self.usuario.pk)['recientes']), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            Notificacion.objects.filter(usuario=self.usuario).update(leida=True)
+        self.assertEqual(bandeja(self.usuario.pk), {'no_leidas': 0, 'recientes': []})
+
+
+class AdmisionMiddlewareTests(TestCase):
+
+    NIVELES = {
+        'ligero': {'coste': 1},
+        'medio': {'coste': 5},
+        'pesado': {'coste': 4, 'concurrencia': 1, 'duracion_maxima': 60},
+    }
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = crear_usuario('usuario')
+        self.client.force_login(self.usuario)
+        parches = (
+            mock.patch.dict(admision.NIVELES, self.NIVELES),
+            mock.patch.dict(admision.PRESUPUESTO, {'capacidad': 10, 'recarga': 1}),
+        )
+        for parche in parches:
+            parche.start()
+            self.addCleanup(parche.stop)
+
+    def test_presupuesto_agotado(self):
+        # Dos informes (4 + 4) caben en 10 fichas; el tercero no
+        for _ in range(2):
+            self.assertNotEqual(self.client.get('/reportes/tareas/excel/').status_code, 429)
+        respuesta = self.client.get('/reportes/tareas/excel/')
+        self.assertEqual(respuesta.status_code, 429)
+        self.assertGreaterEqual(int(respuesta['Retry-After']), 1)
+        self.assertEqual(admision.metricas()['pesado']['sin_presupuesto'], 1)
+
+    def test_sin_plaza(self):
+        ocupada = admision.admitir('pesado', 'usuario:otro')
+        respuesta = self.client.get('/reportes/tareas/excel/')
+        self.assertEqual(respuesta.status_code, 429)
+        self.assertEqual(admision.metricas()['pesado']['rechazadas'], 1)
+        ocupada.liberar()
+        self.assertEqual(self.client.get('/reportes/tareas/excel/').status_code, 200)
+        # La respuesta ya ha devuelto su plaza
+        admision.admitir('pesado', 'usuario:otro').liberar()
+
+    def test_api_responde_json(self):
+        admision.gastar(f'usuario:{self.usuario.pk}', 10)
+        respuesta = self.client.get('/api/tareas/')
+        self.assertEqual(respuesta.status_code, 429)
+        self.assertIn('detail', respuesta.json())
+
+
+class VencimientosTests(TestCase):
+
+    def setUp(self):
+        self.usuario = crear_usuario('usuario')
+        proyecto = crear_proyecto(crear_usuario('admin', role='admin'))
+        hoy = timezone.localdate()
+        self.tareas = [
+            crear_tarea(proyecto, asignado_a=self.usuario, titulo=f'Tarea {dias}', fecha_limite=hoy + timedelta(days=dias))
+            for dias in (0, 1, 2, 10)
+        ]
+        # Completadas y sin asignar no se avisan
+        crear_tarea(proyecto, asignado_a=self.usuario, fecha_limite=hoy, estado='completada')
+        crear_tarea(proyecto, fecha_limite=hoy)
+
+    def avisos(self):
+        return Notificacion.objects.filter(tipo='vencimiento').count()
+
+    def test_volver_a_ejecutar_no_duplica(self):
+        self.assertEqual(notificar_vencimientos(dias=3, tamano_lote=2), (3, 3))
+        self.assertEqual(notificar_vencimientos(dias=3, tamano_lote=2), (3, 0))
+        self.assertEqual(self.avisos(), 3)
+        self.assertEqual(no_leidas(self.usuario.pk), 3)
+
+    def test_nueva_fecha_limite_vuelve_a_avisar(self):
+        notificar_vencimientos(dias=3)
+        tarea = self.tareas[1]
+        tarea.fecha_limite += timedelta(days=1)
+        tarea.save()
+        self.assertEqual(notificar_vencimientos(dias=3), (3, 1))
+        self.assertEqual(self.avisos(), 4)
+
+    def test_cuenta_solo_las_filas_insertadas(self):
+        """Las filas que el INSERT salta por conflicto no cuentan como creadas"""
+        escribir = vencimientos.escribir
+
+        def con_conflicto(filas, **kwargs):
+            # ignore_conflicts salta la primera, como si otra ejecución la hubiera insertado
+            escribir(filas[1:], **kwargs)
+
+        with mock.patch.object(vencimientos, 'escribir', con_conflicto):
+            self.assertEqual(notificar_vencimientos(dias=3), (3, 2))
+        self.assertEqual(self.avisos(), 2)
+
+
+class ImportacionTests(TestCase):
+    """Importación de tareas: las filas válidas se crean y las demás se informan con su número"""
+
+    CABECERA = 'titulo;descripcion;proyecto;asignado_a;estado;prioridad;fecha_limite\n'
+
+    def setUp(self):
+        self.admin = crear_usuario('admin', role='admin')
+        self.miembro = crear_usuario('miembro')
+        self.proyecto = crear_proyecto(self.admin, nombre='Web')
+        self.acotado = crear_proyecto(self.admin, nombre='Acotado', fecha_fin=date(2030, 6, 30))
+        crear_proyecto(self.admin, nombre='Repetido')
+        crear_proyecto(self.admin, nombre='Repetido')
+
+    def csv(self, *filas):
+        return io.BytesIO((self.CABECERA + ''.join(fila + '\n' for fila in filas)).encode())
+
+    def importar(self, archivo, nombre='tareas.csv', **kwargs):
+        return ImportadorTareas(self.admin, **kwargs).importar(archivo, nombre)
+
+    def test_errores_por_fila(self):
+        resultado = self.importar(self.csv(
+            'Portada;Maquetar;Web;miembro;En Progreso;alta;2030-01-10',
+            ';Sin título;Web;;;;2030-01-10',
+            'Otra;Sin proyecto;No existe;;;;2030-01-10',
+            'Otra;Usuario;Web;nadie;;;2030-01-10',
+            'Otra;Estado;Web;;cerrada;urgente;2030-01-10',
+            'Otra;Pasada;Web;;;;2020-01-10',
+            'Otra;Fuera del proyecto;Acotado;;;;2030-12-01',
+            'Otra;Nombre repetido;Repetido;;;;2030-01-10',
+            'Otra;Sin fecha;Web;;;;mañana',
+            f'Fondo;Por id;{self.acotado.pk};;;;10/01/2030',
+        ))
+
+        self.assertEqual((resultado['filas'], resultado['creadas'], resultado['con_errores']), (10, 2, 8))
+        errores = {error['fila']: error['errores'] for error in resultado['errores']}
+        self.assertEqual(sorted(errores), [3, 4, 5, 6, 7, 8, 9, 10])
+        self.assertEqual(errores[3], ['El título es obligatorio'])
+        self.assertEqual(errores[4], ["Proyecto no encontrado: 'No existe'"])
+        self.assertEqual(errores[5], ["Usuario no encontrado: 'nadie'"])
+        self.assertEqual(errores[6], ["Estado no válido: 'cerrada'", "Prioridad no válida: 'urgente'"])
+        self.assertEqual(errores[7], ['La fecha límite no puede ser en el pasado'])
+        self.assertEqual(errores[8], ['La fecha límite no puede ser posterior al fin del proyecto'])
+        self.assertEqual(errores[9], ["Proyecto no encontrado: 'Repetido'"])
+        self.assertEqual(errores[10], ['La fecha límite es obligatoria (AAAA-MM-DD o DD/MM/AAAA)'])
+
+        portada = Tarea.objects.get(titulo='Portada')
+        self.assertEqual(
+            (portada.proyecto_id, portada.asignado_a_id, portada.estado, portada.prioridad, portada.creado_por_id),
+            (self.proyecto.pk, self.miembro.pk, 'en_progreso', 'alta', self.admin.pk),
+        )
+        fondo = Tarea.objects.get(titulo='Fondo')
+        self.assertEqual((fondo.proyecto_id, fondo.fecha_limite), (self.acotado.pk, date(2030, 1, 10)))
+
+    def test_en_bloques_y_errores_limitados(self):
+        filas = [f'Tarea {numero};Descripción;Web;;;;2030-01-10' for numero in range(5)]
+        filas += ['Mala;Descripción;No existe;;;;2030-01-10'] * 3
+        with mock.patch('proyectos.importacion.crear_tareas', wraps=lotes.crear_tareas) as crear:
+            resultado = self.importar(self.csv(*filas), tamano_lote=2, max_errores=2)
+        self.assertEqual([len(llamada.args[0]) for llamada in crear.call_args_list], [2, 2, 1])
+        self.assertEqual((resultado['creadas'], resultado['con_errores'], len(resultado['errores'])), (5, 3, 2))
+        self.assertEqual(Tarea.objects.filter(proyecto=self.proyecto).count(), 5)
+
+    def test_excel(self):
+        libro = openpyxl.Workbook()
+        hoja = libro.active
+        hoja.append(['Titulo', 'Descripcion', 'Proyecto', 'Asignado_a', 'Estado', 'Prioridad', 'Fecha_limite'])
+        hoja.append(['Portada', 'Maquetar', 'web', 'miembro', None, None, date(2030, 1, 10)])
+        hoja.append([None] * 7)
+        hoja.append(['Otra', 'Id como número', float(self.proyecto.pk), None, 'completada', 'baja', '2030-01-11'])
+        hoja.append(['Mala', None, 'Web', None, None, None, date(2030, 1, 12)])
+        archivo = io.BytesIO()
+        libro.save(archivo)
+        archivo.seek(0)
+
+        resultado = self.importar(archivo, 'tareas.xlsx')
+
+        self.assertEqual((resultado['filas'], resultado['creadas'], resultado['con_errores']), (3, 2, 1))
+        self.assertEqual(resultado['errores'], [{'fila': 5, 'errores': ['La descripción es obligatoria']}])
+        self.assertEqual(Tarea.objects.get(titulo='Otra').estado, 'completada')
+
+    def test_comando(self):
+        with tempfile.NamedTemporaryFile('wb', suffix='.csv', delete=False) as archivo:
+            archivo.write(self.csv('Portada;Maquetar;Web;;;;2030-01-10', 'Mala;;Web;;;;2030-01-10').getvalue())
+        self.addCleanup(os.remove, archivo.name)
+        salida, errores = io.StringIO(), io.StringIO()
+
+        call_command('importar_tareas', archivo.name, usuario='admin', stdout=salida, stderr=errores)
+
+        self.assertIn('2 filas leídas, 1 tareas creadas, 1 filas con errores', salida.getvalue())
+        self.assertIn('Fila 3: La descripción es obligatoria', errores.getvalue())
+        self.assertTrue(Tarea.objects.filter(titulo='Portada').exists())
+
+    @SIN_MANIFEST
+    def test_vista(self):
+        archivo = SimpleUploadedFile('tareas.csv', self.csv('Portada;Maquetar;Web;;;;2030-01-10').getvalue())
+        self.client.force_login(self.admin)
+        respuesta = self.client.post('/proyectos/tareas/importar/', {'archivo': archivo})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.context['resultado']['creadas'], 1)
+        self.assertTrue(Tarea.objects.filter(titulo='Portada', creado_por=self.admin).exists())
+
+
+class NotificacionesSSETests(TransactionTestCase):
+    """Stream SSE: autenticación por la cookie de sesión y entrega de las notificaciones"""
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = crear_usuario('usuario')
+        self.tarea = crear_tarea(crear_proyecto(crear_usuario('admin', role='admin')))
+        self.client.force_login(self.usuario)
+        self.sesion = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+
+    def notificar(self, mensaje='Aviso'):
+        return Notificacion.objects.create(usuario=self.usuario, tarea=self.tarea, mensaje=mensaje, tipo='asignacion')
+
+    async def abrir(self, sesion=None, host='testserver', cabeceras=()):
+        """Lanza la aplicación ASGI; devuelve (tarea, mensajes enviados, cola de entrada)"""
+        cabeceras = [(b'host', host.encode()), *cabeceras]
+        if sesion:
+            cabeceras.append((b'cookie', f'{settings.SESSION_COOKIE_NAME}={sesion}'.encode()))
+        scope = {'type': 'http', 'path': RUTA_SSE, 'headers': cabeceras, 'query_string': b''}
+        enviados, entrada = asyncio.Queue(), asyncio.Queue()
+        tarea = asyncio.ensure_future(NotificacionesSSE()(scope, entrada.get, enviados.put))
+        return tarea, enviados, entrada
+
+    async def siguiente(self, enviados):
+        return await asyncio.wait_for(enviados.get(), 5)
+
+    async def evento(self, enviados):
+        """(nombre, id, datos) del siguiente evento, saltando retry y keep-alive"""
+        while True:
+            cuerpo = (await self.siguiente(enviados))['body'].decode()
+            if cuerpo.startswith('event:'):
+                lineas = dict(linea.split(': ', 1) for linea in cuerpo.strip().split('\n'))
+                return lineas['event'], lineas.get('id'), json.loads(lineas['data'])
+
+    async def cerrar(self, tarea, entrada):
+        await entrada.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(tarea, 5)
+
+    async def test_sin_sesion(self):
+        for sesion in (None, 'no-existe'):
+            with self.subTest(sesion=sesion):
+                tarea, enviados, _ = await self.abrir(sesion)
+                self.assertEqual((await self.siguiente(enviados))['status'], 401)
+                await asyncio.wait_for(tarea, 5)
+
+    async def test_host_no_permitido(self):
+        tarea, enviados, _ = await self.abrir(self.sesion, host='otro.example')
+        self.assertEqual((await self.siguiente(enviados))['status'], 400)
+        await asyncio.wait_for(tarea, 5)
+
+    async def test_entrega_al_confirmar(self):
+        anterior = await sync_to_async(self.notificar)('Anterior')
+        tarea, enviados, entrada = await self.abrir(self.sesion)
+        inicio = await self.siguiente(enviados)
+        self.assertEqual(inicio['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream; charset=utf-8'), inicio['headers'])
+        # Sin Last-Event-ID solo llegan las posteriores a la conexión
+        self.assertEqual(await self.evento(enviados), ('no_leidas', str(anterior.pk), {'total': 1}))
+
+        # El aviso del difusor despierta la conexión sin esperar al INTERVALO
+        nueva = await sync_to_async(self.notificar)('Nueva')
+        nombre, id, datos = await self.evento(enviados)
+        self.assertEqual((nombre, id, datos['mensaje']), ('notificacion', str(nueva.pk), 'Nueva'))
+        self.assertEqual(await self.evento(enviados), ('no_leidas', str(nueva.pk), {'total': 2}))
+
+        await self.cerrar(tarea, entrada)
+        self.assertFalse(difusor._suscripciones)
+
+    async def test_reconexion_con_last_event_id(self):
+        primera = await sync_to_async(self.notificar)('Primera')
+        segunda = await sync_to_async(self.notificar)('Segunda')
+        tarea, enviados, entrada = await self.abrir(self.sesion, cabeceras=[(b'last-event-id', str(primera.pk).encode())])
+        self.assertEqual((await self.siguiente(enviados))['status'], 200)
+        nombre, id, datos = await self.evento(enviados)
+        self.assertEqual((nombre, id, datos['mensaje']), ('notificacion', str(segunda.pk), 'Segunda'))
+        self.assertEqual(await self.evento(enviados), ('no_leidas', str(segunda.pk), {'total': 2}))
+        await self.cerrar(tarea, entrada)
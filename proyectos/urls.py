@@ -15,6 +15,7 @@ urlpatterns = [
     path('tareas/', views.TareaListView.as_view(), name='tarea_list'),
     path('tarea/<int:pk>/', views.TareaDetailView.as_view(), name='tarea_detail'),
     path('tarea/nueva/', views.TareaCreateView.as_view(), name='tarea_create'),
+    path('tareas/importar/', views.TareaImportView.as_view(), name='tarea_import'),
     path('tarea/<int:pk>/editar/', views.TareaUpdateView.as_view(), name='tarea_update'),
     path('tarea/<int:pk>/eliminar/', views.TareaDeleteView.as_view(), name='tarea_delete'),
     path('tarea/<int:tarea_id>/comentar/', views.agregar_comentario, name='agregar_comentario'),
@@ -0,0 +1,79 @@
+"""
+Avisos de tareas próximas a vencer.
+
+Recorre solo las tareas abiertas cuya fecha límite cae dentro de la ventana
+(consulta por rango que usa el índice parcial tarea_abiertas_limite_idx), en
+bloques, y crea los avisos que falten con bulk_create. Cada aviso guarda la
+fecha límite notificada, así que volver a ejecutarlo no duplica avisos y una
+tarea cuya fecha límite cambia vuelve a avisarse. Los avisos creados se cuentan
+volviendo a consultar el bloque: bulk_create con ignore_conflicts no dice qué
+filas insertó.
+"""
+from datetime import timedelta
+from itertools import islice
+
+from django.utils import timezone
+
+from .models import Tarea, Notificacion
+from .registro import escribir
+
+
+def _bloques(iterable, tamano):
+    iterador = iter(iterable)
+    while bloque := list(islice(iterador, tamano)):
+        yield bloque
+
+
+def mensaje_vencimiento(titulo, fecha_limite, hoy):
+    dias = (fecha_limite - hoy).days
+    if dias == 0:
+        return f"La tarea '{titulo}' vence hoy"
+    if dias == 1:
+        return f"La tarea '{titulo}' vence mañana"
+    return f"La tarea '{titulo}' vence en {dias} días ({fecha_limite.strftime('%d/%m/%Y')})"
+
+
+def _avisadas(bloque):
+    """(tarea_id, usuario_id, fecha_limite) de los avisos de vencimiento del bloque"""
+    return set(Notificacion.objects.filter(
+        tipo='vencimiento',
+        tarea_id__in=[pk for pk, _, _, _ in bloque],
+    ).values_list('tarea_id', 'usuario_id', 'fecha_limite'))
+
+
+def notificar_vencimientos(dias=3, tamano_lote=500):
+    """
+    Crea los avisos de 'vencimiento' de las tareas abiertas que vencen entre hoy
+    y dentro de `dias` días. Devuelve (tareas revisadas, avisos creados); si
+    otra ejecución crea a la vez los mismos avisos, ambas pueden contarlos.
+    """
+    hoy = timezone.now().date()
+    tareas = Tarea.objects.exclude(estado='completada').filter(
+        fecha_limite__gte=hoy,
+        fecha_limite__lte=hoy + timedelta(days=dias),
+        asignado_a__isnull=False,
+    ).order_by('fecha_limite', 'pk').values_list('pk', 'titulo', 'asignado_a_id', 'fecha_limite')
+
+    revisadas = creadas = 0
+    for bloque in _bloques(tareas.iterator(chunk_size=tamano_lote), tamano_lote):
+        revisadas += len(bloque)
+        avisadas = _avisadas(bloque)
+
+        nuevas = [
+            Notificacion(
+                usuario_id=usuario_id,
+                tarea_id=pk,
+                mensaje=mensaje_vencimiento(titulo, fecha_limite, hoy),
+                tipo='vencimiento',
+                fecha_limite=fecha_limite,
+            )
+            for pk, titulo, usuario_id, fecha_limite in bloque
+            if (pk, usuario_id, fecha_limite) not in avisadas
+        ]
+        if nuevas:
+            # ignore_conflicts cubre otra ejecución concurrente (restricción notif_vencimiento_unico)
+            escribir(nuevas, ignore_conflicts=True)
+            # Solo cuentan los avisos que no existían al consultar el bloque
+            creadas += len(_avisadas(bloque) - avisadas)
+
+    return revisadas, creadas
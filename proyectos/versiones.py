@@ -0,0 +1,88 @@
+"""
+Versiones de los datos cacheados (instantáneas del panel y similares).
+
+Cada instantánea se guarda bajo una clave que incluye la versión de los datos
+de los que depende. Invalidar consiste en incrementar la versión: las claves
+antiguas dejan de leerse y caducan solas. El incremento se hace al confirmar
+la transacción, para que nadie guarde en caché datos anteriores al cambio
+bajo la versión nueva.
+
+- 'global': proyectos y tareas (incluido lo que afecta a las cifras de cada usuario)
+- 'usuario:<id>': notificaciones del usuario
+
+Dentro de versiones_de_peticion() cada versión se lee de la caché una sola vez
+(las subpeticiones de /api/batch/ comparten así las lecturas); un incremento
+en el bloque la descarta para que la siguiente lectura vea la nueva.
+"""
+import time
+from contextlib import contextmanager
+
+from asgiref.local import Local
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+
+_memoria = Local()
+
+
+def _clave(nombre):
+    return f'version:{nombre}'
+
+
+def _inicial():
+    # Si la versión se pierde (caché reiniciada o desalojada) no se reutilizan números antiguos
+    return time.time_ns()
+
+
+def versiones(*nombres):
+    """Versión actual de cada nombre, en el mismo orden y con una sola lectura"""
+    memoria = getattr(_memoria, 'versiones', None)
+    if memoria is not None and all(nombre in memoria for nombre in nombres):
+        return [memoria[nombre] for nombre in nombres]
+
+    claves = [_clave(nombre) for nombre in nombres]
+    actuales = cache.get_many(claves)
+    faltan = {clave: _inicial() for clave in claves if clave not in actuales}
+    for clave, valor in faltan.items():
+        if not cache.add(clave, valor, timeout=None):
+            faltan[clave] = cache.get(clave, valor)
+    actuales.update(faltan)
+    resultado = [actuales[clave] for clave in claves]
+    if memoria is not None:
+        memoria.update(zip(nombres, resultado))
+    return resultado
+
+
+@contextmanager
+def versiones_de_peticion():
+    """Memoriza las versiones leídas dentro del bloque"""
+    anterior = getattr(_memoria, 'versiones', None)
+    _memoria.versiones = {} if anterior is None else anterior
+    try:
+        yield
+    finally:
+        _memoria.versiones = anterior
+
+
+def _incrementar(nombres):
+    memoria = getattr(_memoria, 'versiones', None)
+    for nombre in nombres:
+        if memoria is not None:
+            memoria.pop(nombre, None)
+        try:
+            cache.incr(_clave(nombre))
+        except ValueError:
+            cache.set(_clave(nombre), _inicial(), timeout=None)
+
+
+def invalidar(*nombres, using=DEFAULT_DB_ALIAS):
+    if nombres:
+        transaction.on_commit(lambda: _incrementar(nombres), using=using)
+
+
+def invalidar_global(using=DEFAULT_DB_ALIAS):
+    invalidar('global', using=using)
+
+
+def invalidar_usuarios(usuarios_ids, using=DEFAULT_DB_ALIAS):
+    invalidar(*(f'usuario:{pk}' for pk in set(usuarios_ids) if pk), using=using)
@@ -2,13 +2,15 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
+from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, FormView
 from django.urls import reverse_lazy
-from django.db.models import Q
 from django.http import HttpResponseForbidden
 
 from .models import Proyecto, Tarea, Comentario, Historial
-from .forms import ProyectoForm, TareaForm, TareaMemberForm, ComentarioForm, BusquedaAvanzadaForm
+from .busqueda import LIMITE, clasificar, por_rango, resaltar_objetos
+from .forms import ProyectoForm, TareaForm, TareaMemberForm, ComentarioForm, BusquedaAvanzadaForm, ImportarTareasForm
+from .importacion import ImportadorTareas
+from .visibilidad import filtrar_visibles
 
 
 # ============ MIXINS DE PERMISOS ============
@@ -45,7 +47,21 @@ class TareaOwnerOrAdminMixin(UserPassesTestMixin):
 
 # ============ VISTAS DE PROYECTOS ============
 
-class ProyectoListView(LoginRequiredMixin, ListView):
+class BusquedaMixin:
+    """
+    Listas con ?busqueda=: los resultados más relevantes del índice, y si el
+    tope de resultados dejó fuera coincidencias (busqueda_truncada)
+    """
+    limite_busqueda = LIMITE
+    busqueda_truncada = False
+
+    def _buscar(self, queryset, texto):
+        clasificacion = clasificar(queryset, texto, self.limite_busqueda)
+        self.busqueda_truncada = clasificacion.truncada
+        return por_rango(queryset, clasificacion.pks)
+
+
+class ProyectoListView(LoginRequiredMixin, BusquedaMixin, ListView):
     """
     Lista de proyectos
     """
@@ -58,22 +74,27 @@ class ProyectoListView(LoginRequiredMixin, ListView):
         queryset = super().get_queryset()
         user = self.request.user
         
-        # Members solo ven proyectos donde tienen tareas asignadas
-        if user.role == 'member':
-            # Obtener IDs de proyectos donde el usuario tiene tareas asignadas
-            proyectos_ids = Tarea.objects.filter(asignado_a=user).values_list('proyecto_id', flat=True).distinct()
-            queryset = queryset.filter(id__in=proyectos_ids)
+        # Members solo ven los proyectos que crearon, de los que son miembros
+        # o donde tienen tareas asignadas (ver visibilidad.py)
+        queryset = filtrar_visibles(queryset, user)
         
         # Admins ven todos
         busqueda = self.request.GET.get('busqueda', '')
         
-        if busqueda:
-            queryset = queryset.filter(
-                Q(nombre__icontains=busqueda) | 
-                Q(descripcion__icontains=busqueda)
-            )
+        # Con búsqueda, los más relevantes primero
+        if busqueda.strip():
+            return self._buscar(queryset, busqueda)
         
         return queryset.order_by('-fecha_inicio')
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        busqueda = self.request.GET.get('busqueda', '')
+        if busqueda.strip():
+            context['proyectos'] = resaltar_objetos(context['proyectos'], busqueda)
+        context['busqueda_truncada'] = self.busqueda_truncada
+        context['limite_busqueda'] = self.limite_busqueda
+        return context
 
 
 class ProyectoDetailView(LoginRequiredMixin, DetailView):
@@ -148,7 +169,7 @@ class ProyectoDeleteView(LoginRequiredMixin, AdminRequiredMixin, DeleteView):
 
 # ============ VISTAS DE TAREAS ============
 
-class TareaListView(LoginRequiredMixin, ListView):
+class TareaListView(LoginRequiredMixin, BusquedaMixin, ListView):
     """
     Lista de tareas con filtros avanzados
     """
@@ -173,12 +194,6 @@ class TareaListView(LoginRequiredMixin, ListView):
         fecha_desde = self.request.GET.get('fecha_desde', '')
         fecha_hasta = self.request.GET.get('fecha_hasta', '')
         
-        if busqueda:
-            queryset = queryset.filter(
-                Q(titulo__icontains=busqueda) | 
-                Q(descripcion__icontains=busqueda)
-            )
-        
         if proyecto:
             queryset = queryset.filter(proyecto_id=proyecto)
         
@@ -194,11 +209,20 @@ class TareaListView(LoginRequiredMixin, ListView):
         if fecha_hasta:
             queryset = queryset.filter(fecha_limite__lte=fecha_hasta)
         
+        # La búsqueda va al final: los más relevantes entre las tareas ya filtradas
+        if busqueda.strip():
+            return self._buscar(queryset, busqueda)
+        
         return queryset.order_by('-fecha_creacion')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['form'] = BusquedaAvanzadaForm(self.request.GET or None)
+        busqueda = self.request.GET.get('busqueda', '')
+        if busqueda.strip():
+            context['tareas'] = resaltar_objetos(context['tareas'], busqueda)
+        context['busqueda_truncada'] = self.busqueda_truncada
+        context['limite_busqueda'] = self.limite_busqueda
         return context
 
 
@@ -284,6 +308,25 @@ class TareaDeleteView(LoginRequiredMixin, AdminRequiredMixin, DeleteView):
         return super().delete(request, *args, **kwargs)
 
 
+class TareaImportView(LoginRequiredMixin, AdminRequiredMixin, FormView):
+    """
+    Importar tareas desde un archivo CSV o Excel - SOLO ADMINS
+    """
+    form_class = ImportarTareasForm
+    template_name = 'proyectos/tarea_import.html'
+    
+    def form_valid(self, form):
+        archivo = form.cleaned_data['archivo']
+        resultado = ImportadorTareas(self.request.user).importar(archivo, archivo.name)
+        
+        if resultado['creadas']:
+            messages.success(self.request, f"{resultado['creadas']} tareas importadas exitosamente")
+        if resultado['con_errores']:
+            messages.warning(self.request, f"{resultado['con_errores']} filas no se importaron por errores")
+        
+        return self.render_to_response(self.get_context_data(form=form, resultado=resultado))
+
+
 # ============ VISTA PARA AGREGAR COMENTARIOS ============
 
 @login_required
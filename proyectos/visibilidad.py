@@ -0,0 +1,165 @@
+"""
+Proyectos visibles de cada usuario.
+
+Un usuario ve un proyecto si lo creó, es miembro o tiene alguna tarea asignada
+en él. ProyectoVisible guarda esos pares (usuario, proyecto) y se mantiene al
+cambiar el proyecto o la asignación de las tareas, el creador de los proyectos
+y sus miembros: los pares nuevos se insertan y los que pueden haber dejado de
+valer se comprueban contra las tres relaciones. Los ids de cada usuario se
+guardan en caché y se borran al cambiar sus pares.
+
+La sincronización (sincronizacion.py) sigue la misma tabla: un proyecto que
+alguien empieza a ver cambia de fecha de actualización, para que le llegue en
+su siguiente sincronización, y uno que deja de ver le deja una lápida propia.
+
+Los filtros de los members usan esa lista (pk__in=[...]) en lugar de
+subconsultas con distinct() sobre sus tareas o sus proyectos.
+
+Los update() en bloque de creado_por no se siguen: reconstruir_visibles rehace
+la tabla desde cero.
+"""
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Eliminacion, Proyecto, ProyectoVisible, Tarea
+
+
+# Los cambios ya invalidan; la caducidad solo limita lo que no se sigue
+TIEMPO_CACHE = 60 * 60
+
+
+def _clave(usuario_id):
+    return f'visibles:{usuario_id}'
+
+
+def _invalidar(usuarios_ids, using):
+    """Borra los ids cacheados, ahora y al confirmar la transacción"""
+    claves = [_clave(pk) for pk in usuarios_ids]
+    if claves:
+        cache.delete_many(claves)
+        transaction.on_commit(lambda: cache.delete_many(claves), using=using)
+
+
+def _condicion(pares, usuario='usuario_id', proyecto='proyecto_id'):
+    condicion = Q()
+    for usuario_id, proyecto_id in pares:
+        condicion |= Q(**{usuario: usuario_id, proyecto: proyecto_id})
+    return condicion
+
+
+def proyectos_visibles(usuario):
+    """Ids de los proyectos que ve el usuario"""
+    clave = _clave(usuario.pk)
+    ids = cache.get(clave)
+    if ids is None:
+        ids = list(ProyectoVisible.objects.filter(usuario_id=usuario.pk).values_list('proyecto_id', flat=True))
+        cache.set(clave, ids, TIEMPO_CACHE)
+    return ids
+
+
+def filtrar_visibles(queryset, usuario, campo='pk'):
+    """Deja en el queryset de un member solo sus proyectos visibles; `campo` lleva el id del proyecto"""
+    if getattr(usuario, 'role', None) != 'member':
+        return queryset
+    return queryset.filter(**{f'{campo}__in': proyectos_visibles(usuario)})
+
+
+def anadir(pares, using=DEFAULT_DB_ALIAS, actualizar=True):
+    """
+    Pares (usuario_id, proyecto_id) que pasan a ser visibles. Si `actualizar`,
+    los proyectos de los pares que no existían cambian de fecha.
+    """
+    pares = {(usuario_id, proyecto_id) for usuario_id, proyecto_id in pares if usuario_id is not None}
+    if not pares:
+        return
+    pares -= set(
+        ProyectoVisible.objects.using(using).filter(_condicion(pares)).values_list('usuario_id', 'proyecto_id')
+    )
+    if not pares:
+        return
+    ProyectoVisible.objects.using(using).bulk_create([
+        ProyectoVisible(usuario_id=usuario_id, proyecto_id=proyecto_id)
+        for usuario_id, proyecto_id in pares
+    ], ignore_conflicts=True)
+    if actualizar:
+        Proyecto.objects.using(using).filter(
+            pk__in={proyecto_id for _, proyecto_id in pares}
+        ).update(fecha_actualizacion=timezone.now())
+    _invalidar({usuario_id for usuario_id, _ in pares}, using)
+
+
+def revisar(pares, using=DEFAULT_DB_ALIAS):
+    """
+    Quita los pares (usuario_id, proyecto_id) que ya no tienen creador, miembro
+    ni tarea asignada, con una lápida del proyecto para cada usuario. Devuelve
+    los pares quitados.
+    """
+    pares = {(usuario_id, proyecto_id) for usuario_id, proyecto_id in pares if usuario_id is not None}
+    if not pares:
+        return set()
+    usuarios_ids = {usuario_id for usuario_id, _ in pares}
+    proyectos_ids = {proyecto_id for _, proyecto_id in pares}
+    siguen = set(
+        Proyecto.objects.using(using).filter(pk__in=proyectos_ids, creado_por_id__in=usuarios_ids)
+        .values_list('creado_por_id', 'pk')
+    )
+    siguen.update(
+        Proyecto.miembros.through.objects.using(using).filter(proyecto_id__in=proyectos_ids, user_id__in=usuarios_ids)
+        .values_list('user_id', 'proyecto_id')
+    )
+    pendientes = pares - siguen
+    if pendientes:
+        siguen.update(
+            Tarea.objects.using(using).filter(_condicion(pendientes, usuario='asignado_a_id')).order_by()
+            .values_list('asignado_a_id', 'proyecto_id').distinct()
+        )
+    quitar = pares - siguen
+    if not quitar:
+        return set()
+    # Solo los pares que estaban en la tabla: los demás no se veían
+    filas = list(
+        ProyectoVisible.objects.using(using).filter(_condicion(quitar)).values_list('pk', 'usuario_id', 'proyecto_id')
+    )
+    quitados = {(usuario_id, proyecto_id) for _, usuario_id, proyecto_id in filas}
+    if quitados:
+        ProyectoVisible.objects.using(using).filter(pk__in=[pk for pk, _, _ in filas]).delete()
+        ahora = timezone.now()
+        Eliminacion.objects.using(using).bulk_create([
+            Eliminacion(modelo='proyecto', objeto_id=proyecto_id, usuario_id=usuario_id, fecha=ahora)
+            for usuario_id, proyecto_id in quitados
+        ])
+        _invalidar({usuario_id for usuario_id, _ in quitados}, using)
+    return quitados
+
+
+def cambios_tareas(antes, despues, using=DEFAULT_DB_ALIAS):
+    """
+    Pares afectados al cambiar el proyecto o la asignación de tareas, con
+    `antes` y `despues` como en sincronizacion.cambios_alcance(). Devuelve
+    los pares quitados.
+    """
+    pares_antes = {(asignado_id, proyecto_id) for proyecto_id, asignado_id in antes.values()}
+    pares_despues = {(asignado_id, proyecto_id) for proyecto_id, asignado_id in despues.values()}
+    anadir(pares_despues - pares_antes, using=using)
+    return revisar(pares_antes - pares_despues, using=using)
+
+
+def reconstruir(using=DEFAULT_DB_ALIAS):
+    """Rehace la tabla desde el creador, los miembros y las tareas. Devuelve el total de pares."""
+    pares = set(Proyecto.objects.using(using).values_list('creado_por_id', 'pk'))
+    pares.update(Proyecto.miembros.through.objects.using(using).values_list('user_id', 'proyecto_id'))
+    pares.update(
+        Tarea.objects.using(using).filter(asignado_a__isnull=False).order_by()
+        .values_list('asignado_a_id', 'proyecto_id').distinct()
+    )
+    with transaction.atomic(using=using):
+        usuarios_ids = set(ProyectoVisible.objects.using(using).values_list('usuario_id', flat=True).distinct())
+        ProyectoVisible.objects.using(using).all().delete()
+        ProyectoVisible.objects.using(using).bulk_create([
+            ProyectoVisible(usuario_id=usuario_id, proyecto_id=proyecto_id)
+            for usuario_id, proyecto_id in pares
+        ], batch_size=1000)
+        _invalidar(usuarios_ids | {usuario_id for usuario_id, _ in pares}, using)
+    return len(pares)
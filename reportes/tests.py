@@ -1,3 +1,74 @@
+from datetime import date
+from io import BytesIO
+
+import openpyxl
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from proyectos.pruebas import SIN_MANIFEST, crear_proyecto, crear_tarea, crear_usuario
+
+
+@SIN_MANIFEST
+class VisibilidadReportesTests(TestCase):
+    """Los members solo ven en los reportes sus proyectos visibles"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = crear_usuario('admin', role='admin')
+        self.miembro = crear_usuario('miembro')
+        self.visible = self.crear_proyecto('Visible')
+        self.visible.miembros.add(self.miembro)
+        self.ajeno = self.crear_proyecto('Ajeno')
+        # Una tarea asignada basta para ver su proyecto
+        self.asignado = self.crear_proyecto('Asignado')
+        for proyecto in (self.visible, self.ajeno):
+            self.crear_tarea(proyecto)
+        self.crear_tarea(self.asignado, asignado_a=self.miembro)
+
+    def crear_proyecto(self, nombre):
+        # El reporte general escribe la fecha de fin
+        return crear_proyecto(self.admin, nombre=nombre, fecha_fin=date(2026, 12, 31))
+
+    def crear_tarea(self, proyecto, asignado_a=None):
+        return crear_tarea(proyecto, asignado_a=asignado_a, titulo=f'Tarea de {proyecto.nombre}')
+
+    def libro(self, url):
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return openpyxl.load_workbook(BytesIO(respuesta.content))
+
+    def columna(self, hoja, indice):
+        return sorted(fila[indice] for fila in hoja.iter_rows(min_row=2, values_only=True))
+
+    def test_index(self):
+        self.client.force_login(self.miembro)
+        respuesta = self.client.get('/reportes/')
+        self.assertEqual(
+            sorted(proyecto.nombre for proyecto in respuesta.context['proyectos']), ['Asignado', 'Visible']
+        )
+
+    def test_pdf_de_un_proyecto_ajeno(self):
+        self.client.force_login(self.miembro)
+        self.assertEqual(self.client.get(f'/reportes/proyecto/{self.ajeno.pk}/pdf/').status_code, 404)
+        respuesta = self.client.get(f'/reportes/proyecto/{self.visible.pk}/pdf/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Content-Type'], 'application/pdf')
+
+    def test_excel_de_tareas(self):
+        self.client.force_login(self.miembro)
+        hoja = self.libro('/reportes/tareas/excel/').active
+        self.assertEqual(self.columna(hoja, 2), ['Asignado', 'Visible'])
+        # El filtro por proyecto no salta la visibilidad
+        hoja = self.libro(f'/reportes/tareas/excel/?proyecto={self.ajeno.pk}').active
+        self.assertEqual(self.columna(hoja, 2), [])
+
+    def test_excel_general(self):
+        self.client.force_login(self.miembro)
+        libro = self.libro('/reportes/general/excel/')
+        self.assertEqual(self.columna(libro['Proyectos'], 1), ['Asignado', 'Visible'])
+        self.assertEqual(self.columna(libro['Tareas'], 2), ['Asignado', 'Visible'])
+
+    def test_admin_ve_todo(self):
+        self.client.force_login(self.admin)
+        hoja = self.libro('/reportes/tareas/excel/').active
+        self.assertEqual(self.columna(hoja, 2), ['Ajeno', 'Asignado', 'Visible'])
@@ -4,7 +4,9 @@ from django.http import HttpResponse
 from django.utils import timezone
 from datetime import datetime, timedelta
 
+from proyectos.admision import nivel_coste
 from proyectos.models import Proyecto, Tarea
+from proyectos.visibilidad import filtrar_visibles
 from io import BytesIO
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -23,7 +25,7 @@ def reportes_index(request):
     """
     Página principal de reportes
     """
-    proyectos = Proyecto.objects.all()
+    proyectos = filtrar_visibles(Proyecto.objects.all(), request.user)
     
     context = {
         'proyectos': proyectos,
@@ -33,11 +35,12 @@ def reportes_index(request):
 
 
 @login_required
+@nivel_coste('pesado')
 def reporte_proyecto_pdf(request, proyecto_id):
     """
     Genera un reporte PDF completo de un proyecto
     """
-    proyecto = get_object_or_404(Proyecto, pk=proyecto_id)
+    proyecto = get_object_or_404(filtrar_visibles(Proyecto.objects.all(), request.user), pk=proyecto_id)
     tareas = proyecto.tareas.all().order_by('-fecha_creacion')
     
     # Crear el objeto BytesIO
@@ -108,10 +111,10 @@ def reporte_proyecto_pdf(request, proyecto_id):
     stats_heading = Paragraph("Estadísticas de Tareas", heading_style)
     elements.append(stats_heading)
     
-    total_tareas = tareas.count()
-    completadas = tareas.filter(estado='completada').count()
-    en_progreso = tareas.filter(estado='en_progreso').count()
-    pendientes = tareas.filter(estado='pendiente').count()
+    total_tareas = proyecto.total_tareas
+    completadas = proyecto.tareas_completadas
+    en_progreso = proyecto.tareas_en_progreso
+    pendientes = proyecto.tareas_pendientes
     
     stats_data = [
         ['Métrica', 'Cantidad'],
@@ -140,7 +143,7 @@ def reporte_proyecto_pdf(request, proyecto_id):
     tasks_heading = Paragraph("Lista de Tareas", heading_style)
     elements.append(tasks_heading)
     
-    if tareas.exists():
+    if total_tareas:
         tareas_data = [['Título', 'Asignado', 'Estado', 'Prioridad', 'Vencimiento']]
         
         for tarea in tareas:
@@ -194,6 +197,7 @@ def reporte_proyecto_pdf(request, proyecto_id):
 
 
 @login_required
+@nivel_coste('pesado')
 def reporte_tareas_excel(request):
     """
     Genera un reporte Excel de todas las tareas con filtros
@@ -204,8 +208,8 @@ def reporte_tareas_excel(request):
     fecha_desde = request.GET.get('fecha_desde', None)
     fecha_hasta = request.GET.get('fecha_hasta', None)
     
-    # Consulta base
-    tareas = Tarea.objects.all()
+    # Consulta base: los members, solo las tareas de sus proyectos visibles
+    tareas = filtrar_visibles(Tarea.objects.all(), request.user, campo='proyecto_id')
     
     # Aplicar filtros
     if proyecto_id:
@@ -277,6 +281,7 @@ def reporte_tareas_excel(request):
 
 
 @login_required
+@nivel_coste('pesado')
 def reporte_general_excel(request):
     """
     Genera un reporte Excel general con múltiples hojas
@@ -291,7 +296,7 @@ def reporte_general_excel(request):
     headers_proyectos = ['ID', 'Nombre', 'Creado por', 'Fecha Inicio', 'Fecha Fin', 'Progreso %', '¿Atrasado?']
     ws_proyectos.append(headers_proyectos)
     
-    proyectos = Proyecto.objects.all()
+    proyectos = filtrar_visibles(Proyecto.objects.all(), request.user)
     for proyecto in proyectos:
         ws_proyectos.append([
             proyecto.id,
@@ -308,7 +313,7 @@ def reporte_general_excel(request):
     headers_tareas = ['ID', 'Título', 'Proyecto', 'Asignado', 'Estado', 'Prioridad', 'Vencimiento']
     ws_tareas.append(headers_tareas)
     
-    tareas = Tarea.objects.all()
+    tareas = filtrar_visibles(Tarea.objects.all(), request.user, campo='proyecto_id')
     for tarea in tareas:
         ws_tareas.append([
             tarea.id,